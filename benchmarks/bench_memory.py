@@ -0,0 +1,137 @@
+"""
+Peak-memory benchmark for migrating one very large conversation.
+
+Each mode runs in a fresh child process: a single conversation with
+--messages messages of --message-size characters is loaded into mongomock
+(or a local mongod with --mongo-uri) and migrated into an empty Open
+WebUI-shaped SQLite database, once with the default in-memory path and once
+with streaming=True. The report shows the peak size of the Python heap
+(tracemalloc) during the migration and how much the process's peak RSS grew.
+With streaming, the Python heap stays near the largest message plus the
+in-memory part of the spool buffer instead of a multiple of the whole
+conversation. RSS still includes SQLite's own allocations: reserving the
+TEXT value (CAST(zeroblob(n) AS TEXT)) costs about twice the chat size
+inside SQLite for a moment.
+
+Usage:
+    python -m benchmarks.bench_memory --messages 2000 --message-size 20000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+MODES = ("in_memory", "streaming")
+_INSERT_CHUNK = 500
+
+
+def _load_conversation(mongo_db, num_messages, message_size):
+    """Inserts one conversation in chunks, so the generator never holds the whole dataset."""
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    conv_id = "bench-memory-conversation"
+    mongo_db["conversations"].drop()
+    mongo_db["messages"].drop()
+    mongo_db["conversations"].insert_one({
+        "conversationId": conv_id,
+        "title": "Very large conversation",
+        "model": "gpt-4o",
+        "tags": [],
+        "createdAt": created_at,
+        "updatedAt": created_at + timedelta(seconds=num_messages),
+    })
+    parent_id = "00000000-0000-0000-0000-000000000000"
+    text = ("lorem ipsum dolor sit amet " * (message_size // 27 + 1))[:message_size]
+    for start in range(0, num_messages, _INSERT_CHUNK):
+        chunk = []
+        for index in range(start, min(start + _INSERT_CHUNK, num_messages)):
+            msg_id = f"message-{index}"
+            chunk.append({
+                "messageId": msg_id,
+                "conversationId": conv_id,
+                "parentMessageId": parent_id,
+                "isCreatedByUser": index % 2 == 0,
+                "model": None if index % 2 == 0 else "gpt-4o",
+                "text": text,
+                "createdAt": created_at + timedelta(seconds=index),
+            })
+            parent_id = msg_id
+        mongo_db["messages"].insert_many(chunk)
+
+
+def run_child(args):
+    import sqlite3
+
+    import config
+    from benchmarks.harness import open_database, peak_rss_kb
+    from benchmarks.synthetic import create_webui_schema
+    from core.sources import MongoSource
+    from scripts.migrate_conversations import migrate_conversations
+
+    mongo_db, client, _counter = open_database(args.mongo_uri, "bench_memory")
+    _load_conversation(mongo_db, args.messages, args.message_size)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.SQLITE_DB_PATH = os.path.join(tmp_dir, "webui.db")
+        config.TARGET_USER_ID = "benchmark-user"
+        sqlite_conn = sqlite3.connect(config.SQLITE_DB_PATH)
+        create_webui_schema(sqlite_conn)
+        sqlite_conn.close()
+
+        # fast_pragmas is off so SQLite's enlarged page cache doesn't dominate the RSS figures.
+        before = peak_rss_kb()
+        tracemalloc.start()
+        summary = migrate_conversations(log_callback=lambda message: None, source=MongoSource(mongo_db),
+                                        incremental=False, fast_pragmas=False, streaming=args.child == "streaming")
+        _current, python_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        after = peak_rss_kb()
+        chat_bytes = os.path.getsize(config.SQLITE_DB_PATH)
+
+    if args.mongo_uri:
+        mongo_db.client.drop_database("bench_memory")
+    client.close()
+    print(json.dumps({
+        "mode": args.child,
+        "migrated": summary["migrated"] if summary else 0,
+        "python_heap_peak_bytes": python_peak,
+        "peak_rss_before_kb": before,
+        "peak_rss_after_kb": after,
+        "peak_rss_growth_kb": after - before if before is not None else None,
+        "database_bytes": chat_bytes,
+    }))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--message-size", type=int, default=20000, help="Message length in characters.")
+    parser.add_argument("--mongo-uri", default="", help="Use a local mongod instead of mongomock.")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args)
+
+    conversation_mib = args.messages * args.message_size / 1024 / 1024
+    print(f"One conversation of {args.messages} messages x {args.message_size} characters (~{conversation_mib:.0f} MiB of text)")
+    for mode in MODES:
+        command = [sys.executable, "-m", "benchmarks.bench_memory", "--child", mode,
+                   "--messages", str(args.messages), "--message-size", str(args.message_size)]
+        if args.mongo_uri:
+            command += ["--mongo-uri", args.mongo_uri]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        report = json.loads(output.strip().splitlines()[-1])
+        growth = report["peak_rss_growth_kb"]
+        growth_text = f"{growth / 1024:.1f} MiB" if growth is not None else "n/a"
+        print(f"{mode:>10}: Python heap peak {report['python_heap_peak_bytes'] / 1024 / 1024:.1f} MiB, "
+              f"peak RSS grew by {growth_text} (migrated {report['migrated']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
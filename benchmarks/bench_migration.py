@@ -0,0 +1,200 @@
+"""
+Throughput benchmark for the conversation migration and preset generation paths.
+
+Generates a synthetic LibreChat dataset, loads it into mongomock (or a local
+mongod with --mongo-uri), migrates it into an empty Open WebUI-shaped SQLite
+database and reports conversations/sec, messages/sec, peak RSS and the wall
+time of each stage (read, transform, serialize, write).
+
+Usage:
+    python -m benchmarks.bench_migration --conversations 5000 --messages 20 \\
+        --messages-distribution lognormal --branch-probability 0.1 --output baseline.json
+    python -m benchmarks.bench_migration --conversations 5000 --baseline baseline.json
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import config
+from benchmarks.harness import compare_reports, open_database, peak_rss_kb, save_report
+from benchmarks.synthetic import DISTRIBUTIONS, create_webui_schema, generate_dataset, generate_presets, load_into_mongo
+from core.readers import DEFAULT_BATCH_SIZE
+from core.sources import MongoSource
+from core.sqlite_writer import BulkWriter, CHAT_INSERT_SQL
+from scripts import generate_presets as presets_script
+from scripts import migrate_conversations as migrate_script
+
+BENCH_USER_ID = "benchmark-user"
+
+
+def _new_webui_db(tmp_dir, name):
+    path = os.path.join(tmp_dir, name)
+    sqlite_conn = sqlite3.connect(path)
+    create_webui_schema(sqlite_conn)
+    return path, sqlite_conn
+
+
+def measure_stages(mongo_db, tmp_dir, batch_size):
+    """Times each stage of the migration in isolation over the whole dataset."""
+    source = MongoSource(mongo_db)
+    stages = {}
+
+    start = time.perf_counter()
+    pairs = [pair for pair in source.iter_conversations_with_messages(batch_size=batch_size) if pair[1]]
+    stages["read"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chats = [migrate_script.build_chat_json(conv, messages) for conv, messages in pairs]
+    stages["transform"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    serialized = [migrate_script.serialize_chat(chat) for chat in chats]
+    stages["serialize"] = time.perf_counter() - start
+
+    _path, sqlite_conn = _new_webui_db(tmp_dir, "stages.db")
+    rows = [
+        (str(index), BENCH_USER_ID, chat["title"], 0, chat["timestamp"] // 1000, chat["timestamp"] // 1000,
+         chat_json_string, 0, "{}", None)
+        for index, (chat, chat_json_string) in enumerate(zip(chats, serialized))
+    ]
+    start = time.perf_counter()
+    with BulkWriter(sqlite_conn, CHAT_INSERT_SQL, log_callback=lambda message: None) as writer:
+        for row in rows:
+            writer.add(row)
+    stages["write"] = time.perf_counter() - start
+    sqlite_conn.close()
+
+    stages["serialized_bytes"] = sum(len(chat_json_string.encode("utf-8")) for chat_json_string in serialized)
+    return stages
+
+
+def measure_migration(mongo_db, tmp_dir, num_conversations, num_messages, batch_size, workers, use_processes):
+    """Times an end-to-end migrate_conversations run."""
+    config.SQLITE_DB_PATH, sqlite_conn = _new_webui_db(tmp_dir, "migration.db")
+    sqlite_conn.close()
+    config.TARGET_USER_ID = BENCH_USER_ID
+
+    start = time.perf_counter()
+    migrate_script.migrate_conversations(
+        log_callback=lambda message: None, source=MongoSource(mongo_db), batch_size=batch_size,
+        workers=workers, use_processes=use_processes, incremental=False,
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "conversations_per_sec": num_conversations / elapsed,
+        "messages_per_sec": num_messages / elapsed,
+        "db_bytes": os.path.getsize(config.SQLITE_DB_PATH),
+    }
+
+
+def measure_presets(mongo_db, tmp_dir, num_presets):
+    """Times an end-to-end generate_presets run."""
+    config.OUTPUT_DIR = os.path.join(tmp_dir, "presets")
+    config.TARGET_USER_ID = BENCH_USER_ID
+
+    start = time.perf_counter()
+    presets_script.generate_presets(log_callback=lambda message: None, source=MongoSource(mongo_db))
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "presets_per_sec": num_presets / elapsed if num_presets else 0.0,
+    }
+
+
+def run_benchmark(args):
+    db_name = "librechat_bench_migration"
+    mongo_db, client, _counter = open_database(args.mongo_uri, db_name)
+    conversations, messages = generate_dataset(
+        args.conversations, args.messages, seed=args.seed,
+        messages_distribution=args.messages_distribution,
+        message_size=args.message_size, size_distribution=args.size_distribution,
+        branch_probability=args.branch_probability,
+    )
+    presets = generate_presets(args.presets, seed=args.seed)
+    load_into_mongo(mongo_db, conversations, messages, presets)
+    num_messages = len(messages)
+    del conversations, messages, presets
+
+    report = {
+        "parameters": {
+            "conversations": args.conversations,
+            "messages_mean": args.messages,
+            "messages_distribution": args.messages_distribution,
+            "message_size": args.message_size,
+            "size_distribution": args.size_distribution,
+            "branch_probability": args.branch_probability,
+            "presets": args.presets,
+            "batch_size": args.batch_size,
+            "workers": args.workers,
+            "use_processes": args.use_processes,
+            "backend": "mongod" if args.mongo_uri else "mongomock",
+        },
+        "messages": num_messages,
+    }
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report["stages"] = measure_stages(mongo_db, tmp_dir, args.batch_size)
+            report["migration"] = measure_migration(
+                mongo_db, tmp_dir, args.conversations, num_messages, args.batch_size, args.workers, args.use_processes,
+            )
+            report["presets"] = measure_presets(mongo_db, tmp_dir, args.presets)
+    finally:
+        if args.mongo_uri:
+            client.drop_database(db_name)
+        client.close()
+    report["peak_rss_kb"] = peak_rss_kb()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=10, help="Mean messages per conversation.")
+    parser.add_argument("--messages-distribution", choices=DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--message-size", type=int, default=200, help="Mean message length in characters.")
+    parser.add_argument("--size-distribution", choices=DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--branch-probability", type=float, default=0.0)
+    parser.add_argument("--presets", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--use-processes", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongo-uri", default=None, help="Local mongod to benchmark against instead of mongomock.")
+    parser.add_argument("--output", help="Write the report to this JSON file (e.g. a new baseline).")
+    parser.add_argument("--baseline", help="Compare the report with a previously saved JSON file.")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+
+    stages = report["stages"]
+    migration = report["migration"]
+    print(f"Dataset: {args.conversations} conversations, {report['messages']} messages, {args.presets} presets")
+    for stage in ("read", "transform", "serialize", "write"):
+        print(f"  {stage:>9}: {stages[stage]:.3f}s")
+    print(f"  Migration: {migration['seconds']:.3f}s, {migration['conversations_per_sec']:.0f} conv/s, "
+          f"{migration['messages_per_sec']:.0f} msg/s")
+    print(f"  Presets:   {report['presets']['seconds']:.3f}s")
+    if report["peak_rss_kb"] is not None:
+        print(f"  Peak RSS:  {report['peak_rss_kb'] / 1024:.1f} MiB")
+
+    if args.baseline:
+        import json
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.baseline}:")
+        for key, old, new, ratio in compare_reports(report, baseline):
+            if key.startswith("parameters."):
+                continue
+            ratio_text = f"{ratio:.2f}x" if ratio is not None else "n/a"
+            print(f"  {key}: {old:.4g} -> {new:.4g} ({ratio_text})")
+
+    if args.output:
+        save_report(report, args.output)
+        print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compares the grouped streaming read path with the per-conversation (N+1) read path.
+
+Usage:
+    python -m benchmarks.bench_read_paths --conversations 2000 --messages 10
+    python -m benchmarks.bench_read_paths --mongo-uri mongodb://localhost:27017/
+
+Without --mongo-uri the data is loaded into mongomock (pip install mongomock).
+With --mongo-uri a scratch database is created on that server and dropped afterwards.
+"""
+import argparse
+import time
+
+from benchmarks.harness import open_database
+from benchmarks.synthetic import generate_dataset, load_into_mongo
+from core.readers import DEFAULT_BATCH_SIZE, READ_MODES
+
+
+def run_benchmark(num_conversations, messages_per_conversation, mongo_uri=None, batch_size=DEFAULT_BATCH_SIZE, seed=0):
+    """Runs every read mode over the same dataset and returns a dict of results keyed by mode."""
+    db_name = "librechat_bench_read_paths"
+    mongo_db, client, counter = open_database(mongo_uri, db_name, count_commands=True)
+    conversations, messages = generate_dataset(num_conversations, messages_per_conversation, seed=seed)
+    load_into_mongo(mongo_db, conversations, messages)
+
+    results = {}
+    try:
+        for mode, reader in READ_MODES.items():
+            if counter:
+                counter.count = 0
+            start = time.perf_counter()
+            conv_total = 0
+            msg_total = 0
+            for _conv, conv_messages in reader(mongo_db, batch_size=batch_size):
+                conv_total += 1
+                msg_total += len(conv_messages)
+            elapsed = time.perf_counter() - start
+            results[mode] = {
+                "seconds": elapsed,
+                "conversations": conv_total,
+                "messages": msg_total,
+                "round_trips": counter.count if counter else None,
+            }
+    finally:
+        if mongo_uri:
+            client.drop_database(db_name)
+        client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=10, help="Messages per conversation.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--mongo-uri", default=None, help="Local mongod to benchmark against instead of mongomock.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.conversations, args.messages, args.mongo_uri, args.batch_size)
+    for mode, result in results.items():
+        round_trips = result["round_trips"] if result["round_trips"] is not None else "n/a"
+        print(
+            f"{mode:>16}: {result['seconds']:.3f}s, "
+            f"{result['conversations'] / result['seconds']:.0f} conv/s, "
+            f"{result['messages']} messages, round-trips: {round_trips}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Compares the orjson and standard-library JSON encoders on synthetic chat blobs.
+
+Every chat is encoded with both encoders and decoded again. The script fails
+(exit code 1) if any pair is not semantically identical, i.e. if the Open WebUI
+`chat` column would differ depending on which encoder is installed, or if the
+encoders treat a datetime left in a document differently (both must raise
+TypeError). It also reports the encoding time of each encoder.
+
+Usage:
+    python -m benchmarks.bench_serialization --conversations 2000 --messages 50 --message-size 2000
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import DISTRIBUTIONS, generate_dataset
+from core.serialization import dumps, dumps_bytes, orjson
+from scripts.generate_presets import convert_preset
+from scripts.migrate_conversations import build_chat_json
+
+# Values that tend to expose encoder differences.
+EDGE_CASE_DOCUMENTS = [
+    {"title": "Unicode: Grüße, 你好, emoji 🚀, RTL שלום, escapes \"\\\n\t\u0000 "},
+    {"title": "Numbers", "n": [0, -1, 2 ** 53 + 1, 2 ** 63 - 1, 2 ** 70, 1.5, 1e-7, 1e300, 0.1 + 0.2]},
+    {"title": "Nested", "messages": [{"content": None, "model": None, "tags": [], "params": {}}]},
+    {"title": "", "models": [], "files": [], "timestamp": 0},
+]
+
+
+def _messages_by_conversation(conversations, messages):
+    by_conv = {}
+    for msg in messages:
+        by_conv.setdefault(msg["conversationId"], []).append(msg)
+    for conv_messages in by_conv.values():
+        conv_messages.sort(key=lambda msg: msg["createdAt"])
+    return [(conv, by_conv.get(conv["conversationId"], [])) for conv in conversations]
+
+
+def check_equivalence(documents, pretty=False):
+    """Returns the indexes of documents whose orjson and stdlib encodings decode differently."""
+    mismatches = []
+    for index, doc in enumerate(documents):
+        stdlib_text = dumps(doc, pretty=pretty, encoder="stdlib")
+        orjson_text = dumps(doc, pretty=pretty, encoder="orjson")
+        if json.loads(stdlib_text) != json.loads(orjson_text):
+            mismatches.append(index)
+    return mismatches
+
+
+def check_datetime_handling():
+    """Returns a description of how each encoder handles a raw datetime, and whether they agree."""
+    doc = {"title": "Datetime", "createdAt": datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc)}
+    outcomes = {}
+    for encoder in ("stdlib", "orjson"):
+        for function in (dumps, dumps_bytes):
+            try:
+                function(doc, encoder=encoder)
+                outcomes[(encoder, function.__name__)] = "encoded"
+            except TypeError:
+                outcomes[(encoder, function.__name__)] = "TypeError"
+    return outcomes, set(outcomes.values()) == {"TypeError"}
+
+
+def time_encoder(documents, encoder, pretty=False):
+    start = time.perf_counter()
+    total_bytes = 0
+    for doc in documents:
+        total_bytes += len(dumps(doc, pretty=pretty, encoder=encoder))
+    return time.perf_counter() - start, total_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20, help="Mean messages per conversation.")
+    parser.add_argument("--messages-distribution", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--message-size", type=int, default=500, help="Mean message length in characters.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson is not installed; nothing to compare (pip install orjson).")
+        return 0
+
+    conversations, messages = generate_dataset(
+        args.conversations, args.messages, seed=args.seed,
+        messages_distribution=args.messages_distribution, message_size=args.message_size,
+    )
+    chats = [build_chat_json(conv, conv_messages) for conv, conv_messages in _messages_by_conversation(conversations, messages)]
+    preset = {"title": "Preset", "model": "gpt-4o", "createdAt": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+    documents = chats + [[convert_preset(preset, "user")]] + EDGE_CASE_DOCUMENTS
+
+    failed = False
+    for pretty in (False, True):
+        mismatches = check_equivalence(documents, pretty=pretty)
+        label = "pretty" if pretty else "compact"
+        if mismatches:
+            failed = True
+            print(f"FAIL ({label}): {len(mismatches)} documents differ, first at index {mismatches[0]}")
+        else:
+            print(f"OK ({label}): {len(documents)} documents decode identically with both encoders")
+
+    outcomes, consistent = check_datetime_handling()
+    if consistent:
+        print("OK (datetime): both encoders raise TypeError for a raw datetime")
+    else:
+        failed = True
+        print(f"FAIL (datetime): the encoders disagree: "
+              f"{', '.join(f'{encoder} {name}: {outcome}' for (encoder, name), outcome in outcomes.items())}")
+
+    for encoder in ("stdlib", "orjson"):
+        seconds, total_bytes = time_encoder(chats, encoder)
+        print(f"{encoder:>7}: {seconds:.3f}s for {len(chats)} chats, {total_bytes / 1024 / 1024:.1f} MiB, "
+              f"{total_bytes / 1024 / 1024 / seconds:.0f} MiB/s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
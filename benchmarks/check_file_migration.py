@@ -0,0 +1,211 @@
+"""
+Checks scripts.migrate_files and core.file_transfer against local stand-in
+directories, without MongoDB or Docker.
+
+A LibreChat upload folder and a mongodump-style files.bson are generated
+in a temporary directory, then migrated into an Open WebUI-shaped SQLite
+database. The script checks that:
+- two records with the same content are copied once and share one Open WebUI file
+- paths leaving LIBRECHAT_DOCKER_PATH (e.g. /../../etc/passwd) are rejected
+  by resolve_upload and skipped by the migration
+- copy_file falls back to the plain copy when copy_file_range and sendfile
+  fail with EXDEV or EINVAL, and the copy is intact
+- a copy that fails halfway leaves neither the target nor its .partial file
+- a second run copies nothing
+It exits with code 1 if any check fails and reports the copy throughput
+of each available method.
+
+Usage:
+    python -m benchmarks.check_file_migration --size-mb 64
+"""
+import argparse
+import errno
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+import bson
+
+import config
+import core.file_transfer as file_transfer
+from benchmarks.synthetic import create_webui_schema
+from core.sources import BsonDumpSource
+from scripts.migrate_files import migrate_files
+
+TRAVERSAL_PATHS = ("/../../etc/passwd", "../etc/passwd", "/uploads/../../etc/passwd", "/uploads/u1/../../../x")
+
+
+def write_upload(librechat_dir, folder, name, content):
+    file_id = str(uuid.uuid4())
+    filepath = f"/{folder}/u1/{file_id}__{name}"
+    os.makedirs(os.path.join(librechat_dir, folder, "u1"), exist_ok=True)
+    with open(os.path.join(librechat_dir, filepath.lstrip("/")), "wb") as f:
+        f.write(content)
+    return {"file_id": file_id, "user": "u1", "filename": name, "filepath": filepath, "source": "local",
+            "type": "image/png" if folder == "images" else "application/pdf", "bytes": len(content)}
+
+
+def build_fixture(work_dir):
+    """Writes the uploads and files.bson; returns (librechat dir, dump dir, records)."""
+    librechat_dir = os.path.join(work_dir, "librechat")
+    dump_dir = os.path.join(work_dir, "dump", "LibreChat")
+    os.makedirs(dump_dir)
+    same = os.urandom(64 * 1024)
+    records = [
+        write_upload(librechat_dir, "uploads", "report.pdf", same),
+        write_upload(librechat_dir, "uploads", "report copy.pdf", same),
+        write_upload(librechat_dir, "images", "photo.png", os.urandom(32 * 1024)),
+        {"file_id": "escape", "user": "u1", "filename": "passwd", "filepath": "/../../etc/passwd", "source": "local"},
+        {"file_id": "remote", "user": "u1", "filename": "x.pdf", "filepath": "https://bucket/x.pdf", "source": "s3"},
+    ]
+    with open(os.path.join(dump_dir, "conversations.bson"), "wb"):
+        pass
+    with open(os.path.join(dump_dir, "files.bson"), "wb") as f:
+        for record in records:
+            f.write(bson.encode(record))
+    return librechat_dir, dump_dir, records
+
+
+def run_migration(dump_dir, upload_dir):
+    return migrate_files(log_callback=lambda message: None, source=BsonDumpSource(dump_dir), upload_dir=upload_dir,
+                         workers=2)
+
+
+def check_migration(work_dir):
+    problems = []
+    librechat_dir, dump_dir, records = build_fixture(work_dir)
+    sqlite_path = os.path.join(work_dir, "webui.db")
+    upload_dir = os.path.join(work_dir, "webui_uploads")
+    conn = sqlite3.connect(sqlite_path)
+    create_webui_schema(conn)
+    conn.close()
+    config.SQLITE_DB_PATH = sqlite_path
+    config.LIBRECHAT_DOCKER_PATH = librechat_dir
+    config.TARGET_USER_ID = "webui-user"
+
+    summary = run_migration(dump_dir, upload_dir)
+    expected = {"copied": 2, "duplicates": 1, "unchanged": 0, "skipped": 2, "errors": 0}
+    if summary is None or any(summary[key] != value for key, value in expected.items()):
+        problems.append(f"first run: {summary}, expected {expected}")
+    conn = sqlite3.connect(sqlite_path)
+    shared = {row[0] for row in conn.execute(
+        "SELECT webui_file_id FROM librechat_migration_files WHERE file_id IN (?, ?)",
+        (records[0]["file_id"], records[1]["file_id"]))}
+    if len(shared) != 1:
+        problems.append(f"dedup: identical files map to {len(shared)} Open WebUI files")
+    if conn.execute("SELECT COUNT(*) FROM file").fetchone()[0] != 2 or len(os.listdir(upload_dir)) != 2:
+        problems.append("dedup: expected two file rows and two copied files")
+    if conn.execute("SELECT COUNT(*) FROM librechat_migration_files WHERE file_id = 'escape'").fetchone()[0]:
+        problems.append("traversal: /../../etc/passwd was migrated")
+    conn.close()
+
+    summary = run_migration(dump_dir, upload_dir)
+    if summary is None or summary["copied"] or summary["duplicates"] or summary["unchanged"] != 3:
+        problems.append(f"re-run: {summary}, expected nothing copied and 3 unchanged")
+    if len(os.listdir(upload_dir)) != 2:
+        problems.append("re-run: files were copied again")
+    return problems
+
+
+def check_resolve_upload(work_dir):
+    problems = []
+    for filepath in TRAVERSAL_PATHS:
+        resolved = file_transfer.resolve_upload(work_dir, filepath)
+        if resolved is not None:
+            problems.append(f"resolve_upload accepted {filepath!r} as {resolved}")
+    if file_transfer.resolve_upload(work_dir, "/uploads/u1/a.pdf") != os.path.join(
+            os.path.realpath(work_dir), "uploads", "u1", "a.pdf"):
+        problems.append("resolve_upload rejected a path inside the root")
+    return problems
+
+
+def _raise(code):
+    def fail(*_args):
+        raise OSError(code, os.strerror(code))
+    return fail
+
+
+def check_fallback_and_cleanup(work_dir):
+    problems = []
+    src = os.path.join(work_dir, "source.bin")
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    with open(src, "wb") as f:
+        f.write(data)
+    saved = {name: getattr(os, name, None) for name in ("copy_file_range", "sendfile")}
+    try:
+        for code in (errno.EXDEV, errno.EINVAL):
+            os.copy_file_range = _raise(code)
+            os.sendfile = _raise(code)
+            dst = os.path.join(work_dir, f"fallback-{code}.bin")
+            try:
+                copied, method = file_transfer.copy_file(src, dst)
+            except OSError as e:
+                problems.append(f"fallback ({errno.errorcode[code]}): copy_file raised {e}")
+                continue
+            with open(dst, "rb") as f:
+                intact = f.read() == data
+            if method != file_transfer.USERSPACE or copied != len(data) or not intact:
+                problems.append(f"fallback ({errno.errorcode[code]}): method {method}, {copied} bytes, intact {intact}")
+
+        def fail_halfway(src_fd, dst_fd, count, *_args):
+            os.write(dst_fd, os.read(src_fd, min(count, 4096)))
+            raise OSError(errno.EIO, os.strerror(errno.EIO))
+        os.copy_file_range = fail_halfway
+        dst = os.path.join(work_dir, "failed.bin")
+        try:
+            file_transfer.copy_file(src, dst)
+            problems.append("cleanup: a failing copy did not raise")
+        except OSError:
+            pass
+        leftovers = [path for path in (dst, dst + ".partial") if os.path.exists(path)]
+        if leftovers:
+            problems.append(f"cleanup: left {leftovers}")
+    finally:
+        for name, function in saved.items():
+            if function is None:
+                delattr(os, name)
+            else:
+                setattr(os, name, function)
+    return problems
+
+
+def time_methods(work_dir, size):
+    src = os.path.join(work_dir, "timing.bin")
+    with open(src, "wb") as f:
+        f.write(os.urandom(size))
+    real_methods = file_transfer.copy_methods
+    try:
+        for methods in [[method] for method in real_methods()] + [[]]:
+            file_transfer.copy_methods = lambda methods=methods: methods
+            dst = os.path.join(work_dir, "timing-copy.bin")
+            start = time.perf_counter()
+            _copied, method = file_transfer.copy_file(src, dst)
+            seconds = time.perf_counter() - start
+            print(f"{method:>15}: {size / 2 ** 20:.0f} MB in {seconds:.3f}s ({size / 2 ** 20 / seconds:,.0f} MB/s)")
+            os.remove(dst)
+    finally:
+        file_transfer.copy_methods = real_methods
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=64, help="Size of the file used for the timing runs.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        problems = check_resolve_upload(work_dir)
+        problems += check_fallback_and_cleanup(work_dir)
+        problems += check_migration(work_dir)
+        if problems:
+            print(f"FAIL: {'; '.join(problems)}")
+            return 1
+        print("OK: dedup, path checks, copy fallbacks, .partial cleanup and re-runs behave as expected")
+        time_methods(work_dir, args.size_mb * 2 ** 20)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Randomized property checks and scaling benchmark for core.message_tree.
+
+Generates random message trees and corrupts some of them with missing
+parents, self-references, parent cycles and duplicate ids. It then checks
+that build_message_tree always returns a valid forest:
+- every id appears once
+- the parent and children links agree
+- there are no cycles
+- links are only changed where they had to be repaired
+- currentId is the most recent leaf, and the path leads from a root to it
+The script exits with code 1 on the first violation. It also times
+chains, wide fans and random trees of --scale messages to show the
+builder stays linear.
+
+Usage:
+    python -m benchmarks.check_message_tree --trials 500 --max-messages 300 --scale 50000
+"""
+import argparse
+import random
+import sys
+import time
+
+from core.message_tree import BROKEN_CYCLES, DUPLICATE_MESSAGES, ORPHANED_MESSAGES, build_message_tree
+
+
+def random_links(rng, num_messages, corrupt):
+    """Returns (message_id, parent_id) pairs in creation order, optionally corrupted."""
+    ids = [f"m{index}" for index in range(num_messages)]
+    links = []
+    for index, message_id in enumerate(ids):
+        if index == 0 or rng.random() < 0.05:
+            parent_id = None
+        elif rng.random() < 0.7:
+            parent_id = ids[index - 1]
+        else:
+            parent_id = ids[rng.randrange(index)]
+        links.append([message_id, parent_id])
+    if corrupt and links:
+        for _ in range(rng.randint(1, 4)):
+            link = rng.choice(links)
+            kind = rng.choice(("missing", "self", "cycle", "duplicate"))
+            if kind == "missing":
+                link[1] = f"missing-{rng.random()}"
+            elif kind == "self":
+                link[1] = link[0]
+            elif kind == "cycle":
+                # Point an earlier message at a later one, which closes a loop if the later one descends from it.
+                later = rng.choice(links)
+                link[1] = later[0]
+            else:
+                links.insert(rng.randrange(len(links) + 1), [link[0], rng.choice(ids)])
+    return [tuple(link) for link in links]
+
+
+def check_tree(links, tree, counters):
+    """Returns a list of violated properties (empty if the tree is valid)."""
+    problems = []
+    first_parent = {}
+    for message_id, parent_id in links:
+        first_parent.setdefault(message_id, parent_id)
+    unique_ids = list(first_parent)
+
+    if tree.order != unique_ids:
+        problems.append("order does not list each id once in creation order")
+    if set(tree.parents) != set(unique_ids) or set(tree.children) != set(unique_ids):
+        problems.append("parents/children keys differ from the message ids")
+        return problems
+
+    child_links = 0
+    for message_id, children in tree.children.items():
+        if len(set(children)) != len(children):
+            problems.append(f"duplicate children under {message_id}")
+        for child in children:
+            child_links += 1
+            if tree.parents[child] != message_id:
+                problems.append(f"{child} is listed under {message_id} but has parent {tree.parents[child]}")
+    non_roots = sum(1 for parent_id in tree.parents.values() if parent_id is not None)
+    if child_links != non_roots:
+        problems.append("children lists and parent links disagree")
+
+    # Every message must reach a root; depth is memoized so the check stays linear.
+    depth = {}
+    for message_id in unique_ids:
+        chain = []
+        node = message_id
+        while node is not None and node not in depth:
+            if len(chain) > len(unique_ids):
+                problems.append(f"cycle through {message_id}")
+                return problems
+            chain.append(node)
+            node = tree.parents[node]
+        base = depth[node] if node is not None else -1
+        for offset, chained in enumerate(reversed(chain), start=1):
+            depth[chained] = base + offset
+
+    changed = sum(1 for message_id in unique_ids if tree.parents[message_id] != first_parent[message_id])
+    repaired = counters.get(ORPHANED_MESSAGES, 0) + counters.get(BROKEN_CYCLES, 0)
+    if changed != repaired:
+        problems.append(f"{changed} parent links changed but {repaired} repairs were counted")
+    if counters.get(DUPLICATE_MESSAGES, 0) != len(links) - len(unique_ids):
+        problems.append("duplicate count is wrong")
+
+    leaves = [message_id for message_id in unique_ids if not tree.children[message_id]]
+    expected_current = leaves[-1] if leaves else None
+    if tree.current_id != expected_current:
+        problems.append(f"currentId {tree.current_id} is not the latest leaf {expected_current}")
+    if tree.path:
+        if tree.parents[tree.path[0]] is not None or tree.path[-1] != tree.current_id:
+            problems.append("path does not lead from a root to currentId")
+        for parent_id, child in zip(tree.path, tree.path[1:]):
+            if tree.parents[child] != parent_id:
+                problems.append("path is not a chain of parent links")
+                break
+    elif unique_ids:
+        problems.append("path is empty")
+    return problems
+
+
+def run_checks(trials, max_messages, seed):
+    rng = random.Random(seed)
+    for trial in range(trials):
+        links = random_links(rng, rng.randint(0, max_messages), corrupt=trial % 2 == 1)
+        counters = {}
+        tree = build_message_tree(links, counters)
+        problems = check_tree(links, tree, counters)
+        if trial % 2 == 0 and counters:
+            problems.append(f"an uncorrupted tree was repaired: {counters}")
+        if problems:
+            print(f"FAIL (trial {trial}, {len(links)} links): {'; '.join(problems[:5])}")
+            return False
+    print(f"OK: {trials} random trees ({trials // 2} corrupted) satisfy every property")
+    return True
+
+
+def time_shapes(scale, seed):
+    rng = random.Random(seed)
+    shapes = {
+        "chain": [(f"m{index}", f"m{index - 1}" if index else None) for index in range(scale)],
+        "fan": [(f"m{index}", "m0" if index else None) for index in range(scale)],
+        "random": random_links(rng, scale, corrupt=False),
+        "one big cycle": [(f"m{index}", f"m{(index - 1) % scale}") for index in range(scale)],
+    }
+    for name, links in shapes.items():
+        start = time.perf_counter()
+        build_message_tree(links)
+        seconds = time.perf_counter() - start
+        print(f"{name:>14}: {scale} messages in {seconds * 1000:.1f} ms ({scale / seconds:,.0f} messages/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=500)
+    parser.add_argument("--max-messages", type=int, default=300)
+    parser.add_argument("--scale", type=int, default=50000, help="Messages per tree in the timing runs.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ok = run_checks(args.trials, args.max_messages, args.seed)
+    time_shapes(args.scale, args.seed)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
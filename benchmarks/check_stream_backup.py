@@ -0,0 +1,160 @@
+"""
+Checks scripts.backup_librechat.stream_command_to_file against fake sudo and
+docker commands, so the streamed backup can be tested without Docker.
+
+The fake docker writes generated data to stdout the way
+`docker exec ... mongodump --archive --gzip` would. The script checks that:
+- a successful dump lands at the target path with the expected bytes and
+  digest, and no .partial file is left behind
+- while the dump runs, the data goes to <path>.partial and the target path
+  does not exist yet
+- a dump that fails halfway returns None, reports the command's stderr and
+  leaves neither the target nor the .partial file
+- a command that writes a lot to stderr does not block the copy
+- a target directory that cannot be written returns None without hanging
+It exits with code 1 on the first failed check and reports the streaming
+throughput of the successful run.
+
+Usage:
+    python -m benchmarks.check_stream_backup --size-mb 64
+"""
+import argparse
+import hashlib
+import os
+import stat
+import sys
+import tempfile
+import time
+
+from scripts.backup_librechat import stream_command_to_file
+
+FAKE_SUDO = """#!/bin/sh
+exec "$@"
+"""
+
+# Modes: ok (write FAKE_DOCKER_BYTES), fail (write half, then exit 1),
+# chatty (2 MB of stderr, then ok), observe (ok, recording whether only the .partial file exists mid-dump).
+FAKE_DOCKER = """#!{python}
+import os, sys
+mode = os.environ.get("FAKE_DOCKER_MODE", "ok")
+size = int(os.environ.get("FAKE_DOCKER_BYTES", "0"))
+chunk = bytes(range(256)) * 4096
+out = sys.stdout.buffer
+if mode == "chatty":
+    sys.stderr.write("progress line\\n" * 150000)
+    sys.stderr.flush()
+limit = size // 2 if mode == "fail" else size
+written = 0
+while written < limit:
+    data = chunk[:limit - written]
+    out.write(data)
+    written += len(data)
+    if mode == "observe" and written >= len(chunk):
+        out.flush()
+        target = os.environ["FAKE_DOCKER_TARGET"]
+        with open(os.environ["FAKE_DOCKER_REPORT"], "w") as report:
+            report.write(f"{{os.path.exists(target + '.partial')}} {{os.path.exists(target)}}")
+        mode = "ok"
+out.flush()
+if mode == "fail":
+    sys.stderr.write("Failed: error writing archive: connection reset\\n")
+    sys.exit(1)
+"""
+
+COMMAND = ["docker", "exec", "fake-container", "mongodump", "--archive", "--gzip"]
+
+
+def expected_digest(size):
+    chunk = bytes(range(256)) * 4096
+    digest = hashlib.sha256()
+    remaining = size
+    while remaining:
+        data = chunk[:remaining]
+        digest.update(data)
+        remaining -= len(data)
+    return digest.hexdigest()
+
+
+def install_fakes(bin_dir):
+    for name, script in (("sudo", FAKE_SUDO), ("docker", FAKE_DOCKER.format(python=sys.executable))):
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write(script)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+
+
+def run(mode, path, size, **env):
+    os.environ.update(FAKE_DOCKER_MODE=mode, FAKE_DOCKER_BYTES=str(size), **env)
+    messages = []
+    digest = hashlib.sha256()
+    start = time.perf_counter()
+    written = stream_command_to_file(COMMAND, path, log_callback=lambda message: messages.append(str(message)),
+                                     digest=digest)
+    return written, digest.hexdigest(), messages, time.perf_counter() - start
+
+
+def run_checks(work_dir, size):
+    """Returns a list of failed checks (empty if all passed)."""
+    problems = []
+    leftovers = lambda path: [name for name in (path, path + ".partial") if os.path.exists(name)]
+
+    path = os.path.join(work_dir, "ok.archive.gz")
+    written, digest, _messages, seconds = run("ok", path, size)
+    if written != size or os.path.getsize(path) != size:
+        problems.append(f"ok: wrote {written} bytes, expected {size}")
+    if digest != expected_digest(size):
+        problems.append("ok: digest does not match the data")
+    if os.path.exists(path + ".partial"):
+        problems.append("ok: .partial file left behind")
+    else:
+        print(f"ok: {size / 2 ** 20:.0f} MB in {seconds:.2f}s ({size / 2 ** 20 / seconds:,.0f} MB/s)")
+
+    path = os.path.join(work_dir, "observe.archive.gz")
+    report = os.path.join(work_dir, "observe.report")
+    run("observe", path, max(size, 2 * 2 ** 20), FAKE_DOCKER_TARGET=path, FAKE_DOCKER_REPORT=report)
+    with open(report) as f:
+        partial_exists, target_exists = f.read().split()
+    if partial_exists != "True" or target_exists != "False":
+        problems.append(f"observe: mid-dump .partial exists={partial_exists}, target exists={target_exists}")
+
+    path = os.path.join(work_dir, "fail.archive.gz")
+    written, _digest, messages, _seconds = run("fail", path, size)
+    if written is not None:
+        problems.append(f"fail: returned {written} instead of None")
+    if leftovers(path):
+        problems.append(f"fail: left {leftovers(path)}")
+    if not any("connection reset" in message for message in messages):
+        problems.append("fail: the command's stderr was not reported")
+
+    path = os.path.join(work_dir, "chatty.archive.gz")
+    written, _digest, _messages, _seconds = run("chatty", path, 4 * 2 ** 20)
+    if written != 4 * 2 ** 20:
+        problems.append(f"chatty: wrote {written} bytes, expected {4 * 2 ** 20}")
+
+    path = os.path.join(work_dir, "missing", "unwritable.archive.gz")
+    written, _digest, _messages, _seconds = run("ok", path, size)
+    if written is not None or leftovers(path):
+        problems.append(f"unwritable: returned {written}, left {leftovers(path)}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=64, help="Size of the fake archive.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        bin_dir = os.path.join(work_dir, "bin")
+        os.makedirs(bin_dir)
+        install_fakes(bin_dir)
+        problems = run_checks(work_dir, args.size_mb * 2 ** 20)
+    if problems:
+        print(f"FAIL: {'; '.join(problems)}")
+        return 1
+    print("OK: stream_command_to_file writes complete archives and leaves nothing behind on failure")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import json
+import sys
+
+
+def open_database(mongo_uri, db_name, count_commands=False):
+    """
+    Returns (mongo_db, client, counter) for a scratch database, either on a
+    real mongod at mongo_uri or in mongomock when mongo_uri is empty.
+    counter tracks find/getMore/aggregate round-trips and is only available
+    on a real mongod with count_commands.
+    """
+    if mongo_uri:
+        import pymongo
+        from pymongo import monitoring
+
+        class CommandCounter(monitoring.CommandListener):
+            count = 0
+
+            def started(self, event):
+                if event.command_name in ("find", "getMore", "aggregate"):
+                    self.count += 1
+
+            def succeeded(self, event):
+                pass
+
+            def failed(self, event):
+                pass
+
+        counter = CommandCounter() if count_commands else None
+        client = pymongo.MongoClient(mongo_uri, event_listeners=[counter] if counter else [])
+        mongo_db = client[db_name]
+        mongo_db["messages"].create_index([("conversationId", 1), ("createdAt", 1)])
+        mongo_db["conversations"].create_index([("conversationId", 1)])
+        return mongo_db, client, counter
+
+    import mongomock
+    client = mongomock.MongoClient()
+    return client[db_name], client, None
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def save_report(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def compare_reports(current, baseline, prefix=""):
+    """Yields (key, baseline_value, current_value, ratio) for every numeric value present in both reports."""
+    for key, value in current.items():
+        if key not in baseline:
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and isinstance(baseline[key], dict):
+            yield from compare_reports(value, baseline[key], prefix=f"{name}.")
+        elif isinstance(value, (int, float)) and isinstance(baseline[key], (int, float)) and not isinstance(value, bool):
+            ratio = value / baseline[key] if baseline[key] else None
+            yield name, baseline[key], value, ratio
@@ -0,0 +1,196 @@
+import random
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+ROOT_PARENT_ID = "00000000-0000-0000-0000-000000000000"
+
+DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+_WORDS = (
+    "the model answer prompt token context window system user assistant code "
+    "python query result migration database message conversation stream batch"
+).split()
+
+# Minimal Open WebUI tables, with the columns this tool reads and writes.
+WEBUI_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    role TEXT,
+    profile_image_url TEXT,
+    created_at INTEGER,
+    updated_at INTEGER
+);
+CREATE TABLE IF NOT EXISTS chat (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    title TEXT,
+    share_id TEXT UNIQUE,
+    archived INTEGER,
+    created_at INTEGER,
+    updated_at INTEGER,
+    chat TEXT,
+    pinned INTEGER,
+    meta TEXT,
+    folder_id TEXT
+);
+CREATE TABLE IF NOT EXISTS model (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    base_model_id TEXT,
+    name TEXT,
+    params TEXT,
+    meta TEXT,
+    access_control TEXT,
+    is_active INTEGER,
+    created_at INTEGER,
+    updated_at INTEGER
+);
+CREATE TABLE IF NOT EXISTS file (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    hash TEXT,
+    filename TEXT,
+    path TEXT,
+    data TEXT,
+    meta TEXT,
+    access_control TEXT,
+    created_at INTEGER,
+    updated_at INTEGER
+);
+"""
+
+
+def _uuid(rng):
+    return str(UUID(int=rng.getrandbits(128), version=4))
+
+
+def sample(rng, distribution, mean):
+    """Draws a positive integer around mean from the named distribution."""
+    if distribution == "fixed":
+        return max(1, int(mean))
+    if distribution == "uniform":
+        return rng.randint(1, max(1, int(2 * mean - 1)))
+    if distribution == "lognormal":
+        # sigma=1 gives a long tail of very large values, like real chat histories.
+        return max(1, int(rng.lognormvariate(0, 1) * mean / 1.6487))
+    raise ValueError(f"Unknown distribution '{distribution}'. Expected one of: {', '.join(DISTRIBUTIONS)}")
+
+
+def _text(rng, length):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def generate_dataset(num_conversations=1000, messages_per_conversation=10, seed=0,
+                     messages_distribution="fixed", message_size=60, size_distribution="fixed",
+                     branch_probability=0.0, num_users=0):
+    """
+    Generates synthetic LibreChat conversations and messages.
+
+    The number of messages per conversation and the message text length (in
+    characters) are drawn from the given distributions. With
+    branch_probability > 0, that fraction of messages reply to a random
+    earlier message instead of the previous one, as regenerations and edits do.
+    With num_users > 0, conversations are spread over the user ids returned
+    by generate_users(num_users).
+    Returns a (conversations, messages) tuple of lists of Mongo-shaped documents.
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    conversations = []
+    messages = []
+    user_ids = [user["_id"] for user in generate_users(num_users)]
+
+    for conv_index in range(num_conversations):
+        conv_id = _uuid(rng)
+        created_at = start + timedelta(minutes=conv_index)
+        message_count = sample(rng, messages_distribution, messages_per_conversation)
+        conv_message_ids = []
+        parent_id = ROOT_PARENT_ID
+        for msg_index in range(message_count):
+            msg_id = _uuid(rng)
+            if conv_message_ids and rng.random() < branch_probability:
+                parent_id = rng.choice(conv_message_ids)
+            is_user = msg_index % 2 == 0
+            messages.append({
+                "messageId": msg_id,
+                "conversationId": conv_id,
+                "parentMessageId": parent_id,
+                "isCreatedByUser": is_user,
+                "model": None if is_user else "gpt-4o",
+                "text": _text(rng, sample(rng, size_distribution, message_size)),
+                "createdAt": created_at + timedelta(seconds=msg_index),
+            })
+            conv_message_ids.append(msg_id)
+            parent_id = msg_id
+
+        conv = {
+            "conversationId": conv_id,
+            "title": f"Synthetic conversation {conv_index}",
+            "model": "gpt-4o",
+            "tags": [],
+            "createdAt": created_at,
+            "updatedAt": created_at + timedelta(seconds=message_count),
+        }
+        if user_ids:
+            conv["user"] = rng.choice(user_ids)
+        conversations.append(conv)
+
+    # Shuffle so the collections are not already in conversationId order.
+    rng.shuffle(conversations)
+    rng.shuffle(messages)
+    return conversations, messages
+
+
+def generate_users(num_users=10):
+    """Generates synthetic LibreChat users with ObjectId-shaped string ids and unique emails."""
+    return [{"_id": f"{index:024x}", "email": f"user{index}@example.com", "name": f"User {index}"}
+            for index in range(num_users)]
+
+
+def generate_presets(num_presets=100, seed=0):
+    """Generates synthetic LibreChat presets."""
+    rng = random.Random(seed)
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [{
+        "presetId": _uuid(rng),
+        "title": f"Synthetic preset {index}",
+        "model": rng.choice(["gpt-4o", "claude-3-5-sonnet", "llama3"]),
+        "temperature": round(rng.random(), 2),
+        "promptPrefix": _text(rng, 400),
+        "examples": [],
+        "tags": [],
+        "createdAt": created_at,
+        "updatedAt": created_at,
+    } for index in range(num_presets)]
+
+
+def load_into_mongo(mongo_db, conversations, messages, presets=None, users=None):
+    """Replaces the conversations, messages and (optionally) presets and users collections with the given documents."""
+    mongo_db["conversations"].drop()
+    mongo_db["messages"].drop()
+    if conversations:
+        mongo_db["conversations"].insert_many(conversations)
+    if messages:
+        mongo_db["messages"].insert_many(messages)
+    if presets is not None:
+        mongo_db["presets"].drop()
+        if presets:
+            mongo_db["presets"].insert_many(presets)
+    if users is not None:
+        mongo_db["users"].drop()
+        if users:
+            mongo_db["users"].insert_many(users)
+
+
+def create_webui_schema(sqlite_conn):
+    """Creates empty Open WebUI-shaped tables in the given SQLite connection."""
+    sqlite_conn.executescript(WEBUI_SCHEMA)
+    sqlite_conn.commit()
@@ -1,5 +1,5 @@
 import os
-from dotenv import load_dotenv
+from dotenv import load_dotenv, set_key
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,10 +14,20 @@ MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "LibreChat")
 # --- Open WebUI Configuration ---
 TARGET_USER_ID = os.getenv("TARGET_USER_ID")
 SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH")
+# Where migrated files are copied (default: the uploads folder next to webui.db), and the same
+# folder as Open WebUI sees it, recorded in the file table (e.g. /app/backend/data/uploads in Docker).
+OPEN_WEBUI_UPLOAD_DIR = os.getenv("OPEN_WEBUI_UPLOAD_DIR")
+OPEN_WEBUI_UPLOAD_PATH = os.getenv("OPEN_WEBUI_UPLOAD_PATH")
 
 # --- Output Configuration ---
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", "open_webui_presets")
 
+# --- Logging Configuration ---
+# Optional file that receives the full, unfiltered log of every task.
+LOG_FILE = os.getenv("LOG_FILE")
+# Maximum number of lines kept in the GUI log view.
+GUI_LOG_MAX_LINES = int(os.getenv("GUI_LOG_MAX_LINES", "5000"))
+
 def get_config():
     """Returns a dictionary of the current configuration."""
     return {
@@ -37,10 +47,9 @@ def update_config(new_config):
     SQLITE_DB_PATH = new_config.get("SQLITE_DB_PATH", SQLITE_DB_PATH)
     OUTPUT_DIR = new_config.get("OUTPUT_DIR", OUTPUT_DIR)
 
-    # Update .env file
-    with open(".env", "w") as f:
-        f.write(f"MONGO_URI={MONGO_URI}\n")
-        f.write(f"MONGO_DB_NAME={MONGO_DB_NAME}\n")
-        f.write(f"TARGET_USER_ID={TARGET_USER_ID}\n")
-        f.write(f"SQLITE_DB_PATH={SQLITE_DB_PATH}\n")
-        f.write(f"OUTPUT_DIR={OUTPUT_DIR}\n")
+    # Update the edited keys in .env; other settings (e.g. LIBRECHAT_DOCKER_PATH or
+    # OPEN_WEBUI_UPLOAD_DIR) and comments in the file are kept. Unset values are not written.
+    for key, value in (("MONGO_URI", MONGO_URI), ("MONGO_DB_NAME", MONGO_DB_NAME), ("TARGET_USER_ID", TARGET_USER_ID),
+                       ("SQLITE_DB_PATH", SQLITE_DB_PATH), ("OUTPUT_DIR", OUTPUT_DIR)):
+        if value is not None:
+            set_key(".env", key, str(value), quote_mode="never")
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+BACKUP_FULL = "full"
+BACKUP_DELTA = "delta"
+
+# Deltas chained onto one full archive before the next backup of a collection is full again.
+DEFAULT_MAX_DELTA_CHAIN = 10
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def format_high_water(value):
+    """Formats an aware datetime as the ISO string stored in manifests and used in --query."""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def parse_high_water(text):
+    return datetime.fromisoformat(text.replace("Z", "+00:00"))
+
+
+def updated_since_query(since):
+    """The mongodump --query (extended JSON) selecting documents updated at or after since."""
+    return json.dumps({"updatedAt": {"$gte": {"$date": since}}})
+
+
+def new_manifest(db_name, created_at):
+    return {"version": MANIFEST_VERSION, "db": db_name, "created_at": created_at, "collections": {}}
+
+
+def write_manifest(backup_dir, manifest):
+    path = os.path.join(backup_dir, MANIFEST_NAME)
+    with open(path + ".partial", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".partial", path)
+
+
+def load_manifests(backup_root):
+    """Returns a list of (backup name, manifest) for every backup under backup_root with a manifest, oldest first."""
+    manifests = []
+    if not os.path.isdir(backup_root):
+        return manifests
+    for name in sorted(os.listdir(backup_root)):
+        path = os.path.join(backup_root, name, MANIFEST_NAME)
+        if not os.path.isfile(path):
+            continue
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifests.append((name, json.load(f)))
+        except (OSError, ValueError):
+            continue
+    return manifests
+
+
+def latest_entry(manifests, db_name, collection, before=None):
+    """
+    Returns (backup name, entry) of the newest backup of collection in
+    db_name, optionally only among backups named up to before, or None.
+    """
+    for name, manifest in reversed(manifests):
+        if before is not None and name > before:
+            continue
+        if manifest.get("db") != db_name:
+            continue
+        entry = manifest.get("collections", {}).get(collection)
+        if entry is not None:
+            return name, entry
+    return None
+
+
+def resolve_chain(manifests, db_name, collection, backup_name=None):
+    """
+    Returns the archives needed to restore collection as of backup_name (the
+    newest backup by default): a list of (backup name, entry) from the newest
+    delta back to the full archive it is based on. Raises ValueError if the
+    chain is broken.
+    """
+    by_name = dict(manifests)
+    found = latest_entry(manifests, db_name, collection, before=backup_name)
+    if found is None:
+        raise ValueError(f"No backup of '{collection}' found")
+    chain = [found]
+    while found[1]["type"] != BACKUP_FULL:
+        base = found[1].get("base")
+        entry = by_name.get(base, {}).get("collections", {}).get(collection)
+        if entry is None:
+            raise ValueError(f"Backup '{found[0]}' of '{collection}' is based on '{base}', which is missing")
+        found = (base, entry)
+        chain.append(found)
+    return chain
+
+
+def chain_length(manifests, db_name, collection, backup_name):
+    """Number of deltas between backup_name's archive of collection and its full archive."""
+    try:
+        return len(resolve_chain(manifests, db_name, collection, backup_name)) - 1
+    except ValueError:
+        return None
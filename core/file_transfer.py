@@ -0,0 +1,115 @@
+import errno
+import os
+import shutil
+
+# Bytes requested per copy_file_range/sendfile call; the kernel may copy less.
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+COPY_FILE_RANGE = "copy_file_range"
+SENDFILE = "sendfile"
+USERSPACE = "userspace"
+
+# Errors meaning the kernel cannot copy between these two files (different
+# filesystems, unsupported filesystem or syscall), so the next method is tried.
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+
+def _copy_with(syscall, src_fd, dst_fd, size):
+    """Copies size bytes with os.copy_file_range or os.sendfile. Returns the bytes copied."""
+    copied = 0
+    while copied < size:
+        if syscall == COPY_FILE_RANGE:
+            sent = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK_SIZE, size - copied))
+        else:
+            sent = os.sendfile(dst_fd, src_fd, copied, min(COPY_CHUNK_SIZE, size - copied))
+        if sent == 0:
+            break
+        copied += sent
+    return copied
+
+
+def copy_methods():
+    """The kernel-side copy methods this platform offers, in order of preference."""
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append(COPY_FILE_RANGE)
+    if hasattr(os, "sendfile") and os.name == "posix":
+        methods.append(SENDFILE)
+    return methods
+
+
+def copy_file(src, dst):
+    """
+    Copies src to dst without moving the data through Python: with
+    os.copy_file_range (which lets filesystems such as XFS or Btrfs share
+    extents), then os.sendfile, then a plain buffered copy when neither works
+    for these two files. The copy is written to dst + ".partial" and renamed
+    into place, so dst is either complete or missing. Returns (bytes copied,
+    method used).
+    """
+    partial = dst + ".partial"
+    try:
+        with open(src, "rb") as source, open(partial, "wb") as target:
+            size = os.fstat(source.fileno()).st_size
+            method = USERSPACE
+            copied = None
+            for syscall in copy_methods():
+                try:
+                    copied = _copy_with(syscall, source.fileno(), target.fileno(), size)
+                except OSError as e:
+                    if e.errno not in _FALLBACK_ERRNOS:
+                        raise
+                    # Nothing useful was written; start over with the next method.
+                    os.ftruncate(target.fileno(), 0)
+                    os.lseek(source.fileno(), 0, os.SEEK_SET)
+                    os.lseek(target.fileno(), 0, os.SEEK_SET)
+                    continue
+                method = syscall
+                break
+            if copied is None:
+                shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
+                copied = target.tell()
+        os.replace(partial, dst)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return copied, method
+
+
+def resolve_upload(root, filepath):
+    """
+    Maps a LibreChat filepath (e.g. "/uploads/<user>/<file>" or
+    "/images/<user>/<file>", relative to the LibreChat directory whose
+    uploads and images folders the Docker containers mount) to a path under
+    root. Returns None for paths that would leave root.
+    """
+    if not root or not filepath:
+        return None
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, filepath.lstrip("/\\")))
+    if os.path.commonpath([root, path]) != root:
+        return None
+    return path
+
+
+def safe_filename(name, fallback="file"):
+    """The last component of name, without path separators, for use in a target file name."""
+    name = os.path.basename(str(name or "").replace("\\", "/")).strip()
+    return name if name not in ("", ".", "..") else fallback
+
+
+def webui_file_reference(entry):
+    """The entry of an Open WebUI message's files list for a migrated file (a core.ledger.FileEntry)."""
+    url = f"/api/v1/files/{entry.webui_file_id}"
+    if (entry.content_type or "").startswith("image/"):
+        return {"type": "image", "id": entry.webui_file_id, "url": f"{url}/content", "name": entry.filename}
+    return {
+        "type": "file",
+        "id": entry.webui_file_id,
+        "url": url,
+        "name": entry.filename,
+        "size": entry.size,
+        "content_type": entry.content_type,
+        "status": "uploaded",
+    }
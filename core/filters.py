@@ -0,0 +1,131 @@
+import json
+from datetime import datetime, timezone
+
+# Keys accepted in a filters dict, e.g. migrate_conversations(filters={...}).
+FILTER_KEYS = (
+    "created_after",
+    "created_before",
+    "updated_after",
+    "updated_before",
+    "user_ids",
+    "conversation_ids",
+    "endpoints",
+    "models",
+)
+
+
+def parse_datetime(value):
+    """Parses a datetime, date string (YYYY-MM-DD) or ISO timestamp into an aware UTC datetime."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"Invalid date '{value}'. Use YYYY-MM-DD or an ISO 8601 timestamp.")
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def parse_list(value):
+    """Accepts a list or a comma/whitespace separated string and returns a list of non-empty strings."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.replace(',', ' ').split()
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def _range(after, before):
+    condition = {}
+    after = parse_datetime(after)
+    before = parse_datetime(before)
+    if after is not None:
+        condition['$gte'] = after
+    if before is not None:
+        condition['$lt'] = before
+    return condition
+
+
+def normalize_filters(filters):
+    """Validates a filters dict and drops empty values. Raises ValueError on unknown keys or bad dates."""
+    normalized = {}
+    for key, value in (filters or {}).items():
+        if key not in FILTER_KEYS:
+            raise ValueError(f"Unknown filter '{key}'. Expected one of: {', '.join(FILTER_KEYS)}")
+        if key.endswith(('_after', '_before')):
+            value = parse_datetime(value)
+            if value is not None:
+                normalized[key] = value
+        else:
+            value = parse_list(value)
+            if value:
+                normalized[key] = value
+    return normalized
+
+
+def build_conversation_filter(filters):
+    """
+    Translates a filters dict into a MongoDB query on the conversations
+    collection, so only matching documents are sent over the wire:
+    created_after/created_before and updated_after/updated_before bound
+    createdAt/updatedAt (after is inclusive, before exclusive), and user_ids,
+    conversation_ids, endpoints and models restrict user, conversationId,
+    endpoint and model. Returns None when there is nothing to filter on.
+    """
+    filters = normalize_filters(filters)
+    query = {}
+    created = _range(filters.get("created_after"), filters.get("created_before"))
+    if created:
+        query['createdAt'] = created
+    updated = _range(filters.get("updated_after"), filters.get("updated_before"))
+    if updated:
+        query['updatedAt'] = updated
+    for key, field in (("user_ids", 'user'), ("conversation_ids", 'conversationId'),
+                       ("endpoints", 'endpoint'), ("models", 'model')):
+        if filters.get(key):
+            values = filters[key]
+            query[field] = values[0] if len(values) == 1 else {'$in': values}
+    return query or None
+
+
+def build_preset_filter(filters):
+    """Like build_conversation_filter, for the presets collection (conversation_ids does not apply)."""
+    filters = normalize_filters(filters)
+    if "conversation_ids" in filters:
+        raise ValueError("The conversation_ids filter does not apply to presets.")
+    return build_conversation_filter(filters)
+
+
+def combine_filters(*queries):
+    """ANDs MongoDB queries together, ignoring empty ones."""
+    queries = [query for query in queries if query]
+    if not queries:
+        return None
+    if len(queries) == 1:
+        return queries[0]
+    return {'$and': queries}
+
+
+def filter_scope(filters):
+    """A stable string identifying a set of filters, used to keep one checkpoint per scope."""
+    filters = normalize_filters(filters)
+    if not filters:
+        return ""
+    return json.dumps(filters, sort_keys=True, default=lambda value: value.isoformat())
+
+
+def describe_filters(filters):
+    filters = normalize_filters(filters)
+    if not filters:
+        return "none"
+    parts = []
+    for key, value in filters.items():
+        if isinstance(value, datetime):
+            parts.append(f"{key}={value.isoformat()}")
+        else:
+            parts.append(f"{key}={','.join(value)}")
+    return "; ".join(parts)
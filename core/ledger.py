@@ -0,0 +1,154 @@
+import hashlib
+from collections import namedtuple
+
+LEDGER_TABLE = "librechat_migration_ledger"
+CHECKPOINT_TABLE = "librechat_migration_checkpoint"
+FILE_LEDGER_TABLE = "librechat_migration_files"
+
+LedgerEntry = namedtuple("LedgerEntry", ["chat_id", "source_updated_at", "content_hash"])
+FileEntry = namedtuple("FileEntry", ["webui_file_id", "user_id", "content_hash", "filename", "content_type", "size"])
+
+LEDGER_UPSERT_SQL = f"""
+INSERT INTO {LEDGER_TABLE} (conversation_id, chat_id, source_updated_at, content_hash, migrated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(conversation_id) DO UPDATE SET
+    chat_id = excluded.chat_id,
+    source_updated_at = excluded.source_updated_at,
+    content_hash = excluded.content_hash,
+    migrated_at = excluded.migrated_at
+"""
+
+CHECKPOINT_UPSERT_SQL = f"""
+INSERT INTO {CHECKPOINT_TABLE} (scope, high_water, completed_at)
+VALUES (?, ?, ?)
+ON CONFLICT(scope) DO UPDATE SET
+    high_water = MAX(high_water, excluded.high_water),
+    completed_at = excluded.completed_at
+"""
+
+
+FILE_LEDGER_UPSERT_SQL = f"""
+INSERT INTO {FILE_LEDGER_TABLE} (file_id, webui_file_id, user_id, content_hash, filename, content_type, size, migrated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(file_id) DO UPDATE SET
+    webui_file_id = excluded.webui_file_id,
+    user_id = excluded.user_id,
+    content_hash = excluded.content_hash,
+    filename = excluded.filename,
+    content_type = excluded.content_type,
+    size = excluded.size,
+    migrated_at = excluded.migrated_at
+"""
+
+
+def content_hash(chat_json_string):
+    """Returns a stable hash of the serialized chat, used to detect changed conversations."""
+    return hashlib.sha256(chat_json_string.encode("utf-8")).hexdigest()
+
+
+class MigrationLedger:
+    """
+    Side table in the Open WebUI database that maps each LibreChat conversationId
+    to the Open WebUI chat id it was migrated to, along with the source updatedAt
+    and a content hash. It makes re-runs idempotent and lets them resume from the
+    last checkpoint. Ledger rows are written in the same transaction as their chat.
+
+    Checkpoints are kept per filter scope (see core.filters.filter_scope, ""
+    for unfiltered runs) and only advance when a run completes without
+    errors, so migrating a date window never hides older conversations from
+    a later unfiltered run.
+    """
+
+    def __init__(self, sqlite_conn):
+        self.sqlite_conn = sqlite_conn
+
+    def ensure_table(self):
+        self.sqlite_conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (
+                conversation_id TEXT PRIMARY KEY,
+                chat_id TEXT NOT NULL,
+                source_updated_at INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                migrated_at INTEGER NOT NULL
+            )
+        """)
+        self.sqlite_conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {LEDGER_TABLE}_updated_at ON {LEDGER_TABLE} (source_updated_at)"
+        )
+        self.sqlite_conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+                scope TEXT PRIMARY KEY,
+                high_water INTEGER NOT NULL,
+                completed_at INTEGER NOT NULL
+            )
+        """)
+        self.sqlite_conn.commit()
+
+    def ensure_file_table(self):
+        """
+        Creates the table mapping each LibreChat file_id to the Open WebUI file
+        it was copied to, with the SHA-256 of its content. Several LibreChat
+        files with the same content and owner share one Open WebUI file.
+        """
+        self.sqlite_conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {FILE_LEDGER_TABLE} (
+                file_id TEXT PRIMARY KEY,
+                webui_file_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                filename TEXT,
+                content_type TEXT,
+                size INTEGER,
+                migrated_at INTEGER NOT NULL
+            )
+        """)
+        self.sqlite_conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {FILE_LEDGER_TABLE}_hash ON {FILE_LEDGER_TABLE} (user_id, content_hash)"
+        )
+        self.sqlite_conn.commit()
+
+    def exists(self, table=LEDGER_TABLE):
+        """Returns whether table (by default the ledger itself) exists, without creating it."""
+        return self.sqlite_conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+
+    def load(self):
+        """Returns a dict of conversationId -> LedgerEntry."""
+        cursor = self.sqlite_conn.execute(
+            f"SELECT conversation_id, chat_id, source_updated_at, content_hash FROM {LEDGER_TABLE}"
+        )
+        return {row[0]: LedgerEntry(row[1], row[2], row[3]) for row in cursor}
+
+    def load_files(self):
+        """Returns a dict of LibreChat file_id -> FileEntry, or an empty dict if no files were migrated."""
+        if not self.exists(FILE_LEDGER_TABLE):
+            return {}
+        cursor = self.sqlite_conn.execute(
+            f"SELECT file_id, webui_file_id, user_id, content_hash, filename, content_type, size FROM {FILE_LEDGER_TABLE}"
+        )
+        return {row[0]: FileEntry(*row[1:]) for row in cursor}
+
+    def checkpoint(self, scope=""):
+        """Returns the newest source updatedAt (epoch seconds) fully migrated for scope, or None."""
+        if not self.exists(CHECKPOINT_TABLE):
+            return None
+        row = self.sqlite_conn.execute(
+            f"SELECT high_water FROM {CHECKPOINT_TABLE} WHERE scope = ?", (scope,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def save_checkpoint(self, scope, high_water, completed_at):
+        """Records that every conversation in scope updated up to high_water has been migrated."""
+        self.sqlite_conn.execute(CHECKPOINT_UPSERT_SQL, (scope, high_water, completed_at))
+        self.sqlite_conn.commit()
+
+    def reset_checkpoints(self):
+        """
+        Resets every checkpoint, so the next run of each scope reads all its
+        conversations again. Chats whose content did not change are still
+        skipped.
+        """
+        if self.exists(CHECKPOINT_TABLE):
+            self.sqlite_conn.execute(f"DELETE FROM {CHECKPOINT_TABLE}")
+            self.sqlite_conn.commit()
@@ -0,0 +1,48 @@
+import logging
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+
+class LogMessage(str):
+    """
+    A log line that carries a level. It is a str, so any log_callback (print,
+    a list's append, ...) keeps working; level-aware sinks read .level.
+    """
+
+    level = INFO
+
+    def __new__(cls, text, level=INFO):
+        message = super().__new__(cls, text)
+        message.level = level
+        return message
+
+
+def debug(text):
+    """Per-record chatter that high-volume sinks may suppress."""
+    return LogMessage(text, DEBUG)
+
+
+def warning(text):
+    return LogMessage(text, WARNING)
+
+
+def error(text):
+    return LogMessage(text, ERROR)
+
+
+def level_of(message):
+    """Returns the level of a log message, inferring it for plain strings."""
+    level = getattr(message, "level", None)
+    if level is not None:
+        return level
+    text = str(message).lstrip()
+    if text.startswith("Error"):
+        return ERROR
+    if text.startswith("Warning") or text.startswith("WARNING"):
+        return WARNING
+    return INFO
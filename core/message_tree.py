@@ -0,0 +1,135 @@
+from collections import deque
+
+# Counters added to the counters dict passed to build_message_tree.
+ORPHANED_MESSAGES = "orphaned_messages"
+BROKEN_CYCLES = "broken_cycles"
+DUPLICATE_MESSAGES = "duplicate_messages"
+
+
+class MessageTree:
+    """
+    The parent/children structure of one conversation, as built by
+    build_message_tree. parents maps every message id to its (repaired)
+    parent id or None, children maps it to the ids of its replies in
+    creation order, order lists the ids in creation order, current_id is
+    the active leaf and path the ids from its root down to it.
+    """
+
+    __slots__ = ("parents", "children", "order", "current_id", "path")
+
+    def __init__(self, parents, children, order, current_id, path):
+        self.parents = parents
+        self.children = children
+        self.order = order
+        self.current_id = current_id
+        self.path = path
+
+
+def _mark_reachable(start, children, reached):
+    queue = deque([start])
+    reached.add(start)
+    while queue:
+        for child in children[queue.popleft()]:
+            if child not in reached:
+                reached.add(child)
+                queue.append(child)
+
+
+def build_message_tree(links, counters=None):
+    """
+    Builds a MessageTree from (message_id, parent_id) pairs in creation
+    order, in time linear in the number of messages.
+
+    Repeated ids keep their first occurrence. A parent that is missing (or
+    the message itself) makes the message a root. Messages that cannot be
+    reached from any root sit on or below a parent cycle; each cycle is
+    broken by turning the message where it is entered into a root. The
+    active leaf (current_id) is the most recently created message without
+    replies, which is what LibreChat shows after regenerations and edits.
+
+    If counters is given, the repairs are counted under ORPHANED_MESSAGES,
+    BROKEN_CYCLES and DUPLICATE_MESSAGES.
+    """
+    parents = {}
+    order = []
+    duplicates = 0
+    for message_id, parent_id in links:
+        if message_id in parents:
+            duplicates += 1
+            continue
+        parents[message_id] = parent_id
+        order.append(message_id)
+
+    children = {message_id: [] for message_id in order}
+    roots = []
+    orphans = 0
+    for message_id in order:
+        parent_id = parents[message_id]
+        if parent_id is None:
+            roots.append(message_id)
+        elif parent_id == message_id or parent_id not in parents:
+            parents[message_id] = None
+            roots.append(message_id)
+            orphans += 1
+        else:
+            children[parent_id].append(message_id)
+
+    reached = set()
+    for root in roots:
+        _mark_reachable(root, children, reached)
+
+    cycles = 0
+    if len(reached) < len(order):
+        walked = set()
+        for message_id in order:
+            if message_id in reached:
+                continue
+            # Walk up until a message repeats: that one is on the cycle.
+            node = message_id
+            while node not in walked:
+                walked.add(node)
+                node = parents[node]
+            children[parents[node]].remove(node)
+            parents[node] = None
+            cycles += 1
+            _mark_reachable(node, children, reached)
+
+    current_id = None
+    for message_id in reversed(order):
+        if not children[message_id]:
+            current_id = message_id
+            break
+
+    path = []
+    node = current_id
+    while node is not None:
+        path.append(node)
+        node = parents[node]
+    path.reverse()
+
+    if counters is not None:
+        for counter, amount in ((ORPHANED_MESSAGES, orphans), (BROKEN_CYCLES, cycles),
+                                (DUPLICATE_MESSAGES, duplicates)):
+            if amount:
+                counters[counter] = counters.get(counter, 0) + amount
+    return MessageTree(parents, children, order, current_id, path)
+
+
+def build_history(messages, counters=None):
+    """
+    Arranges Open WebUI messages (dicts with id and parentId, in creation
+    order) into the chat's history: sets each message's parentId and
+    childrenIds from build_message_tree and returns (history_messages,
+    current_id, path_messages), where history_messages maps ids to messages
+    and path_messages is the branch from the root to current_id.
+    """
+    tree = build_message_tree(((message["id"], message["parentId"]) for message in messages), counters)
+    history_messages = {}
+    for message in messages:
+        message_id = message["id"]
+        if message_id in history_messages:
+            continue
+        message["parentId"] = tree.parents[message_id]
+        message["childrenIds"] = tree.children[message_id]
+        history_messages[message_id] = message
+    return history_messages, tree.current_id, [history_messages[message_id] for message_id in tree.path]
@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_PROGRESS_INTERVAL = 2.0
+DEFAULT_RATE_WINDOW = 30.0
+
+
+class ProgressEvent:
+    """A structured progress update, emitted at most once per progress interval."""
+
+    __slots__ = ("task", "processed", "total", "elapsed", "rate", "eta_seconds", "counters", "final")
+
+    def __init__(self, task, processed, total, elapsed, rate, eta_seconds, counters, final=False):
+        self.task = task
+        self.processed = processed
+        self.total = total
+        self.elapsed = elapsed
+        self.rate = rate
+        self.eta_seconds = eta_seconds
+        self.counters = counters
+        self.final = final
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def format(self):
+        """Formats the event as a single human-readable log line."""
+        if self.total:
+            done = f"{self.processed}/{self.total} ({100.0 * self.processed / self.total:.1f}%)"
+        else:
+            done = str(self.processed)
+        line = f"  Progress [{self.task}]: {done}, {self.rate:.1f}/s"
+        if self.eta_seconds is not None and not self.final:
+            line += f", ETA {format_duration(self.eta_seconds)}"
+        return line + f", elapsed {format_duration(self.elapsed)}"
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m{seconds:02d}s"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+def format_bytes(size):
+    if size is None:
+        return "unknown"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+class Metrics:
+    """
+    Per-task instrumentation: cumulative stage durations, counters, and a
+    moving-average rate with ETA for throttled progress events.
+
+    progress_callback receives ProgressEvent objects. When it is not given and
+    log_callback is, each event is logged as one formatted line instead. All
+    methods are thread-safe, so reader and writer threads can share one Metrics.
+    """
+
+    def __init__(self, task, total=None, progress_callback=None, log_callback=None,
+                 interval=DEFAULT_PROGRESS_INTERVAL, rate_window=DEFAULT_RATE_WINDOW):
+        self.task = task
+        self.total = total
+        self.interval = interval
+        self.rate_window = rate_window
+        self.stage_seconds = {}
+        self.counters = {}
+        self.processed = 0
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._last_emit = self._start
+        self._samples = deque([(self._start, 0)])
+        if progress_callback is None and log_callback is not None:
+            progress_callback = lambda event: log_callback(event.format())
+        self._progress_callback = progress_callback
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block and adds it to the named stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed_iter(self, stage, iterable):
+        """Wraps an iterator, adding the time spent producing each item to the named stage."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(stage, time.perf_counter() - start)
+                return
+            self.add_time(stage, time.perf_counter() - start)
+            yield item
+
+    def incr(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def advance(self, amount=1):
+        """Marks records as processed and emits a progress event if the interval has elapsed."""
+        now = time.perf_counter()
+        with self._lock:
+            self.processed += amount
+            if now - self._last_emit < self.interval:
+                return
+            self._last_emit = now
+            self._samples.append((now, self.processed))
+            while len(self._samples) > 2 and now - self._samples[0][0] > self.rate_window:
+                self._samples.popleft()
+            event = self._event(now)
+        self._emit(event)
+
+    def rate(self, now=None):
+        """Records per second over the moving window."""
+        now = now or time.perf_counter()
+        first_time, first_processed = self._samples[0]
+        if now - first_time <= 0:
+            return 0.0
+        return (self.processed - first_processed) / (now - first_time)
+
+    def _event(self, now, final=False):
+        elapsed = now - self._start
+        rate = self.processed / elapsed if final and elapsed > 0 else self.rate(now)
+        eta = None
+        if self.total is not None and rate > 0:
+            eta = max(0.0, (self.total - self.processed) / rate)
+        return ProgressEvent(self.task, self.processed, self.total, elapsed, rate, eta, dict(self.counters), final)
+
+    def _emit(self, event):
+        if self._progress_callback is not None:
+            self._progress_callback(event)
+
+    def finish(self):
+        """Emits a final progress event and returns the report."""
+        now = time.perf_counter()
+        with self._lock:
+            event = self._event(now, final=True)
+        self._emit(event)
+        return self.report()
+
+    def report(self):
+        elapsed = time.perf_counter() - self._start
+        with self._lock:
+            return {
+                "task": self.task,
+                "elapsed_seconds": elapsed,
+                "processed": self.processed,
+                "total": self.total,
+                "rate_per_second": self.processed / elapsed if elapsed > 0 else 0.0,
+                "stage_seconds": dict(self.stage_seconds),
+                "counters": dict(self.counters),
+            }
+
+    def write_report(self, path):
+        """Writes the final metrics report as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
@@ -1,17 +1,134 @@
+import atexit
+import importlib.util
+import threading
+
 import pymongo
-from config import MONGO_URI, MONGO_DB_NAME
-
-def get_mongo_db():
-    """Establishes a connection to MongoDB and returns the database object."""
-    try:
-        mongo_client = pymongo.MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-        mongo_client.server_info()
-        mongo_db = mongo_client[MONGO_DB_NAME]
-        print("Successfully connected to MongoDB.")
-        return mongo_db, mongo_client
-    except pymongo.errors.ConnectionFailure as e:
-        print(f"Could not connect to MongoDB: {e}")
-        return None, None
-    except pymongo.errors.ServerSelectionTimeoutError as e:
-        print(f"Connection to MongoDB timed out (check URI and firewall): {e}")
+
+import config
+from core.log import debug
+
+# Connection pool settings for the shared client. Pipelined migrations and per-user partitions
+# each hold a reader cursor, so the pool is sized for a few dozen concurrent operations.
+MAX_POOL_SIZE = 32
+MIN_POOL_SIZE = 1
+SERVER_SELECTION_TIMEOUT_MS = 5000
+READ_PREFERENCE = "primaryPreferred"
+APP_NAME = "librechat-history-to-openwebui"
+
+_lock = threading.Lock()
+_client = None
+_client_uri = None
+# id(client) -> [client, number of callers holding it]. A client replaced
+# after a MONGO_URI change stays open until its last holder releases it.
+_holders = {}
+
+
+def _compressors():
+    """Wire compressors in order of preference; zstd and snappy need optional packages."""
+    compressors = []
+    if importlib.util.find_spec("zstandard") is not None:
+        compressors.append("zstd")
+    if importlib.util.find_spec("snappy") is not None:
+        compressors.append("snappy")
+    compressors.append("zlib")
+    return compressors
+
+
+def client_options():
+    """Keyword arguments for the shared MongoClient."""
+    return {
+        "maxPoolSize": MAX_POOL_SIZE,
+        "minPoolSize": MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": SERVER_SELECTION_TIMEOUT_MS,
+        "readPreference": READ_PREFERENCE,
+        "compressors": _compressors(),
+        "appname": APP_NAME,
+    }
+
+
+def get_mongo_client(log_callback=print):
+    """
+    Returns the process-wide MongoClient for config.MONGO_URI, or None if the
+    server cannot be reached. The client is created on first use and reused
+    by later tasks, so they skip connection setup and TLS handshakes; it is
+    only rebuilt when MONGO_URI changes (e.g. through config.update_config).
+
+    Every returned client is held until it is given to release_mongo_client.
+    Callers must not close it: a client replaced by a URI change while other
+    tasks still hold it is closed when the last of them releases it.
+    """
+    global _client, _client_uri
+    with _lock:
+        uri = config.MONGO_URI
+        if _client is not None and _client_uri == uri:
+            log_callback(debug("Reusing the MongoDB connection."))
+            _holders.setdefault(id(_client), [_client, 0])[1] += 1
+            return _client
+        if _client is not None:
+            log_callback("MongoDB configuration changed; reconnecting.")
+            if id(_client) not in _holders:
+                _client.close()
+            else:
+                log_callback(debug("The previous MongoDB connection is closed once the tasks using it finish."))
+            _client = _client_uri = None
+        client = pymongo.MongoClient(uri, **client_options())
+        try:
+            client.admin.command("ping")
+        except pymongo.errors.ServerSelectionTimeoutError as e:
+            client.close()
+            log_callback(f"Connection to MongoDB timed out (check URI and firewall): {e}")
+            return None
+        except pymongo.errors.ConnectionFailure as e:
+            client.close()
+            log_callback(f"Could not connect to MongoDB: {e}")
+            return None
+        log_callback("Successfully connected to MongoDB.")
+        _client, _client_uri = client, uri
+        _holders[id(client)] = [client, 1]
+        return _client
+
+
+def release_mongo_client(client):
+    """
+    Releases a client returned by get_mongo_client. The current shared client
+    stays open for the next task; a client replaced after a MONGO_URI change
+    is closed once nobody holds it.
+    """
+    with _lock:
+        holder = _holders.get(id(client))
+        if holder is None or holder[0] is not client:
+            return
+        holder[1] -= 1
+        if holder[1] > 0:
+            return
+        del _holders[id(client)]
+        if client is not _client:
+            client.close()
+
+
+def get_mongo_db(log_callback=print):
+    """
+    Returns (database, client) for config.MONGO_DB_NAME on the shared client,
+    or (None, None) if MongoDB cannot be reached. Do not close the client;
+    pass it to release_mongo_client when done.
+    """
+    mongo_client = get_mongo_client(log_callback)
+    if mongo_client is None:
         return None, None
+    return mongo_client[config.MONGO_DB_NAME], mongo_client
+
+
+def close_mongo_client():
+    """Closes the shared client and any replaced clients still held. Runs automatically at exit."""
+    global _client, _client_uri
+    with _lock:
+        for client, _count in _holders.values():
+            if client is not _client:
+                client.close()
+        _holders.clear()
+        if _client is not None:
+            _client.close()
+            _client = _client_uri = None
+
+
+atexit.register(close_mongo_client)
@@ -0,0 +1,81 @@
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+DEFAULT_QUEUE_SIZE = 64
+
+_DONE = object()
+
+
+def _read_into_queue(source, task_queue, stop_event):
+    """Reader stage: drains the source iterator into the bounded task queue."""
+    try:
+        for task in source:
+            while not stop_event.is_set():
+                try:
+                    task_queue.put(task, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if stop_event.is_set():
+                return
+        task_queue.put(_DONE)
+    except BaseException as e:
+        task_queue.put(e)
+
+
+def run_pipeline(source, transform, workers=0, use_processes=False, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Runs transform(*task) for every task tuple produced by source and yields
+    (task, result, error) triples in completion order.
+
+    With workers=0 everything runs inline on the calling thread. Otherwise one
+    reader thread pulls tasks from source into a bounded queue, a pool of
+    workers (threads, or processes with use_processes) runs transform, and the
+    results are yielded back on the calling thread, which therefore stays the
+    single owner of any resource it writes to. At most queue_size tasks are
+    buffered and 2 * workers are in flight, so memory stays flat regardless of
+    how fast the reader is. transform must be picklable when use_processes is set.
+    """
+    if workers <= 0:
+        for task in source:
+            try:
+                yield task, transform(*task), None
+            except Exception as e:
+                yield task, None, e
+        return
+
+    task_queue = queue.Queue(maxsize=max(1, queue_size))
+    stop_event = threading.Event()
+    reader = threading.Thread(target=_read_into_queue, args=(source, task_queue, stop_event), daemon=True)
+    reader.start()
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    max_pending = workers * 2
+    pending = {}
+    source_done = False
+    try:
+        with executor_class(max_workers=workers) as executor:
+            while pending or not source_done:
+                while not source_done and len(pending) < max_pending:
+                    # Block for the next task only when there is nothing to collect.
+                    try:
+                        task = task_queue.get(block=not pending, timeout=None if not pending else 0)
+                    except queue.Empty:
+                        break
+                    if task is _DONE:
+                        source_done = True
+                    elif isinstance(task, BaseException):
+                        raise task
+                    else:
+                        pending[executor.submit(transform, *task)] = task
+
+                if not pending:
+                    continue
+                done, _not_done = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = pending.pop(future)
+                    error = future.exception()
+                    yield task, None if error else future.result(), error
+    finally:
+        stop_event.set()
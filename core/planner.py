@@ -0,0 +1,122 @@
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+
+from core.ledger import MigrationLedger
+from core.log import warning
+from core.metrics import format_bytes, format_duration
+from core.sqlite_writer import BulkWriter, DEFAULT_BATCH_BYTES, DEFAULT_BATCH_ROWS
+
+DEFAULT_SAMPLE_SIZE = 200
+
+# Open WebUI's chat table, for trial writes into an in-memory database.
+_TRIAL_CHAT_SCHEMA = """
+CREATE TABLE chat (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    title TEXT,
+    share_id TEXT UNIQUE,
+    archived INTEGER,
+    created_at INTEGER,
+    updated_at INTEGER,
+    chat TEXT,
+    pinned INTEGER,
+    meta TEXT,
+    folder_id TEXT
+)
+"""
+
+
+def open_read_only(sqlite_db_path, check_same_thread=True):
+    """
+    Opens an existing SQLite database read-only, or returns None if it does
+    not exist. Pass check_same_thread=False to hand the connection to a
+    pipeline reader thread. The path is percent-encoded into the URI, so
+    characters such as '#' or '?' cannot cut off mode=ro.
+    """
+    if not os.path.exists(sqlite_db_path):
+        return None
+    uri = Path(sqlite_db_path).resolve().as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread)
+
+
+def trial_write(rows, sql, ledger_rows=(), ledger_sql=None, batch_rows=DEFAULT_BATCH_ROWS, batch_bytes=DEFAULT_BATCH_BYTES):
+    """
+    Inserts rows (and ledger rows) into an in-memory copy of the chat table
+    with BulkWriter, in batches as configured for the migration. Returns
+    (seconds, bytes the database grew by).
+    """
+    sqlite_conn = sqlite3.connect(":memory:")
+    sqlite_conn.execute(_TRIAL_CHAT_SCHEMA)
+    if ledger_sql:
+        MigrationLedger(sqlite_conn).ensure_table()
+    page_size = sqlite_conn.execute("PRAGMA page_size").fetchone()[0]
+    pages_before = sqlite_conn.execute("PRAGMA page_count").fetchone()[0]
+    start = time.perf_counter()
+    with BulkWriter(sqlite_conn, sql, batch_rows=batch_rows, batch_bytes=batch_bytes, fast_pragmas=False,
+                    log_callback=lambda message: None) as writer:
+        for index, params in enumerate(rows):
+            extra = ((ledger_sql, ledger_rows[index]),) if ledger_sql else ()
+            writer.add(params, extra)
+    seconds = time.perf_counter() - start
+    growth = (sqlite_conn.execute("PRAGMA page_count").fetchone()[0] - pages_before) * page_size
+    sqlite_conn.close()
+    return seconds, growth
+
+
+def project_wall_time(read_seconds, transform_seconds, write_seconds, workers):
+    """
+    Projects the wall time of a run from the total seconds each stage would
+    take on one thread: stages add up without workers, and with workers the
+    pipeline runs at the pace of its slowest stage.
+    """
+    if workers and workers > 0:
+        return max(read_seconds, transform_seconds / workers, write_seconds)
+    return read_seconds + transform_seconds + write_seconds
+
+
+def free_space(path):
+    """Free bytes on the filesystem holding path (or its nearest existing parent), or None."""
+    directory = os.path.abspath(path)
+    while directory and not os.path.exists(directory):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+    try:
+        return shutil.disk_usage(directory).free
+    except OSError:
+        return None
+
+
+def log_plan(plan, log_callback=print):
+    """Logs a plan produced by a dry run as a short human-readable summary."""
+    log_callback(f"\nDry run for {plan['task']} (nothing was written):")
+    for label, key, formatter in (
+        ("Documents to read", "documents", str),
+        ("Rows to write", "rows", str),
+        ("Files to write", "files", str),
+        ("Messages", "messages", str),
+        ("Source bytes", "source_bytes", format_bytes),
+        ("Serialized bytes", "serialized_bytes", format_bytes),
+        ("Target growth", "target_growth_bytes", format_bytes),
+        ("Free space at target", "free_bytes", format_bytes),
+        ("Estimated wall time", "wall_seconds", format_duration),
+    ):
+        if plan.get(key) is not None:
+            log_callback(f"  {label}: {formatter(plan[key])}")
+    if plan.get("stage_seconds"):
+        log_callback("  Stage estimates: " + ", ".join(
+            f"{stage} {format_duration(seconds)}" for stage, seconds in plan["stage_seconds"].items()))
+    basis = f"  Based on a sample of {plan.get('sample_size', 0)} documents"
+    if plan.get("batch_size") is not None:
+        basis += f" (batch size {plan['batch_size']}, workers {plan.get('workers', 0)})"
+    log_callback(basis + ".")
+    growth = plan.get("target_growth_bytes")
+    free = plan.get("free_bytes")
+    if growth is not None and free is not None and growth * 2 > free:
+        # WAL and the rollback journal can briefly need about as much space again.
+        log_callback(warning(f"Warning: The target may need up to {format_bytes(growth * 2)} during the import, "
+                             f"but only {format_bytes(free)} is free."))
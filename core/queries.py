@@ -0,0 +1,158 @@
+import pymongo
+
+from core.log import warning
+
+# Only the fields each converter reads; everything else (metadata, token
+# counts, content parts...) stays on the server.
+CONVERSATION_PROJECTION = {
+    '_id': 0,
+    'conversationId': 1,
+    'title': 1,
+    'createdAt': 1,
+    'updatedAt': 1,
+    'model': 1,
+    'tags': 1,
+    'files': 1,
+}
+
+MESSAGE_PROJECTION = {
+    '_id': 0,
+    'conversationId': 1,
+    'messageId': 1,
+    'parentMessageId': 1,
+    'isCreatedByUser': 1,
+    'text': 1,
+    'model': 1,
+    'files': 1,
+    'createdAt': 1,
+}
+
+PRESET_PROJECTION = {
+    '_id': 1,
+    'title': 1,
+    'model': 1,
+    'temperature': 1,
+    'promptPrefix': 1,
+    'top_p': 1,
+    'frequency_penalty': 1,
+    'presence_penalty': 1,
+    'examples': 1,
+    'tags': 1,
+    'createdAt': 1,
+    'updatedAt': 1,
+}
+
+FILE_PROJECTION = {
+    '_id': 0,
+    'file_id': 1,
+    'user': 1,
+    'filename': 1,
+    'filepath': 1,
+    'type': 1,
+    'bytes': 1,
+    'source': 1,
+    'width': 1,
+    'height': 1,
+    'createdAt': 1,
+    'updatedAt': 1,
+}
+
+USER_PROJECTION = {
+    '_id': 1,
+    'email': 1,
+}
+
+# (collection, index keys) the migration's queries rely on.
+REQUIRED_INDEXES = (
+    ("messages", [('conversationId', pymongo.ASCENDING), ('createdAt', pymongo.ASCENDING)]),
+    ("conversations", [('conversationId', pymongo.ASCENDING)]),
+)
+
+
+def find_index(collection, keys):
+    """Returns the name of an index whose key pattern starts with keys, or None."""
+    wanted = [(field, int(direction)) for field, direction in keys]
+    for name, info in collection.index_information().items():
+        index_keys = [(field, int(direction)) for field, direction in info.get('key', [])
+                      if isinstance(direction, (int, float))]
+        if index_keys[:len(wanted)] == wanted:
+            return name
+    return None
+
+
+def find_sort_index(collection, field):
+    """Returns the name of an index that serves a sort on field in either direction, or None."""
+    return (find_index(collection, [(field, pymongo.ASCENDING)])
+            or find_index(collection, [(field, pymongo.DESCENDING)]))
+
+
+def check_indexes(mongo_db, create=False, log_callback=print):
+    """
+    Reports whether the indexes in REQUIRED_INDEXES exist and creates missing
+    ones when create is set. Returns True if every index is available.
+    """
+    all_present = True
+    for collection_name, keys in REQUIRED_INDEXES:
+        collection = mongo_db[collection_name]
+        description = f"{collection_name}({', '.join(field for field, _direction in keys)})"
+        try:
+            name = find_index(collection, keys)
+        except pymongo.errors.PyMongoError as e:
+            log_callback(warning(f"Warning: Could not list indexes on {collection_name}: {e}"))
+            all_present = False
+            continue
+        if name:
+            log_callback(f"Index on {description} found: {name}")
+            continue
+        if create:
+            log_callback(f"Index on {description} is missing, creating it (this can take a while)...")
+            try:
+                name = collection.create_index(keys)
+                log_callback(f"Created index {name}.")
+                continue
+            except pymongo.errors.PyMongoError as e:
+                log_callback(warning(f"Warning: Could not create index on {description}: {e}"))
+        else:
+            log_callback(warning(f"Warning: No index on {description}. Queries will scan the collection; "
+                                 "enable index creation to add it."))
+        all_present = False
+    return all_present
+
+
+def _plan_stages(plan):
+    stages = []
+    while plan:
+        stages.append(plan.get('stage', '?'))
+        plan = plan.get('inputStage') or (plan.get('inputStages') or [None])[0]
+    return stages
+
+
+def explain_message_query(mongo_db, log_callback=print):
+    """Logs a summary of the query plan for one conversation's message lookup."""
+    sample = mongo_db["conversations"].find_one({}, {'_id': 0, 'conversationId': 1})
+    if not sample:
+        return None
+    try:
+        explain = mongo_db["messages"].find(
+            {'conversationId': sample.get('conversationId')}, MESSAGE_PROJECTION,
+        ).sort('createdAt', pymongo.ASCENDING).explain()
+    except (pymongo.errors.PyMongoError, NotImplementedError, AttributeError) as e:
+        log_callback(f"Query plan not available: {e}")
+        return None
+
+    winning_plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+    stages = _plan_stages(winning_plan.get('queryPlan', winning_plan))
+    stats = explain.get('executionStats', {})
+    summary = {
+        "stages": stages,
+        "docs_examined": stats.get('totalDocsExamined'),
+        "keys_examined": stats.get('totalKeysExamined'),
+        "returned": stats.get('nReturned'),
+        "millis": stats.get('executionTimeMillis'),
+    }
+    log_callback(f"Message query plan: {' <- '.join(stages) or 'unknown'}"
+                 f" (docs examined: {summary['docs_examined']}, keys examined: {summary['keys_examined']}, "
+                 f"returned: {summary['returned']}, {summary['millis']} ms)")
+    if 'COLLSCAN' in stages:
+        log_callback(warning("Warning: The message lookup is a collection scan."))
+    return summary
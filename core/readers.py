@@ -0,0 +1,135 @@
+from itertools import islice
+
+import pymongo
+
+from core.queries import CONVERSATION_PROJECTION, MESSAGE_PROJECTION
+
+DEFAULT_BATCH_SIZE = 1000
+# Messages fetched per round-trip when streaming, so only a few are decoded at a time.
+STREAM_MESSAGE_BATCH_SIZE = 16
+
+
+def iter_conversations_per_query(mongo_db, conv_filter=None, batch_size=DEFAULT_BATCH_SIZE,
+                                 conv_projection=CONVERSATION_PROJECTION, msg_projection=MESSAGE_PROJECTION):
+    """
+    Yields (conversation, messages) pairs, issuing one sorted messages query per conversation.
+    This is the original N+1 read path, kept for comparison and as a fallback.
+    """
+    librechat_msg_collection = mongo_db["messages"]
+    for conv in mongo_db["conversations"].find(conv_filter or {}, conv_projection, batch_size=batch_size):
+        messages = list(librechat_msg_collection.find(
+            {'conversationId': conv.get('conversationId')}, msg_projection
+        ).sort('createdAt', pymongo.ASCENDING))
+        yield conv, messages
+
+
+def iter_conversations_grouped(mongo_db, conv_filter=None, batch_size=DEFAULT_BATCH_SIZE,
+                               conv_projection=CONVERSATION_PROJECTION, msg_projection=MESSAGE_PROJECTION):
+    """
+    Yields (conversation, messages) pairs by merging two sorted cursors:
+    conversations sorted by conversationId, and the whole messages collection
+    sorted by (conversationId, createdAt). The number of round-trips depends on
+    the batch count, not on the number of conversations.
+    """
+    conv_cursor = mongo_db["conversations"].find(
+        conv_filter or {},
+        conv_projection,
+        sort=[('conversationId', pymongo.ASCENDING)],
+        batch_size=batch_size,
+        allow_disk_use=True,
+    )
+    msg_cursor = mongo_db["messages"].find(
+        {'conversationId': {'$type': 'string'}},
+        msg_projection,
+        sort=[('conversationId', pymongo.ASCENDING), ('createdAt', pymongo.ASCENDING)],
+        batch_size=batch_size,
+        allow_disk_use=True,
+    )
+
+    pending = next(msg_cursor, None)
+    for conv in conv_cursor:
+        conv_id = conv.get('conversationId')
+        if not isinstance(conv_id, str):
+            yield conv, []
+            continue
+
+        # Skip messages that belong to conversations not selected by conv_filter (or orphans).
+        while pending is not None and pending['conversationId'] < conv_id:
+            pending = next(msg_cursor, None)
+
+        messages = []
+        while pending is not None and pending['conversationId'] == conv_id:
+            messages.append(pending)
+            pending = next(msg_cursor, None)
+        yield conv, messages
+
+    msg_cursor.close()
+
+
+def iter_conversations_batched(mongo_db, conv_filter=None, batch_size=DEFAULT_BATCH_SIZE,
+                               conv_projection=CONVERSATION_PROJECTION, msg_projection=MESSAGE_PROJECTION):
+    """
+    Yields (conversation, messages) pairs, reading conversations in chunks of
+    batch_size and fetching the messages of each chunk with a single $in query.
+    Suited to selective conv_filters, where streaming the whole messages
+    collection would read far more than needed.
+    """
+    librechat_msg_collection = mongo_db["messages"]
+    conv_cursor = mongo_db["conversations"].find(conv_filter or {}, conv_projection, batch_size=batch_size)
+
+    while True:
+        chunk = list(islice(conv_cursor, batch_size))
+        if not chunk:
+            break
+        conv_ids = [conv.get('conversationId') for conv in chunk if isinstance(conv.get('conversationId'), str)]
+        messages_by_conv = {}
+        if conv_ids:
+            for msg in librechat_msg_collection.find(
+                {'conversationId': {'$in': conv_ids}},
+                msg_projection,
+                sort=[('conversationId', pymongo.ASCENDING), ('createdAt', pymongo.ASCENDING)],
+                batch_size=batch_size,
+                allow_disk_use=True,
+            ):
+                messages_by_conv.setdefault(msg['conversationId'], []).append(msg)
+        for conv in chunk:
+            yield conv, messages_by_conv.pop(conv.get('conversationId'), [])
+
+
+def iter_conversations_streamed(mongo_db, conv_filter=None, batch_size=DEFAULT_BATCH_SIZE,
+                                conv_projection=CONVERSATION_PROJECTION, msg_projection=MESSAGE_PROJECTION,
+                                message_batch_size=STREAM_MESSAGE_BATCH_SIZE):
+    """
+    Yields (conversation, messages) pairs where messages is a lazy cursor
+    sorted by createdAt that fetches message_batch_size documents at a time.
+    Each cursor must be consumed (or closed) before advancing to the next pair.
+    """
+    librechat_msg_collection = mongo_db["messages"]
+    for conv in mongo_db["conversations"].find(conv_filter or {}, conv_projection, batch_size=batch_size):
+        yield conv, librechat_msg_collection.find(
+            {'conversationId': conv.get('conversationId')}, msg_projection, batch_size=message_batch_size,
+        ).sort('createdAt', pymongo.ASCENDING)
+
+
+READ_MODES = {
+    "grouped": iter_conversations_grouped,
+    "batched": iter_conversations_batched,
+    "per_conversation": iter_conversations_per_query,
+}
+
+
+def iter_conversations_with_messages(mongo_db, read_mode="auto", conv_filter=None, batch_size=DEFAULT_BATCH_SIZE,
+                                     conv_projection=CONVERSATION_PROJECTION, msg_projection=MESSAGE_PROJECTION):
+    """
+    Dispatches to the read path selected by read_mode. "auto" streams the whole
+    messages collection when there is no conv_filter and batches $in lookups otherwise.
+    Only the fields in the projections are fetched.
+    """
+    if read_mode == "auto":
+        read_mode = "batched" if conv_filter else "grouped"
+    try:
+        reader = READ_MODES[read_mode]
+    except KeyError:
+        raise ValueError(f"Unknown read mode '{read_mode}'. Expected one of: {', '.join(READ_MODES)}")
+    return reader(mongo_db, conv_filter=conv_filter, batch_size=batch_size,
+                  conv_projection=conv_projection, msg_projection=msg_projection)
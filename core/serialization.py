@@ -0,0 +1,121 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENCODERS = ("auto", "orjson", "stdlib")
+
+_COMPACT_SEPARATORS = (',', ':')
+# orjson would write datetimes as ISO strings where json.dumps raises TypeError;
+# passing them through makes both encoders reject them the same way.
+_ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME if orjson is not None else 0
+
+
+def encoder_name(encoder="auto"):
+    """Returns the encoder actually used for the given choice ("orjson" or "stdlib")."""
+    if encoder not in ENCODERS:
+        raise ValueError(f"Unknown JSON encoder '{encoder}'. Expected one of: {', '.join(ENCODERS)}")
+    if encoder == "stdlib" or orjson is None:
+        if encoder == "orjson":
+            raise ValueError("The orjson encoder was requested but orjson is not installed.")
+        return "stdlib"
+    return "orjson"
+
+
+def dumps_bytes(obj, pretty=False, encoder="auto"):
+    """
+    Serializes obj to UTF-8 JSON bytes, using orjson when it is installed and
+    the standard library otherwise. Output is compact unless pretty is set, in
+    which case it is indented by two spaces. Values orjson refuses (e.g.
+    integers beyond 64 bits) fall back to the standard library; datetimes
+    raise TypeError with either encoder.
+    """
+    if encoder_name(encoder) == "orjson":
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if pretty else 0))
+        except TypeError:
+            pass
+    return _stdlib_dumps(obj, pretty).encode('utf-8')
+
+
+def dumps(obj, pretty=False, encoder="auto"):
+    """Like dumps_bytes, but returns a str (e.g. for SQLite TEXT columns)."""
+    if encoder_name(encoder) == "orjson":
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if pretty else 0)).decode('utf-8')
+        except TypeError:
+            pass
+    return _stdlib_dumps(obj, pretty)
+
+
+def utf8_length(text):
+    """Length in bytes of text encoded as UTF-8; ASCII-only text is not encoded."""
+    return len(text) if text.isascii() else len(text.encode('utf-8', 'surrogatepass'))
+
+
+def loads(data):
+    """Parses JSON from str or bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj, pretty):
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    return json.dumps(obj, ensure_ascii=False, separators=_COMPACT_SEPARATORS)
+
+
+def dump_to_file(obj, path, pretty=False, encoder="auto"):
+    """Writes obj as JSON to path."""
+    with open(path, 'wb') as f:
+        f.write(dumps_bytes(obj, pretty=pretty, encoder=encoder))
+
+
+class JsonArrayWriter:
+    """
+    Writes a JSON array to path one item at a time, so the items never have to
+    be held in memory together. The file is written as path + ".partial" and
+    renamed into place when the writer is closed without an error. Use as a
+    context manager:
+
+        with JsonArrayWriter(path) as writer:
+            writer.write(item)
+    """
+
+    def __init__(self, path, pretty=False, encoder="auto"):
+        self.path = path
+        self.pretty = pretty
+        self.encoder = encoder
+        self.count = 0
+        self.bytes_written = 0
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path + ".partial", 'wb')
+        self._write(b"[")
+        return self
+
+    def write(self, item):
+        separator = b"," if self.count else b""
+        if self.pretty:
+            separator += b"\n"
+        self._write(separator + dumps_bytes(item, pretty=self.pretty, encoder=self.encoder))
+        self.count += 1
+
+    def _write(self, data):
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._write(b"\n]" if self.pretty and self.count else b"]")
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.path + ".partial", self.path)
+        else:
+            os.remove(self.path + ".partial")
+        return False
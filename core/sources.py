@@ -0,0 +1,481 @@
+import mmap
+import os
+import random
+from array import array
+from datetime import datetime, timezone
+
+import bson
+import pymongo
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+from core.mongo import get_mongo_db, release_mongo_client
+from core.queries import (
+    CONVERSATION_PROJECTION, FILE_PROJECTION, PRESET_PROJECTION, USER_PROJECTION, check_indexes, explain_message_query,
+)
+from core.readers import DEFAULT_BATCH_SIZE, iter_conversations_streamed, iter_conversations_with_messages
+from core.time_utils import FALLBACK_PARENT, convert_mongodb_time_to_epoch_seconds
+
+# Decode datetimes as aware UTC values so they compare with the datetimes used in filters.
+_DECODE_OPTIONS = CodecOptions(tz_aware=True)
+_RAW_OPTIONS = CodecOptions(document_class=RawBSONDocument, tz_aware=True)
+_MISSING_TIME = float("-inf")
+
+
+def _created_at_key(value, ordinal):
+    """
+    Sort key for a message's createdAt that works for mixed datetimes, ISO
+    strings and bad values: epoch seconds (fractional for datetimes), with
+    missing or unparseable values first, like MongoDB's ascending sort, and
+    ties kept in file order.
+    """
+    if isinstance(value, datetime):
+        # Naive datetimes (pymongo's default) are UTC.
+        seconds = (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    elif value is None:
+        seconds = _MISSING_TIME
+    else:
+        seconds = convert_mongodb_time_to_epoch_seconds(value, fallback=FALLBACK_PARENT, parent=_MISSING_TIME)
+    return seconds, ordinal
+
+
+class MongoSource:
+    """
+    Reads LibreChat data from a live MongoDB database. mongo_client, if
+    given, is owned by the source and closed with it. shared_client is a
+    client held from core.mongo (as in open_source); closing the source
+    releases it instead of closing it.
+    """
+
+    def __init__(self, mongo_db, mongo_client=None, shared_client=None):
+        self.mongo_db = mongo_db
+        self.mongo_client = mongo_client
+        self.shared_client = shared_client
+        self.description = f"MongoDB database '{mongo_db.name}'"
+
+    def iter_conversations_with_messages(self, read_mode="auto", conv_filter=None, batch_size=DEFAULT_BATCH_SIZE):
+        return iter_conversations_with_messages(self.mongo_db, read_mode=read_mode, conv_filter=conv_filter,
+                                                batch_size=batch_size)
+
+    def iter_conversations_streamed(self, conv_filter=None, batch_size=DEFAULT_BATCH_SIZE):
+        return iter_conversations_streamed(self.mongo_db, conv_filter=conv_filter, batch_size=batch_size)
+
+    def count_conversations(self, conv_filter=None, exact=False):
+        """Returns the number of conversations matching conv_filter (estimated from metadata unless filtered or exact)."""
+        if not conv_filter and not exact:
+            return self.mongo_db["conversations"].estimated_document_count()
+        return self.mongo_db["conversations"].count_documents(conv_filter or {})
+
+    def count_presets(self, preset_filter=None, exact=False):
+        if not preset_filter and not exact:
+            return self.mongo_db["presets"].estimated_document_count()
+        return self.mongo_db["presets"].count_documents(preset_filter or {})
+
+    def iter_presets(self, preset_filter=None):
+        return self.mongo_db["presets"].find(preset_filter or {}, PRESET_PROJECTION)
+
+    def iter_users(self):
+        return self.mongo_db["users"].find({}, USER_PROJECTION)
+
+    def count_files(self, file_filter=None):
+        if not file_filter:
+            return self.mongo_db["files"].estimated_document_count()
+        return self.mongo_db["files"].count_documents(file_filter)
+
+    def iter_files(self, file_filter=None):
+        return self.mongo_db["files"].find(file_filter or {}, FILE_PROJECTION)
+
+    def count_conversations_by_user(self, conv_filter=None):
+        """Returns a dict of LibreChat user id -> number of conversations matching conv_filter."""
+        pipeline = [{'$group': {'_id': '$user', 'count': {'$sum': 1}}}]
+        if conv_filter:
+            pipeline.insert(0, {'$match': conv_filter})
+        return {str(row['_id']): row['count']
+                for row in self.mongo_db["conversations"].aggregate(pipeline) if row['_id'] is not None}
+
+    def collection_stats(self, name):
+        """Returns {"count", "size", "avg_obj_size"} of a collection from collStats, or None if unavailable."""
+        try:
+            stats = self.mongo_db.command({'collStats': name})
+        except (pymongo.errors.PyMongoError, NotImplementedError, TypeError):
+            return None
+        return {"count": stats.get('count'), "size": stats.get('size'), "avg_obj_size": stats.get('avgObjSize')}
+
+    def sample_conversations(self, conv_filter=None, size=200, batch_size=DEFAULT_BATCH_SIZE):
+        """Returns a random sample of up to size (conversation, messages) pairs matching conv_filter, read in batches."""
+        pipeline = [{'$sample': {'size': size}}, {'$project': CONVERSATION_PROJECTION}]
+        if conv_filter:
+            pipeline.insert(0, {'$match': conv_filter})
+        conv_ids = [conv.get('conversationId') for conv in self.mongo_db["conversations"].aggregate(pipeline)]
+        if not conv_ids:
+            return []
+        return list(iter_conversations_with_messages(self.mongo_db, read_mode="batched",
+                                                     conv_filter={'conversationId': {'$in': conv_ids}},
+                                                     batch_size=batch_size))
+
+    def message_bytes(self, conv_ids):
+        """Returns the total stored ($bsonSize) bytes of the given conversations' messages, or None if unsupported."""
+        pipeline = [
+            {'$match': {'conversationId': {'$in': list(conv_ids)}}},
+            {'$group': {'_id': None, 'bytes': {'$sum': {'$bsonSize': '$$ROOT'}}}},
+        ]
+        try:
+            rows = list(self.mongo_db["messages"].aggregate(pipeline))
+        except pymongo.errors.PyMongoError:
+            return None
+        return rows[0]['bytes'] if rows else 0
+
+    def prepare(self, create_indexes=False, explain=True, log_callback=print):
+        """Verifies (and optionally creates) the indexes the migration relies on and logs the query plan."""
+        check_indexes(self.mongo_db, create=create_indexes, log_callback=log_callback)
+        if explain:
+            explain_message_query(self.mongo_db, log_callback=log_callback)
+
+    def close(self):
+        if self.mongo_client is not None:
+            self.mongo_client.close()
+        if self.shared_client is not None:
+            release_mongo_client(self.shared_client)
+            self.shared_client = None
+
+
+def _match_condition(value, condition):
+    if isinstance(condition, dict) and any(key.startswith('$') for key in condition):
+        for op, operand in condition.items():
+            if op == '$in':
+                matched = value in operand
+            elif op == '$nin':
+                matched = value not in operand
+            elif op == '$ne':
+                matched = value != operand
+            elif op == '$exists':
+                matched = (value is not None) == bool(operand)
+            elif op in ('$gt', '$gte', '$lt', '$lte'):
+                if value is None:
+                    return False
+                try:
+                    matched = {
+                        '$gt': value > operand,
+                        '$gte': value >= operand,
+                        '$lt': value < operand,
+                        '$lte': value <= operand,
+                    }[op]
+                except TypeError:
+                    return False
+            else:
+                raise ValueError(f"Unsupported query operator for BSON dump sources: {op}")
+            if not matched:
+                return False
+        return True
+    return value == condition
+
+
+def _pinned_users(query):
+    """The user ids a conversation query restricts 'user' to, or None when conversations of any user can match."""
+    if not query:
+        return None
+    condition = query.get('user')
+    if isinstance(condition, str):
+        return [condition]
+    if isinstance(condition, dict) and set(condition) == {'$in'}:
+        return [str(user) for user in condition['$in']]
+    for sub_query in query.get('$and', ()):
+        users = _pinned_users(sub_query)
+        if users is not None:
+            return users
+    return None
+
+
+def match_filter(doc, query):
+    """
+    Evaluates a MongoDB-style query against a decoded document. Supports the
+    subset used by this tool: field equality, $in, $nin, $ne, $exists, range
+    comparisons, $and and $or.
+    """
+    if not query:
+        return True
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(match_filter(doc, sub) for sub in condition):
+                return False
+        elif key == '$or':
+            if not any(match_filter(doc, sub) for sub in condition):
+                return False
+        elif not _match_condition(doc.get(key), condition):
+            return False
+    return True
+
+
+class _BsonFile:
+    """A memory-mapped .bson file from mongodump, read one document at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._file = open(path, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def iter_offsets(self):
+        """Yields (offset, length) of each document in file order."""
+        if self._map is None:
+            return
+        size = len(self._map)
+        offset = 0
+        while offset + 4 <= size:
+            length = int.from_bytes(self._map[offset:offset + 4], 'little')
+            if length < 5 or offset + length > size:
+                raise ValueError(f"Corrupt BSON document at offset {offset} in {self.path}")
+            yield offset, length
+            offset += length
+
+    def length(self, offset):
+        return int.from_bytes(self._map[offset:offset + 4], 'little')
+
+    def read(self, offset, codec_options=_DECODE_OPTIONS):
+        length = self.length(offset)
+        return bson.decode(self._map[offset:offset + length], codec_options)
+
+    def count(self):
+        """Counts documents by walking the length prefixes, without decoding them."""
+        return sum(1 for _offset in self.iter_offsets())
+
+    def __iter__(self):
+        for offset, _length in self.iter_offsets():
+            yield self.read(offset)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+
+def resolve_dump_dir(path, db_name):
+    """
+    Finds the directory holding conversations.bson. Accepts either that
+    directory itself or any parent of it, e.g. a backup directory
+    containing mongo_dump/<db_name>/.
+    """
+    if os.path.exists(os.path.join(path, "conversations.bson")):
+        return path
+    for root, _dirs, files in os.walk(path):
+        if "conversations.bson" in files and os.path.basename(root) == db_name:
+            return root
+    for root, _dirs, files in os.walk(path):
+        if "conversations.bson" in files:
+            return root
+    return None
+
+
+class BsonDumpSource:
+    """
+    Reads LibreChat data from a mongodump directory without a database.
+
+    The .bson files are memory-mapped and decoded one document at a time. On
+    first use, messages.bson is scanned once to build a compact in-memory index
+    of conversationId -> message offsets, so the messages of a conversation are
+    read directly instead of scanning the file again. Likewise, conversation
+    offsets are grouped by user once, so queries limited to a few users (such
+    as migrate_users' partitions) only decode those users' conversations.
+    """
+
+    def __init__(self, dump_dir):
+        self.dump_dir = dump_dir
+        self.description = f"mongodump directory '{dump_dir}'"
+        self._conversations = _BsonFile(os.path.join(dump_dir, "conversations.bson"))
+        self._messages = _BsonFile(os.path.join(dump_dir, "messages.bson"))
+        self._presets = _BsonFile(os.path.join(dump_dir, "presets.bson"))
+        self._users = _BsonFile(os.path.join(dump_dir, "users.bson"))
+        self._files = _BsonFile(os.path.join(dump_dir, "files.bson"))
+        self._message_index = None
+        self._user_index = None
+
+    def _build_message_index(self):
+        index = {}
+        for offset, length in self._messages.iter_offsets():
+            raw = self._messages.read(offset, _RAW_OPTIONS)
+            conv_id = raw.get('conversationId')
+            if not isinstance(conv_id, str):
+                continue
+            offsets = index.get(conv_id)
+            if offsets is None:
+                offsets = index[conv_id] = array('Q')
+            offsets.append(offset)
+        return index
+
+    def _build_user_index(self):
+        index = {}
+        for offset, _length in self._conversations.iter_offsets():
+            user = self._conversations.read(offset, _RAW_OPTIONS).get('user')
+            if user is None:
+                continue
+            offsets = index.get(str(user))
+            if offsets is None:
+                offsets = index[str(user)] = array('Q')
+            offsets.append(offset)
+        return index
+
+    def _iter_conversations(self, conv_filter=None):
+        """Yields the conversations matching conv_filter in file order, reading only pinned users' slices."""
+        users = _pinned_users(conv_filter)
+        if users is None:
+            offsets = (offset for offset, _length in self._conversations.iter_offsets())
+        else:
+            if self._user_index is None:
+                self._user_index = self._build_user_index()
+            offsets = sorted(offset for user in set(users) for offset in self._user_index.get(user, ()))
+        for offset in offsets:
+            conv = self._conversations.read(offset)
+            if match_filter(conv, conv_filter):
+                yield conv
+
+    def messages_for(self, conv_id):
+        """Returns the messages of a conversation sorted by createdAt."""
+        if self._message_index is None:
+            self._message_index = self._build_message_index()
+        offsets = self._message_index.get(conv_id, ())
+        keyed = []
+        for ordinal, offset in enumerate(offsets):
+            msg = self._messages.read(offset)
+            keyed.append((_created_at_key(msg.get('createdAt'), ordinal), msg))
+        keyed.sort(key=lambda pair: pair[0])
+        return [msg for _key, msg in keyed]
+
+    def iter_messages_for(self, conv_id):
+        """Like messages_for, but decodes one message at a time; only (createdAt, offset) pairs are kept."""
+        if self._message_index is None:
+            self._message_index = self._build_message_index()
+        keyed = [(_created_at_key(self._messages.read(offset, _RAW_OPTIONS).get('createdAt'), ordinal), offset)
+                 for ordinal, offset in enumerate(self._message_index.get(conv_id, ()))]
+        keyed.sort()
+        for _key, offset in keyed:
+            yield self._messages.read(offset)
+
+    def iter_conversations_with_messages(self, read_mode="auto", conv_filter=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Yields (conversation, messages) pairs. read_mode and batch_size only apply to MongoDB sources."""
+        for conv in self._iter_conversations(conv_filter):
+            yield conv, self.messages_for(conv.get('conversationId'))
+
+    def iter_conversations_streamed(self, conv_filter=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Yields (conversation, messages) pairs with messages decoded lazily (see iter_messages_for)."""
+        for conv in self._iter_conversations(conv_filter):
+            yield conv, self.iter_messages_for(conv.get('conversationId'))
+
+    def count_conversations(self, conv_filter=None, exact=False):
+        """
+        Returns the number of conversations. With a filter this requires
+        decoding every conversation, so it returns None unless exact is set.
+        """
+        if not conv_filter:
+            return self._conversations.count()
+        if not exact:
+            return None
+        return sum(1 for _conv in self._iter_conversations(conv_filter))
+
+    def count_presets(self, preset_filter=None, exact=False):
+        if not preset_filter:
+            return self._presets.count()
+        if not exact:
+            return None
+        return sum(1 for preset in self._presets if match_filter(preset, preset_filter))
+
+    def iter_presets(self, preset_filter=None):
+        return (preset for preset in self._presets if match_filter(preset, preset_filter))
+
+    def iter_users(self):
+        return iter(self._users)
+
+    def count_files(self, file_filter=None):
+        if not file_filter:
+            return self._files.count()
+        return None
+
+    def iter_files(self, file_filter=None):
+        return (record for record in self._files if match_filter(record, file_filter))
+
+    def collection_stats(self, name):
+        """Returns {"count", "size", "avg_obj_size"} of a dumped collection, from its .bson file."""
+        bson_file = {"conversations": self._conversations, "messages": self._messages,
+                     "presets": self._presets, "users": self._users, "files": self._files}.get(name)
+        if bson_file is None:
+            return None
+        count = bson_file.count()
+        size = os.path.getsize(bson_file.path) if os.path.exists(bson_file.path) else 0
+        return {"count": count, "size": size, "avg_obj_size": size / count if count else 0}
+
+    def sample_conversations(self, conv_filter=None, size=200, batch_size=DEFAULT_BATCH_SIZE):
+        """Returns a random sample (reservoir sampling, fixed seed) of up to size (conversation, messages) pairs."""
+        rng = random.Random(0)
+        sample = []
+        seen = 0
+        for conv in self._iter_conversations(conv_filter):
+            seen += 1
+            if len(sample) < size:
+                sample.append(conv)
+            else:
+                index = rng.randrange(seen)
+                if index < size:
+                    sample[index] = conv
+        return [(conv, self.messages_for(conv.get('conversationId'))) for conv in sample]
+
+    def message_bytes(self, conv_ids):
+        """Returns the total BSON bytes of the given conversations' messages, from the dump's length prefixes."""
+        if self._message_index is None:
+            self._message_index = self._build_message_index()
+        return sum(self._messages.length(offset)
+                   for conv_id in conv_ids for offset in self._message_index.get(conv_id, ()))
+
+    def count_conversations_by_user(self, conv_filter=None):
+        """Returns a dict of LibreChat user id -> number of conversations matching conv_filter."""
+        if self._user_index is None:
+            self._user_index = self._build_user_index()
+        if not conv_filter:
+            return {user: len(offsets) for user, offsets in self._user_index.items()}
+        counts = {}
+        for conv in self._iter_conversations(conv_filter):
+            user = conv.get('user')
+            if user is not None:
+                counts[str(user)] = counts.get(str(user), 0) + 1
+        return counts
+
+    def prepare(self, create_indexes=False, explain=True, log_callback=print):
+        """
+        Dump files have no indexes to check. Builds the message and user
+        indexes up front so that concurrent readers (e.g. per-user partitions)
+        share them.
+        """
+        if self._message_index is None:
+            self._message_index = self._build_message_index()
+        if self._user_index is None:
+            self._user_index = self._build_user_index()
+
+    def close(self):
+        self._conversations.close()
+        self._messages.close()
+        self._presets.close()
+        self._users.close()
+        self._files.close()
+
+
+def open_source(dump_dir=None, db_name=None, log_callback=print):
+    """
+    Returns a BsonDumpSource when dump_dir is given, otherwise a MongoSource
+    on the shared client from core.mongo.get_mongo_db. Returns None if the source cannot be opened.
+    """
+    if dump_dir:
+        resolved = resolve_dump_dir(dump_dir, db_name or "LibreChat")
+        if not resolved:
+            log_callback(f"Error: No conversations.bson found under '{dump_dir}'.")
+            if any(name.endswith(".archive.gz") for _root, _dirs, files in os.walk(dump_dir) for name in files):
+                log_callback("  This looks like a streamed backup of mongodump archives. Restore it with "
+                             "`mongorestore --archive=<file> --gzip` (see plan_restore) and migrate from MongoDB.")
+            return None
+        log_callback(f"Reading from mongodump directory: {resolved}")
+        return BsonDumpSource(resolved)
+
+    mongo_db, mongo_client = get_mongo_db(log_callback)
+    if mongo_db is None:
+        return None
+    return MongoSource(mongo_db, shared_client=mongo_client)
@@ -0,0 +1,220 @@
+import sqlite3
+import time
+
+from core.log import error, warning
+
+CHAT_INSERT_SQL = """
+INSERT INTO chat (id, user_id, title, archived, created_at, updated_at, chat, pinned, meta, folder_id)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+CHAT_UPSERT_SQL = CHAT_INSERT_SQL + """
+ON CONFLICT(id) DO UPDATE SET
+    title = excluded.title,
+    updated_at = excluded.updated_at,
+    chat = excluded.chat
+"""
+
+# Same statements with the chat column reserved as a zero-filled TEXT value of the given length,
+# to be filled in afterwards with write_text_incrementally.
+CHAT_STREAM_INSERT_SQL = CHAT_INSERT_SQL.replace("?, ?, ?, ?)", "CAST(zeroblob(?) AS TEXT), ?, ?, ?)")
+CHAT_STREAM_UPSERT_SQL = CHAT_UPSERT_SQL.replace("?, ?, ?, ?)", "CAST(zeroblob(?) AS TEXT), ?, ?, ?)")
+
+MODEL_UPSERT_SQL = """
+INSERT INTO model (id, user_id, base_model_id, name, params, meta, access_control, is_active, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    base_model_id = excluded.base_model_id,
+    name = excluded.name,
+    params = excluded.params,
+    meta = excluded.meta,
+    is_active = excluded.is_active,
+    updated_at = excluded.updated_at
+"""
+
+FILE_INSERT_SQL = """
+INSERT INTO file (id, user_id, hash, filename, path, data, meta, access_control, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO NOTHING
+"""
+
+DEFAULT_BATCH_ROWS = 500
+DEFAULT_BATCH_BYTES = 32 * 1024 * 1024
+
+# Seconds a connection waits for another writer's lock (e.g. concurrent per-user partitions).
+DEFAULT_BUSY_TIMEOUT = 60.0
+
+# PRAGMAs applied for the duration of a bulk import. cache_size is negative, i.e. in KiB.
+FAST_IMPORT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -256 * 1024,
+    "mmap_size": 1024 * 1024 * 1024,
+}
+
+
+def write_text_incrementally(sqlite_conn, table, column, rowid, chunks):
+    """
+    Writes UTF-8 chunks into a TEXT value reserved with CAST(zeroblob(n) AS TEXT),
+    using incremental blob I/O so the whole value is never held in memory.
+    Python builds without Connection.blobopen (before 3.11) bind it in one piece.
+    """
+    if not hasattr(sqlite_conn, "blobopen"):
+        value = b"".join(chunks).decode("utf-8")
+        sqlite_conn.execute(f"UPDATE {table} SET {column} = ? WHERE rowid = ?", (value, rowid))
+        return
+    with sqlite_conn.blobopen(table, column, rowid) as blob:
+        for chunk in chunks:
+            blob.write(chunk)
+
+
+def _row_size(params):
+    """Approximate size in bytes of a row of parameters."""
+    size = 0
+    for value in params:
+        if isinstance(value, (str, bytes)):
+            size += len(value)
+        else:
+            size += 8
+    return size
+
+
+class BulkWriter:
+    """
+    Buffers rows and writes them with executemany, committing once per batch.
+
+    A batch is flushed when it reaches batch_rows rows or batch_bytes bytes. Each
+    row may carry extra (sql, params) statements that are written in the same
+    transaction, e.g. ledger entries that must never outlive their chat row. When
+    fast_pragmas is set, the PRAGMAs in FAST_IMPORT_PRAGMAS are applied on enter
+    and the original values are restored on exit. If a core.metrics.Metrics is
+    given, insert and commit times are recorded as the "sqlite_insert" and
+    "commit" stages. Use as a context manager:
+
+        with BulkWriter(conn, CHAT_INSERT_SQL) as writer:
+            writer.add(params)
+    """
+
+    def __init__(self, sqlite_conn, sql, batch_rows=DEFAULT_BATCH_ROWS, batch_bytes=DEFAULT_BATCH_BYTES,
+                 fast_pragmas=True, log_callback=print, metrics=None):
+        self.sqlite_conn = sqlite_conn
+        self.sql = sql
+        self.batch_rows = max(1, batch_rows)
+        self.batch_bytes = max(1, batch_bytes)
+        self.fast_pragmas = fast_pragmas
+        self.log_callback = log_callback
+        self.metrics = metrics
+        self.written_count = 0
+        self.failed_count = 0
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._original_pragmas = {}
+
+    def __enter__(self):
+        if self.fast_pragmas:
+            self.apply_pragmas(FAST_IMPORT_PRAGMAS)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+            else:
+                self._buffer.clear()
+                self._buffer_bytes = 0
+                self.sqlite_conn.rollback()
+        finally:
+            if self._original_pragmas:
+                self.apply_pragmas(self._original_pragmas, remember=False)
+        return False
+
+    def apply_pragmas(self, pragmas, remember=True):
+        """Sets each PRAGMA, remembering the previous value so it can be restored."""
+        # journal_mode cannot change inside a transaction.
+        self.sqlite_conn.commit()
+        for name, value in pragmas.items():
+            try:
+                if remember and name not in self._original_pragmas:
+                    row = self.sqlite_conn.execute(f"PRAGMA {name}").fetchone()
+                    if row is not None:
+                        self._original_pragmas[name] = row[0]
+                self.sqlite_conn.execute(f"PRAGMA {name}={value}")
+            except sqlite3.Error as e:
+                self.log_callback(warning(f"  Warning: Could not set PRAGMA {name}={value}: {e}"))
+
+    def add(self, params, extra=()):
+        """Buffers one row (plus its extra statements), flushing if the batch is full."""
+        self._buffer.append((params, tuple(extra)))
+        self._buffer_bytes += _row_size(params)
+        if len(self._buffer) >= self.batch_rows or self._buffer_bytes >= self.batch_bytes:
+            self.flush()
+
+    def add_streamed(self, sql, params, write_value, extra=()):
+        """
+        Writes one row on its own, for values too large to bind at once: sql
+        inserts the row with a placeholder, then write_value(sqlite_conn) fills
+        it in (see write_text_incrementally) in the same transaction. Pending
+        batched rows are flushed first.
+        """
+        self.flush()
+        try:
+            start = time.perf_counter()
+            self.sqlite_conn.execute(sql, params)
+            write_value(self.sqlite_conn)
+            for extra_sql, extra_params in extra:
+                self.sqlite_conn.execute(extra_sql, extra_params)
+            inserted = time.perf_counter()
+            self.sqlite_conn.commit()
+            if self.metrics is not None:
+                self.metrics.add_time("sqlite_insert", inserted - start)
+                self.metrics.add_time("commit", time.perf_counter() - inserted)
+        except sqlite3.Error as e:
+            self.sqlite_conn.rollback()
+            self.log_callback(error(f"  Error inserting row {params[0]}: {e}"))
+            self.failed_count += 1
+            return 0
+        self.written_count += 1
+        return 1
+
+    def flush(self):
+        """Writes and commits the buffered rows. Returns the number of rows written."""
+        if not self._buffer:
+            return 0
+        rows = self._buffer
+        self._buffer = []
+        self._buffer_bytes = 0
+        try:
+            start = time.perf_counter()
+            self.sqlite_conn.executemany(self.sql, [params for params, _extra in rows])
+            extra_by_sql = {}
+            for _params, extra in rows:
+                for sql, extra_params in extra:
+                    extra_by_sql.setdefault(sql, []).append(extra_params)
+            for sql, extra_rows in extra_by_sql.items():
+                self.sqlite_conn.executemany(sql, extra_rows)
+            inserted = time.perf_counter()
+            self.sqlite_conn.commit()
+            if self.metrics is not None:
+                self.metrics.add_time("sqlite_insert", inserted - start)
+                self.metrics.add_time("commit", time.perf_counter() - inserted)
+            written = len(rows)
+        except sqlite3.Error as e:
+            # One bad row fails the whole batch; retry row by row so only that row is lost.
+            self.sqlite_conn.rollback()
+            self.log_callback(warning(f"  Batch insert failed ({e}), retrying {len(rows)} rows individually..."))
+            written = 0
+            for params, extra in rows:
+                self.sqlite_conn.execute("SAVEPOINT bulk_writer_row")
+                try:
+                    self.sqlite_conn.execute(self.sql, params)
+                    for sql, extra_params in extra:
+                        self.sqlite_conn.execute(sql, extra_params)
+                    written += 1
+                except sqlite3.Error as row_error:
+                    self.sqlite_conn.execute("ROLLBACK TO bulk_writer_row")
+                    self.log_callback(error(f"  Error inserting row {params[0]}: {row_error}"))
+                    self.failed_count += 1
+                self.sqlite_conn.execute("RELEASE bulk_writer_row")
+            self.sqlite_conn.commit()
+        self.written_count += written
+        return written
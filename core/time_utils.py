@@ -1,24 +1,109 @@
 from datetime import datetime, timezone
+from functools import lru_cache
 import time
 
-def convert_mongodb_time_to_epoch_seconds(mongo_time):
-    """Converts MongoDB's ISODate object or string to Unix epoch seconds (integer)."""
-    if isinstance(mongo_time, dict) and '$date' in mongo_time:
-        ts_str = mongo_time['$date']
-    elif isinstance(mongo_time, str):
-        ts_str = mongo_time
-    elif isinstance(mongo_time, datetime):
-        if mongo_time.tzinfo is None:
-            mongo_time = mongo_time.replace(tzinfo=timezone.utc)
-        else:
-            mongo_time = mongo_time.astimezone(timezone.utc)
-        return int(mongo_time.timestamp())
-    else:
-        print(f"  Warning: Unrecognized time format: {mongo_time}, using current time.")
-        return int(time.time())
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FALLBACK_NOW = "now"
+FALLBACK_PARENT = "parent"
+FALLBACK_RAISE = "raise"
+FALLBACKS = (FALLBACK_NOW, FALLBACK_PARENT, FALLBACK_RAISE)
+
+# Counter incremented in the counters dict passed to the converters for every unparseable value.
+INVALID_TIMESTAMPS = "invalid_timestamps"
+
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_ISO_CACHE_SIZE = 65536
+# Below this many values, numpy's array setup costs more than it saves.
+_NUMPY_MIN_BATCH = 64
+
+
+class TimestampConversionError(ValueError):
+    """Raised for an unparseable timestamp when the fallback is FALLBACK_RAISE."""
+
+
+def _datetime_to_epoch(dt):
+    # Naive datetimes (pymongo's default) are UTC.
+    if dt.tzinfo is None:
+        return int((dt - _EPOCH_NAIVE).total_seconds())
+    return int(dt.timestamp())
+
+
+@lru_cache(maxsize=_ISO_CACHE_SIZE)
+def _parse_iso(ts_str):
+    dt_object = datetime.fromisoformat(ts_str.replace('Z', '+00:00'))
+    return _datetime_to_epoch(dt_object)
+
+
+def _fallback(mongo_time, fallback, parent, counters):
+    if counters is not None:
+        counters[INVALID_TIMESTAMPS] = counters.get(INVALID_TIMESTAMPS, 0) + 1
+    if fallback == FALLBACK_RAISE:
+        raise TimestampConversionError(f"Unrecognized time value: {mongo_time!r}")
+    if fallback == FALLBACK_PARENT and parent is not None:
+        return parent
+    return int(time.time())
+
+
+def convert_mongodb_time_to_epoch_seconds(mongo_time, fallback=FALLBACK_NOW, parent=None, counters=None):
+    """
+    Converts MongoDB's ISODate object or string to Unix epoch seconds (integer).
+
+    Unparseable values are counted in counters[INVALID_TIMESTAMPS] (if a dict
+    is given) and handled according to fallback: FALLBACK_NOW uses the current
+    time, FALLBACK_PARENT uses parent (e.g. the conversation's timestamp for
+    its messages, falling back to now when parent is None), FALLBACK_RAISE
+    raises TimestampConversionError. Repeated ISO strings are parsed once.
+    """
+    if type(mongo_time) is datetime:
+        return _datetime_to_epoch(mongo_time)
+    try:
+        if isinstance(mongo_time, str):
+            return _parse_iso(mongo_time)
+        if isinstance(mongo_time, dict) and '$date' in mongo_time:
+            ts = mongo_time['$date']
+            if isinstance(ts, str):
+                return _parse_iso(ts)
+            if isinstance(ts, dict) and '$numberLong' in ts:
+                return int(ts['$numberLong']) // 1000
+            if isinstance(ts, int):
+                return ts // 1000
+        elif isinstance(mongo_time, datetime):
+            return _datetime_to_epoch(mongo_time)
+    except (ValueError, TypeError, OverflowError):
+        pass
+    return _fallback(mongo_time, fallback, parent, counters)
+
+
+def _convert_iso_batch_numpy(values):
+    """Vectorized parse of UTC ISO strings ending in 'Z'. Returns None if the batch doesn't qualify."""
+    if not all(type(value) is str and value.endswith('Z') for value in values):
+        return None
     try:
-        dt_object = datetime.fromisoformat(ts_str.replace('Z', '+00:00'))
-        return int(dt_object.timestamp())
-    except Exception as e:
-        print(f"  Warning: Time conversion error for '{ts_str}': {e}, using current time.")
-        return int(time.time())
+        parsed = numpy.array([value[:-1] for value in values], dtype='datetime64[ms]')
+    except ValueError:
+        return None
+    if numpy.isnat(parsed).any():
+        return None
+    return (parsed.astype('int64') // 1000).tolist()
+
+
+def convert_many(values, fallback=FALLBACK_NOW, parent=None, counters=None):
+    """
+    Converts a batch of MongoDB time values to epoch seconds, with the same
+    fallback handling as convert_mongodb_time_to_epoch_seconds. Large batches
+    of UTC ISO strings are parsed with NumPy when it is installed.
+    """
+    if numpy is not None and len(values) >= _NUMPY_MIN_BATCH and type(values[0]) is str:
+        converted = _convert_iso_batch_numpy(values)
+        if converted is not None:
+            return converted
+    return [convert_mongodb_time_to_epoch_seconds(value, fallback, parent, counters) for value in values]
+
+
+def epoch_seconds_to_datetime(epoch_seconds):
+    """Converts Unix epoch seconds to a timezone-aware UTC datetime, suitable for MongoDB queries."""
+    return datetime.fromtimestamp(epoch_seconds, tz=timezone.utc)
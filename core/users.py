@@ -0,0 +1,59 @@
+import csv
+
+from core.log import warning
+
+
+def load_user_mapping(path):
+    """
+    Reads a CSV file of librechat_user_id,webui_user_id rows into a dict.
+    A header row is skipped if its first cell is not an id.
+    """
+    mapping = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or not row[0].strip() or row[0].strip().lower() == "librechat_user_id":
+                continue
+            mapping[row[0].strip()] = row[1].strip()
+    return mapping
+
+
+def webui_users_by_email(sqlite_conn):
+    """Returns a dict of lower-cased email -> user id from the Open WebUI user table."""
+    return {email.strip().lower(): user_id
+            for user_id, email in sqlite_conn.execute("SELECT id, email FROM user")
+            if email}
+
+
+def resolve_user_mapping(source, sqlite_conn, user_mapping=None, log_callback=print):
+    """
+    Returns a dict of LibreChat user id -> Open WebUI user id.
+
+    Users are matched automatically by email between the LibreChat users
+    collection and the Open WebUI user table. user_mapping (a dict, or the
+    path of a CSV file, see load_user_mapping) adds or overrides entries.
+    """
+    if isinstance(user_mapping, str):
+        user_mapping = load_user_mapping(user_mapping)
+
+    webui_ids = webui_users_by_email(sqlite_conn)
+    mapping = {}
+    unmatched = 0
+    for user in source.iter_users():
+        email = (user.get('email') or "").strip().lower()
+        webui_id = webui_ids.get(email)
+        if webui_id:
+            mapping[str(user.get('_id'))] = webui_id
+        else:
+            unmatched += 1
+    log_callback(f"Matched {len(mapping)} LibreChat users to Open WebUI accounts by email.")
+    if unmatched:
+        log_callback(warning(f"Warning: {unmatched} LibreChat users have no Open WebUI account with the same email."))
+
+    if user_mapping:
+        known_ids = set(webui_ids.values())
+        for librechat_id, webui_id in user_mapping.items():
+            if webui_id not in known_ids:
+                log_callback(warning(f"Warning: Mapped Open WebUI user '{webui_id}' does not exist in the user table."))
+            mapping[str(librechat_id)] = webui_id
+        log_callback(f"Applied {len(user_mapping)} explicit user mappings.")
+    return mapping
@@ -2,22 +2,27 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog
 import threading
-import queue
 import os
 
 import config
+from core.filters import normalize_filters
+from core.log import DEBUG, ERROR, INFO, WARNING, LEVEL_NAMES
+from gui.log_sink import LogSink
 from scripts.migrate_conversations import migrate_conversations
+from scripts.migrate_files import migrate_files
+from scripts.migrate_users import migrate_users
 from scripts.generate_presets import generate_presets
-from scripts.backup_librechat import backup_librechat
+from scripts.backup_librechat import MIGRATION_COLLECTIONS, backup_librechat
+from scripts.verify_migration import verify_migration
 
 class App(ctk.CTk):
     def __init__(self):
         super().__init__()
 
         self.title("LibreChat to Open WebUI Migration Tool")
-        self.geometry("800x650")
+        self.geometry("800x780")
 
-        self.log_queue = queue.Queue()
+        self.log_sink = LogSink(level=INFO, max_lines=config.GUI_LOG_MAX_LINES, log_file=config.LOG_FILE)
 
         # --- Main Frame ---
         main_frame = ctk.CTkFrame(self)
@@ -81,16 +86,49 @@ class App(ctk.CTk):
         actions_frame.pack(padx=10, pady=10, fill="x")
 
         ctk.CTkLabel(actions_frame, text="Actions", font=("Arial", 16, "bold")).pack(anchor="w", pady=5)
+
+        # Filters (empty fields are ignored)
+        filters_frame = ctk.CTkFrame(actions_frame)
+        filters_frame.pack(fill="x", pady=5)
+        filters_frame.grid_columnconfigure((1, 3), weight=1)
+        self.filter_entries = {}
+        filter_fields = (
+            ("created_after", "Created after (YYYY-MM-DD):"),
+            ("created_before", "Created before:"),
+            ("updated_after", "Updated after:"),
+            ("updated_before", "Updated before:"),
+            ("user_ids", "LibreChat user IDs:"),
+            ("conversation_ids", "Conversation IDs:"),
+            ("endpoints", "Endpoints:"),
+            ("models", "Models:"),
+        )
+        for index, (key, label) in enumerate(filter_fields):
+            row, column = divmod(index, 2)
+            ctk.CTkLabel(filters_frame, text=label).grid(row=row, column=column * 2, sticky="w", padx=5)
+            entry = ctk.CTkEntry(filters_frame, placeholder_text="comma separated" if key.endswith("s") else "")
+            entry.grid(row=row, column=column * 2 + 1, sticky="ew", padx=5, pady=2)
+            self.filter_entries[key] = entry
         
         # Migration Action
         migrate_frame = ctk.CTkFrame(actions_frame)
         migrate_frame.pack(fill="x", pady=5)
         self.backup_before_migrate_var = ctk.BooleanVar(value=True)
         ctk.CTkCheckBox(migrate_frame, text="Backup before migrating", variable=self.backup_before_migrate_var).pack(side="left", padx=5)
+        self.per_user_migrate_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(migrate_frame, text="Per user (match by email)", variable=self.per_user_migrate_var).pack(side="left", padx=5)
+        self.migrate_files_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(migrate_frame, text="Include files", variable=self.migrate_files_var).pack(side="left", padx=5)
+        self.dry_run_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(migrate_frame, text="Dry run (estimate only)", variable=self.dry_run_var).pack(side="left", padx=5)
         ctk.CTkButton(migrate_frame, text="Migrate Conversations", command=self.run_migration).pack(fill="x", expand=True)
+        ctk.CTkButton(actions_frame, text="Verify Migration", command=self.run_verification).pack(fill="x", pady=5)
 
         # Other Actions
-        ctk.CTkButton(actions_frame, text="Generate Presets", command=lambda: self.run_task(generate_presets)).pack(fill="x", pady=5)
+        presets_frame = ctk.CTkFrame(actions_frame)
+        presets_frame.pack(fill="x", pady=5)
+        self.import_presets_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(presets_frame, text="Import into webui.db", variable=self.import_presets_var).pack(side="left", padx=5)
+        ctk.CTkButton(presets_frame, text="Generate Presets", command=self.run_presets).pack(fill="x", expand=True)
         ctk.CTkButton(actions_frame, text="Backup LibreChat", command=lambda: self.run_task(backup_librechat)).pack(fill="x", pady=5)
 
 
@@ -98,7 +136,19 @@ class App(ctk.CTk):
         log_frame = ctk.CTkFrame(main_frame)
         log_frame.pack(padx=10, pady=10, fill="both", expand=True)
         
-        ctk.CTkLabel(log_frame, text="Logs", font=("Arial", 16, "bold")).pack(anchor="w", pady=5)
+        log_header = ctk.CTkFrame(log_frame)
+        log_header.pack(fill="x")
+        ctk.CTkLabel(log_header, text="Logs", font=("Arial", 16, "bold")).pack(side="left", pady=5)
+        ctk.CTkButton(log_header, text="Log to File...", width=100, command=self.browse_log_file).pack(side="right", padx=5)
+        self.log_level_var = ctk.StringVar(value=LEVEL_NAMES[INFO])
+        ctk.CTkOptionMenu(
+            log_header,
+            values=[LEVEL_NAMES[level] for level in (DEBUG, INFO, WARNING, ERROR)],
+            variable=self.log_level_var,
+            command=self.set_log_level,
+            width=100,
+        ).pack(side="right", padx=5)
+        ctk.CTkLabel(log_header, text="Level:").pack(side="right")
         self.log_textbox = ctk.CTkTextbox(log_frame, state="disabled", width=700, height=200)
         self.log_textbox.pack(fill="both", expand=True)
 
@@ -122,6 +172,23 @@ class App(ctk.CTk):
             self.output_dir_entry.delete(0, tk.END)
             self.output_dir_entry.insert(0, dirpath)
 
+    def browse_log_file(self):
+        filepath = filedialog.asksaveasfilename(title="Write full log to", defaultextension=".log",
+                                                filetypes=(("Log files", "*.log"), ("All files", "*.*")))
+        if filepath:
+            self.log_sink.set_log_file(filepath)
+            self.log(f"Writing full log to {filepath}")
+
+    def set_log_level(self, level_name):
+        level = {name: level for level, name in LEVEL_NAMES.items()}[level_name]
+        self.log_sink.level = level
+        self.log_textbox.configure(state="normal")
+        self.log_textbox.delete("1.0", tk.END)
+        self.log_textbox.insert(tk.END, self.log_sink.render_history())
+        self.trim_log_textbox()
+        self.log_textbox.configure(state="disabled")
+        self.log_textbox.see(tk.END)
+
     def save_config(self):
         new_config = {
             "LIBRECHAT_DOCKER_PATH": self.librechat_path_entry.get(),
@@ -135,32 +202,85 @@ class App(ctk.CTk):
         self.log("Configuration saved to .env file.")
 
     def log(self, message):
-        self.log_queue.put(message)
+        self.log_sink.put(message)
+
+    def trim_log_textbox(self):
+        line_count = int(self.log_textbox.index("end-1c").split(".")[0])
+        excess = line_count - self.log_sink.max_lines
+        if excess > 0:
+            self.log_textbox.delete("1.0", f"{excess + 1}.0")
 
     def process_log_queue(self):
-        while not self.log_queue.empty():
-            message = self.log_queue.get_nowait()
+        # Coalesce everything queued since the last tick into a single insert.
+        text = self.log_sink.drain()
+        if text:
             self.log_textbox.configure(state="normal")
-            self.log_textbox.insert(tk.END, str(message) + "\n")
+            self.log_textbox.insert(tk.END, text)
+            self.trim_log_textbox()
             self.log_textbox.configure(state="disabled")
             self.log_textbox.see(tk.END)
         self.after(100, self.process_log_queue)
 
-    def run_task(self, task_function, *args):
+    def get_filters(self, exclude=()):
+        """Returns the filters entered in the GUI, or None (after logging why) if they are invalid."""
+        filters = {key: entry.get().strip() for key, entry in self.filter_entries.items()
+                   if key not in exclude and entry.get().strip()}
+        try:
+            normalize_filters(filters)
+        except ValueError as e:
+            self.log(f"Error: {e}")
+            return None
+        return filters
+
+    def run_task(self, task_function, *args, **kwargs):
         self.log(f"--- Starting {task_function.__name__} ---")
-        thread = threading.Thread(target=task_function, args=args, kwargs={"log_callback": self.log})
+        thread = threading.Thread(target=task_function, args=args, kwargs={"log_callback": self.log, **kwargs})
         thread.daemon = True
         thread.start()
 
+    def run_presets(self):
+        filters = self.get_filters(exclude=("conversation_ids",))
+        if filters is None:
+            return
+        self.run_task(generate_presets, filters=filters, dry_run=self.dry_run_var.get(),
+                      import_to_db=self.import_presets_var.get())
+
+    def run_verification(self):
+        filters = self.get_filters()
+        if filters is None:
+            return
+        self.run_task(verify_migration, filters=filters)
+
     def run_migration(self):
+        filters = self.get_filters()
+        if filters is None:
+            return
+        per_user = self.per_user_migrate_var.get()
+        dry_run = self.dry_run_var.get()
+
         def migration_flow():
+            if dry_run:
+                # The estimate covers the same conversations whether or not they are split per user.
+                self.log("--- Starting Migration Dry Run ---")
+                migrate_conversations(log_callback=self.log, filters=filters, dry_run=True)
+                self.log("--- Dry Run Finished ---")
+                return
             if self.backup_before_migrate_var.get():
                 self.log("--- Starting Backup before Migration ---")
-                backup_librechat(log_callback=self.log)
+                backup_librechat(log_callback=self.log, incremental=True, collections=MIGRATION_COLLECTIONS)
                 self.log("--- Backup Finished ---")
+            if self.migrate_files_var.get():
+                # Files first, so the chats reference them.
+                self.log("--- Starting File Migration ---")
+                migrate_files(log_callback=self.log, per_user=per_user)
+                self.log("--- File Migration Finished ---")
             
-            self.log("--- Starting Conversation Migration ---")
-            migrate_conversations(log_callback=self.log)
+            if per_user:
+                self.log("--- Starting Per-User Conversation Migration ---")
+                migrate_users(log_callback=self.log, filters=filters)
+            else:
+                self.log("--- Starting Conversation Migration ---")
+                migrate_conversations(log_callback=self.log, filters=filters)
             self.log("--- Migration Finished ---")
 
         thread = threading.Thread(target=migration_flow)
@@ -0,0 +1,80 @@
+import queue
+import threading
+from collections import deque
+
+from core.log import ERROR, LEVEL_NAMES, INFO, level_of
+
+DEFAULT_MAX_LINES = 5000
+DEFAULT_MAX_BATCH = 20000
+
+
+class LogSink:
+    """
+    Thread-safe, high-volume log pipeline between worker threads and the GUI.
+
+    Workers call put() with any message. The UI thread calls drain() once per
+    tick to collect everything queued since the last tick (up to max_batch
+    messages), filtered by the current level, as a single block of text. The
+    most recent max_lines messages of every level are kept in a ring buffer so
+    the view can be rebuilt when the level changes. ERROR messages are always
+    shown. If log_file is set, every message is also appended to it,
+    regardless of level.
+    """
+
+    def __init__(self, level=INFO, max_lines=DEFAULT_MAX_LINES, max_batch=DEFAULT_MAX_BATCH, log_file=None):
+        self.level = level
+        self.max_lines = max_lines
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._history = deque(maxlen=max_lines)
+        self._file = None
+        self._file_lock = threading.Lock()
+        self.set_log_file(log_file)
+
+    def put(self, message):
+        self._queue.put(message)
+
+    __call__ = put
+
+    def set_log_file(self, path):
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if path:
+                self._file = open(path, "a", encoding="utf-8")
+
+    def is_visible(self, level):
+        return level >= self.level or level >= ERROR
+
+    def drain(self):
+        """
+        Collects pending messages. Returns the visible text to append (or an
+        empty string) and writes the full, unfiltered batch to the log file.
+        """
+        records = []
+        for _ in range(self.max_batch):
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            records.append((level_of(message), str(message)))
+        if not records:
+            return ""
+
+        self._history.extend(records)
+        with self._file_lock:
+            if self._file is not None:
+                self._file.write("".join(f"{LEVEL_NAMES.get(level, level)}\t{text}\n" for level, text in records))
+                self._file.flush()
+
+        visible = [text for level, text in records if self.is_visible(level)]
+        # Anything beyond max_lines would be trimmed straight away, so don't insert it.
+        return "".join(text + "\n" for text in visible[-self.max_lines:])
+
+    def render_history(self):
+        """Returns the buffered messages visible at the current level, e.g. after the level changes."""
+        return "".join(text + "\n" for level, text in self._history if self.is_visible(level))
+
+    def close(self):
+        self.set_log_file(None)
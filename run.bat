@@ -18,13 +18,19 @@ if %errorlevel% neq 0 (
 
 REM Check for command
 if "%1"=="" (
-    echo Usage: run.bat [migrate^|presets^|gui^|backup]
+    echo Usage: run.bat [migrate^|migrate-users^|files^|presets^|gui^|backup^|restore-plan^|verify]
     exit /b 1
 )
 
 if "%1"=="migrate" (
     echo Running conversation migration...
     python -m scripts.migrate_conversations
+) else if "%1"=="migrate-users" (
+    echo Running per-user conversation migration...
+    python -m scripts.migrate_users
+) else if "%1"=="files" (
+    echo Running file migration...
+    python -m scripts.migrate_files
 ) else if "%1"=="presets" (
     echo Running preset generation...
     python -m scripts.generate_presets
@@ -34,9 +40,15 @@ if "%1"=="migrate" (
 ) else if "%1"=="backup" (
     echo Running LibreChat backup...
     python -m scripts.backup_librechat
+) else if "%1"=="restore-plan" (
+    echo Planning a restore from the backup manifests...
+    python -m scripts.plan_restore
+) else if "%1"=="verify" (
+    echo Verifying the migrated chats against LibreChat...
+    python -m scripts.verify_migration
 ) else (
     echo Invalid command: %1
-    echo Usage: run.bat [migrate^|presets^|gui^|backup]
+    echo Usage: run.bat [migrate^|migrate-users^|files^|presets^|gui^|backup^|restore-plan^|verify]
     exit /b 1
 )
 
@@ -17,13 +17,19 @@ fi
 
 # Check for command
 if [ -z "$1" ]; then
-    echo "Usage: ./run.sh [migrate|presets|gui|backup]"
+    echo "Usage: ./run.sh [migrate|migrate-users|files|presets|gui|backup|restore-plan|verify]"
     exit 1
 fi
 
 if [ "$1" == "migrate" ]; then
     echo "Running conversation migration..."
     python -m scripts.migrate_conversations
+elif [ "$1" == "migrate-users" ]; then
+    echo "Running per-user conversation migration..."
+    python -m scripts.migrate_users
+elif [ "$1" == "files" ]; then
+    echo "Running file migration..."
+    python -m scripts.migrate_files
 elif [ "$1" == "presets" ]; then
     echo "Running preset generation..."
     python -m scripts.generate_presets
@@ -34,9 +40,15 @@ elif [ "$1" == "backup" ]; then
     echo "Running LibreChat backup..."
     echo "NOTE: This requires sudo and Docker on a Linux/macOS system."
     python -m scripts.backup_librechat
+elif [ "$1" == "restore-plan" ]; then
+    echo "Planning a restore from the backup manifests..."
+    python -m scripts.plan_restore
+elif [ "$1" == "verify" ]; then
+    echo "Verifying the migrated chats against LibreChat..."
+    python -m scripts.verify_migration
 else
     echo "Invalid command: $1"
-    echo "Usage: ./run.sh [migrate|presets|gui|backup]"
+    echo "Usage: ./run.sh [migrate|migrate-users|files|presets|gui|backup|restore-plan|verify]"
     exit 1
 fi
 
@@ -1,8 +1,28 @@
+import hashlib
 import os
 import subprocess
+import tempfile
+import time
+import pymongo
 import yaml
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import config
+from core.backup_manifest import (
+    BACKUP_DELTA, BACKUP_FULL, DEFAULT_MAX_DELTA_CHAIN, chain_length, format_high_water, latest_entry, load_manifests,
+    new_manifest, updated_since_query, write_manifest,
+)
+from core.log import debug, error, warning
+from core.metrics import DEFAULT_PROGRESS_INTERVAL, Metrics, format_bytes
+from core.mongo import get_mongo_db, release_mongo_client
+from core.queries import find_sort_index
+
+# Collections read by migrate_conversations and generate_presets (users for per-user migrations).
+MIGRATION_COLLECTIONS = ("conversations", "messages", "presets", "users", "files")
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# When the high-water updatedAt cannot be read from MongoDB, the backup's start time minus this
+# margin is used instead, so documents written while the dump runs are picked up by the next delta.
+HIGH_WATER_MARGIN = timedelta(minutes=5)
 
 def run_command(command, log_callback=print):
     """
@@ -10,7 +30,7 @@ def run_command(command, log_callback=print):
     Note: This requires sudo privileges and is designed for Linux/macOS.
     """
     try:
-        log_callback(f"  Running command: {' '.join(command)}")
+        log_callback(debug(f"  Running command: {' '.join(command)}"))
         result = subprocess.run(
             ["sudo"] + command,
             check=True,
@@ -33,31 +53,241 @@ def get_container_id(service_name, log_callback=print):
         "--format", "{{.ID}}"
     ], log_callback)
 
-def backup_mongodb(base_dir, backup_dir, log_callback=print):
-    """Backup MongoDB data."""
+def stream_command_to_file(command, path, log_callback=print, metrics=None, chunk_size=STREAM_CHUNK_SIZE, digest=None):
+    """
+    Runs a command with sudo and writes its stdout to path chunk by chunk, so
+    the output is never held in memory or staged anywhere else. Logs the bytes
+    written and the throughput at most every few seconds, and feeds each chunk
+    to digest (a hashlib object), if given. The file is written as path +
+    ".partial" and only renamed into place when the command succeeds.
+    Returns the number of bytes written, or None on failure.
+    """
+    log_callback(debug(f"  Running command: {' '.join(command)} > {path}"))
+    partial_path = path + ".partial"
+    written = 0
+    start = last_report = time.perf_counter()
+    # stderr goes to a temporary file so a chatty command can never block on a full pipe.
+    with tempfile.TemporaryFile() as stderr_file:
+        try:
+            process = subprocess.Popen(["sudo"] + command, stdout=subprocess.PIPE, stderr=stderr_file)
+        except FileNotFoundError:
+            log_callback("Error: 'sudo' command not found. This script is intended for Linux/macOS.")
+            return None
+        try:
+            with open(partial_path, "wb") as output:
+                while True:
+                    chunk = process.stdout.read(chunk_size)
+                    if not chunk:
+                        break
+                    output.write(chunk)
+                    if digest is not None:
+                        digest.update(chunk)
+                    written += len(chunk)
+                    if metrics is not None:
+                        metrics.incr("bytes", len(chunk))
+                    now = time.perf_counter()
+                    if now - last_report >= DEFAULT_PROGRESS_INTERVAL:
+                        last_report = now
+                        log_callback(f"  {format_bytes(written)} written ({format_bytes(written / (now - start))}/s)")
+        except OSError as e:
+            process.kill()
+            process.wait()
+            log_callback(error(f"Error writing {path}: {e}"))
+            _remove(partial_path)
+            return None
+        finally:
+            process.stdout.close()
+        returncode = process.wait()
+        if returncode != 0:
+            stderr_file.seek(0)
+            stderr = stderr_file.read().decode("utf-8", "replace").strip()
+            log_callback(error(f"Error running command (exit code {returncode}): {' '.join(command)}\n  Stderr: {stderr[-2000:]}"))
+            _remove(partial_path)
+            return None
+    os.replace(partial_path, path)
+    seconds = time.perf_counter() - start
+    log_callback(f"  Wrote {os.path.basename(path)}: {format_bytes(written)} in {seconds:.1f}s "
+                 f"({format_bytes(written / seconds if seconds > 0 else 0)}/s)")
+    return written
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _directory_size(path):
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def backup_mongodb(base_dir, backup_dir, log_callback=print, metrics=None):
+    """Backup MongoDB data. Stage durations and byte counts are recorded in metrics, if given."""
+    metrics = metrics or Metrics("backup_mongodb")
     log_callback("Backing up MongoDB...")
     container_id = get_container_id("mongo", log_callback)
     if not container_id:
         log_callback("MongoDB container not found, skipping backup.")
+        metrics.incr("errors")
         return
 
     dump_path_host = os.path.join(backup_dir, "mongo_dump")
     os.makedirs(dump_path_host, exist_ok=True)
 
     # Create dump inside container
-    if not run_command(["docker", "exec", container_id, "mongodump", "--db", "LibreChat", "--out", "/tmp/mongo_dump"], log_callback):
+    with metrics.stage("mongodump"):
+        dumped = run_command(["docker", "exec", container_id, "mongodump", "--db", "LibreChat", "--out", "/tmp/mongo_dump"], log_callback)
+    if not dumped:
+        metrics.incr("errors")
         return
+    metrics.advance()
 
     # Copy dump to host
-    run_command(["docker", "cp", f"{container_id}:/tmp/mongo_dump", dump_path_host], log_callback)
+    with metrics.stage("copy"):
+        copied = run_command(["docker", "cp", f"{container_id}:/tmp/mongo_dump", dump_path_host], log_callback)
+    if copied is None:
+        metrics.incr("errors")
+    metrics.advance()
+    metrics.incr("bytes", _directory_size(dump_path_host))
+    # Don't leave a second copy of the database in the container.
+    run_command(["docker", "exec", container_id, "rm", "-rf", "/tmp/mongo_dump"], log_callback)
     log_callback("MongoDB backup completed.")
 
 
-def backup_librechat(log_callback=print):
+def collection_high_waters(collections, log_callback=print):
+    """
+    Returns a dict of collection -> newest updatedAt (as a manifest string),
+    read from MongoDB before dumping. Collections that cannot be read, or
+    that have no index on updatedAt (where the read would scan and sort the
+    whole collection), fall back to the current time minus HIGH_WATER_MARGIN.
+    """
+    fallback = format_high_water(datetime.now(timezone.utc) - HIGH_WATER_MARGIN)
+    high_waters = dict.fromkeys(collections, fallback)
+    mongo_db, mongo_client = get_mongo_db(log_callback)
+    if mongo_db is None:
+        log_callback(warning("Warning: Could not read updatedAt high-water marks from MongoDB; using the backup start time."))
+        return high_waters
+    try:
+        for collection in collections:
+            try:
+                indexed = find_sort_index(mongo_db[collection], 'updatedAt') is not None
+            except pymongo.errors.PyMongoError as e:
+                log_callback(warning(f"Warning: Could not list indexes on {collection}: {e}"))
+                indexed = False
+            if not indexed:
+                log_callback(warning(f"Warning: No index on {collection}(updatedAt); using the backup start time as "
+                                     f"its high-water mark. Deltas of {collection} will scan the whole collection."))
+                continue
+            doc = mongo_db[collection].find_one({'updatedAt': {'$type': 'date'}}, {'updatedAt': 1},
+                                                sort=[('updatedAt', -1)])
+            if doc is not None:
+                updated_at = doc['updatedAt']
+                if updated_at.tzinfo is None:
+                    updated_at = updated_at.replace(tzinfo=timezone.utc)
+                high_waters[collection] = format_high_water(updated_at)
+    finally:
+        release_mongo_client(mongo_client)
+    return high_waters
+
+
+def backup_mongodb_streamed(backup_dir, log_callback=print, metrics=None, collections=None, incremental=False,
+                            max_delta_chain=DEFAULT_MAX_DELTA_CHAIN):
+    """
+    Backs up MongoDB by streaming `mongodump --archive --gzip` from `docker
+    exec` straight into compressed archives in backup_dir, without staging a
+    dump inside the container. Without collections the whole database goes
+    into <db>.archive.gz; otherwise each collection gets its own
+    <db>.<collection>.archive.gz. Restore with `mongorestore --archive=<file> --gzip`.
+
+    Per-collection backups record a manifest (see core.backup_manifest) with
+    each archive's high-water updatedAt, size and SHA-256. With incremental,
+    a collection that already has a backup in the same backups directory is
+    only dumped from its previous high-water mark on (mongodump --query), as
+    a delta chained onto that backup; after max_delta_chain deltas the next
+    backup is full again. Incremental backups default to MIGRATION_COLLECTIONS.
+    Returns the list of archives written, or None if the container was not found.
+    """
+    metrics = metrics or Metrics("backup_mongodb")
+    log_callback("Backing up MongoDB (streamed archive)...")
+    container_id = get_container_id("mongo", log_callback)
+    if not container_id:
+        log_callback("MongoDB container not found, skipping backup.")
+        metrics.incr("errors")
+        return None
+
+    db_name = config.MONGO_DB_NAME
+    if incremental and not collections:
+        collections = MIGRATION_COLLECTIONS
+    targets = [(None, f"{db_name}.archive.gz")] if not collections else [
+        (collection, f"{db_name}.{collection}.archive.gz") for collection in collections
+    ]
+    manifest = None
+    if collections:
+        backup_root = os.path.dirname(os.path.abspath(backup_dir))
+        manifests = load_manifests(backup_root)
+        manifest = new_manifest(db_name, datetime.now(timezone.utc).isoformat())
+        high_waters = collection_high_waters(collections, log_callback)
+    archives = []
+    for collection, filename in targets:
+        command = ["docker", "exec", container_id, "mongodump", "--db", db_name, "--archive", "--gzip"]
+        entry = None
+        if collection:
+            command += ["--collection", collection]
+            entry = {"archive": filename, "type": BACKUP_FULL, "base": None, "since": None,
+                     "high_water": high_waters[collection]}
+            previous = latest_entry(manifests, db_name, collection) if incremental else None
+            if previous is not None:
+                depth = chain_length(manifests, db_name, collection, previous[0])
+                if depth is not None and depth < max_delta_chain:
+                    entry.update(type=BACKUP_DELTA, base=previous[0], since=previous[1]["high_water"])
+                    command += ["--query", updated_since_query(entry["since"])]
+                    log_callback(f"  {collection}: delta since {entry['since']} (based on {previous[0]})")
+                else:
+                    log_callback(f"  {collection}: full backup ({max_delta_chain} deltas reached or the chain is broken)")
+        path = os.path.join(backup_dir, filename)
+        digest = hashlib.sha256()
+        with metrics.stage("mongodump"):
+            written = stream_command_to_file(command, path, log_callback, metrics, digest=digest)
+        metrics.advance()
+        if written is None:
+            metrics.incr("errors")
+            continue
+        archives.append(path)
+        if entry is not None:
+            entry.update(bytes=written, sha256=digest.hexdigest())
+            manifest["collections"][collection] = entry
+    if manifest is not None and manifest["collections"]:
+        # Failed collections are left out, so the next incremental backup chains onto their last good archive.
+        write_manifest(backup_dir, manifest)
+    if len(archives) == len(targets):
+        log_callback("MongoDB backup completed.")
+    else:
+        log_callback(error(f"MongoDB backup incomplete: {len(targets) - len(archives)} of {len(targets)} archives failed."))
+    return archives
+
+
+def backup_librechat(log_callback=print, progress_callback=None, metrics_path=None, streaming=False, collections=None,
+                     incremental=False, max_delta_chain=DEFAULT_MAX_DELTA_CHAIN):
     """
     Performs a backup of the LibreChat instance (MongoDB).
     Requires a Linux/macOS environment with sudo and Docker.
+    Progress and metrics are reported as in migrate_conversations.
+    With streaming, the database is written as gzipped mongodump archives
+    (see backup_mongodb_streamed), optionally limited to collections, e.g.
+    MIGRATION_COLLECTIONS before a migration. With incremental (which
+    implies streaming), collections backed up before are only dumped from
+    their previous high-water updatedAt on; see scripts.plan_restore for
+    restoring such a chain. Otherwise a plain mongodump directory is copied
+    out, which can be migrated from directly with dump_dir.
+    Returns a dict with the backup directory, the archives written and the
+    number of errors, or None if the backup could not start.
     """
+    streaming = streaming or incremental
     log_callback("--- Starting LibreChat Backup ---")
     log_callback("WARNING: This script requires sudo access and a Docker environment on Linux/macOS.")
 
@@ -73,14 +303,34 @@ def backup_librechat(log_callback=print):
 
     log_callback(f"Backup directory: {backup_dir}")
 
+    # One step for the sudo check, then the dump and the copy (or one per streamed archive).
+    if incremental and not collections:
+        collections = MIGRATION_COLLECTIONS
+    steps = 1 + (max(1, len(collections or ())) if streaming else 2)
+    metrics = Metrics("backup_librechat", total=steps, progress_callback=progress_callback, log_callback=log_callback)
+
     # Test sudo access
-    if run_command(["echo", "Testing sudo access..."], log_callback) is None:
+    with metrics.stage("sudo_check"):
+        sudo_ok = run_command(["echo", "Testing sudo access..."], log_callback) is not None
+    if not sudo_ok:
         log_callback("Sudo access test failed. Aborting backup.")
         return
+    metrics.advance()
+
+    archives = []
+    if streaming:
+        archives = backup_mongodb_streamed(backup_dir, log_callback, metrics, collections, incremental,
+                                           max_delta_chain) or []
+    else:
+        backup_mongodb(base_dir, backup_dir, log_callback, metrics)
 
-    backup_mongodb(base_dir, backup_dir, log_callback)
+    metrics.finish()
+    if metrics_path:
+        metrics.write_report(metrics_path)
+        log_callback(f"Metrics report written to {metrics_path}")
 
     log_callback(f"--- Backup process finished. Files saved in: {backup_dir} ---")
+    return {"backup_dir": backup_dir, "archives": archives, "errors": metrics.counters.get("errors", 0)}
 
 if __name__ == "__main__":
     # Load config to ensure variables are available
@@ -0,0 +1,314 @@
+"""
+Headless command-line runner for servers and containers.
+
+Subcommands: migrate, files, verify, presets and backup. Progress events, and one final
+result event per run, are written to stdout as newline-delimited JSON. Log
+lines go to stderr. Only the module for the chosen subcommand is imported,
+and never the GUI.
+
+Exit codes: 0 success, 1 finished with errors, failed with an unexpected
+error, or verify found differences, 2 invalid arguments or a required
+setting (SQLITE_DB_PATH, TARGET_USER_ID, LIBRECHAT_DOCKER_PATH) missing,
+3 could not start (e.g. MongoDB or webui.db unreachable), 130 interrupted.
+
+Usage:
+    python -m scripts.cli migrate --workers 4 --batch-size 2000 --created-after 2024-01-01
+    python -m scripts.cli files --workers 16
+    python -m scripts.cli verify --workers 4 --processes
+    python -m scripts.cli presets --import-to-db
+    python -m scripts.cli backup --incremental
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import traceback
+
+import config
+from core.filters import FILTER_KEYS, build_preset_filter, normalize_filters
+from core.serialization import encoder_name
+from core.log import LEVEL_NAMES, debug, level_of
+
+EXIT_OK = 0
+EXIT_ERRORS = 1
+EXIT_USAGE = 2
+EXIT_NOT_STARTED = 3
+EXIT_INTERRUPTED = 130
+
+_LOG_LEVELS = {name.lower(): level for level, name in LEVEL_NAMES.items()}
+
+
+class EventStream:
+    """Writes JSON events to a stream, one per line; safe to use from worker threads."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        line = json.dumps({"event": event, **fields}, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def progress(self, progress_event):
+        self.emit("progress", **progress_event.to_dict())
+
+
+def _log_callback(min_level, stream):
+    def log(message):
+        if level_of(message) >= min_level:
+            stream.write(f"{str(message).lstrip(chr(10))}\n")
+            stream.flush()
+    return log
+
+
+def _add_source_options(parser):
+    group = parser.add_argument_group("source and target")
+    group.add_argument("--mongo-uri", help="Overrides MONGO_URI.")
+    group.add_argument("--mongo-db", help="Overrides MONGO_DB_NAME.")
+    group.add_argument("--dump-dir", help="Read from a mongodump directory instead of MongoDB.")
+    group.add_argument("--sqlite-db", help="Overrides SQLITE_DB_PATH.")
+    group.add_argument("--target-user-id", help="Overrides TARGET_USER_ID.")
+
+
+def _add_filter_options(parser, exclude=()):
+    group = parser.add_argument_group("filters")
+    for key in FILTER_KEYS:
+        if key not in exclude:
+            group.add_argument(f"--{key.replace('_', '-')}", dest=f"filter_{key}", metavar="VALUE")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m scripts.cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log-level", choices=sorted(_LOG_LEVELS, key=_LOG_LEVELS.get), default="info",
+                        help="Minimum level of log lines written to stderr.")
+    parser.add_argument("--metrics-path", help="Write the final metrics report as JSON to this file "
+                                               "(not with migrate --per-user, which reports per partition).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="Migrate conversations into Open WebUI.")
+    _add_source_options(migrate)
+    _add_filter_options(migrate)
+    migrate.add_argument("--batch-size", type=int, help="Conversations read per MongoDB batch.")
+    migrate.add_argument("--workers", type=int, default=0, help="Transform workers (0 runs on one thread).")
+    migrate.add_argument("--processes", action="store_true", help="Use worker processes instead of threads.")
+    migrate.add_argument("--read-mode", choices=("auto", "grouped", "batched", "per_conversation"), default="auto")
+    migrate.add_argument("--write-batch-rows", type=int)
+    migrate.add_argument("--write-batch-bytes", type=int)
+    migrate.add_argument("--json-encoder", choices=("auto", "orjson", "stdlib"), default="auto")
+    migrate.add_argument("--timestamp-fallback", choices=("now", "parent", "raise"), default="now")
+    migrate.add_argument("--full", action="store_true", help="Disable incremental migration.")
+    migrate.add_argument("--no-fast-pragmas", action="store_true")
+    migrate.add_argument("--create-indexes", action="store_true")
+    migrate.add_argument("--streaming", action="store_true", help="Bounded memory for very large conversations.")
+    migrate.add_argument("--dry-run", action="store_true", help="Estimate the run without writing anything.")
+    migrate.add_argument("--sample-size", type=int, help="Conversations sampled by --dry-run.")
+    migrate.add_argument("--per-user", action="store_true", help="Migrate each user's conversations to the "
+                                                                 "Open WebUI account with the same email.")
+    migrate.add_argument("--user-mapping", help="CSV of librechat_user_id,webui_user_id rows (with --per-user).")
+    migrate.add_argument("--partition-workers", type=int, help="Users migrated at the same time (with --per-user).")
+
+    files = subparsers.add_parser("files", help="Copy uploaded files into Open WebUI (run before migrate).")
+    _add_source_options(files)
+    files.add_argument("--librechat-path", help="Overrides LIBRECHAT_DOCKER_PATH.")
+    files.add_argument("--upload-dir", help="Directory the files are copied to (overrides OPEN_WEBUI_UPLOAD_DIR).")
+    files.add_argument("--workers", type=int, help="Copy threads.")
+    files.add_argument("--per-user", action="store_true", help="Give each file to the Open WebUI account with the "
+                                                               "same email as its LibreChat owner.")
+    files.add_argument("--user-mapping", help="CSV of librechat_user_id,webui_user_id rows (with --per-user).")
+
+    verify = subparsers.add_parser("verify", help="Compare the migrated chats with LibreChat.")
+    _add_source_options(verify)
+    _add_filter_options(verify)
+    verify.add_argument("--batch-size", type=int, help="Conversations read per MongoDB batch.")
+    verify.add_argument("--workers", type=int, default=0, help="Digest workers (0 runs on one thread).")
+    verify.add_argument("--processes", action="store_true", help="Use worker processes instead of threads.")
+    verify.add_argument("--max-reported", type=int, help="Example ids logged and returned per problem.")
+
+    presets = subparsers.add_parser("presets", help="Convert presets into Open WebUI models.")
+    _add_source_options(presets)
+    _add_filter_options(presets, exclude=("conversation_ids",))
+    presets.add_argument("--output-dir", help="Overrides OUTPUT_DIR.")
+    presets.add_argument("--import-to-db", action="store_true", help="Upsert into the model table instead of files.")
+    presets.add_argument("--export-json", action=argparse.BooleanOptionalAction, default=None,
+                         help="Write all_models.json (default: only without --import-to-db).")
+    presets.add_argument("--pretty", action="store_true")
+    presets.add_argument("--json-encoder", choices=("auto", "orjson", "stdlib"), default="auto")
+    presets.add_argument("--dry-run", action="store_true")
+
+    backup = subparsers.add_parser("backup", help="Back up the LibreChat MongoDB container.")
+    backup.add_argument("--librechat-path", help="Overrides LIBRECHAT_DOCKER_PATH.")
+    backup.add_argument("--mongo-uri", help="Overrides MONGO_URI (read for incremental high-water marks).")
+    backup.add_argument("--mongo-db", help="Overrides MONGO_DB_NAME.")
+    backup.add_argument("--streaming", action="store_true", help="Stream gzipped mongodump archives.")
+    backup.add_argument("--incremental", action="store_true", help="Dump only documents changed since the last backup.")
+    backup.add_argument("--collections", help="Comma separated collections to back up.")
+    backup.add_argument("--max-delta-chain", type=int)
+    return parser
+
+
+def apply_overrides(args):
+    """Applies the source/target options to config, which every task reads when it starts."""
+    for option, name in (("mongo_uri", "MONGO_URI"), ("mongo_db", "MONGO_DB_NAME"), ("sqlite_db", "SQLITE_DB_PATH"),
+                         ("target_user_id", "TARGET_USER_ID"), ("output_dir", "OUTPUT_DIR"),
+                         ("librechat_path", "LIBRECHAT_DOCKER_PATH")):
+        value = getattr(args, option, None)
+        if value:
+            setattr(config, name, value)
+
+
+def collect_filters(args):
+    return {key: getattr(args, f"filter_{key}") for key in FILTER_KEYS
+            if getattr(args, f"filter_{key}", None) is not None}
+
+
+def validate_args(args):
+    """
+    Checks the options a task would only reject once it runs. Raises
+    ValueError, reported as EXIT_USAGE, so that errors raised while a task
+    runs are never mistaken for invalid arguments.
+    """
+    filters = collect_filters(args)
+    normalize_filters(filters)
+    if args.command == "presets":
+        build_preset_filter(filters)
+    if getattr(args, "json_encoder", None):
+        encoder_name(args.json_encoder)
+    if args.command == "migrate" and args.per_user and args.dry_run:
+        raise ValueError("--dry-run cannot be combined with --per-user; estimate without --per-user, "
+                         "which covers the same conversations.")
+    user_mapping = getattr(args, "user_mapping", None)
+    if user_mapping and not args.per_user:
+        raise ValueError("--user-mapping requires --per-user.")
+    if user_mapping and not os.path.isfile(user_mapping):
+        raise ValueError(f"User mapping file '{user_mapping}' does not exist.")
+
+
+def _is_unset(value, placeholder=None):
+    return not value or (placeholder is not None and placeholder in value)
+
+
+def validate_config(args):
+    """
+    Checks the settings the chosen task needs, after apply_overrides. Raises
+    ValueError (reported as EXIT_USAGE), so a misconfiguration is not
+    mistaken for an unreachable MongoDB or webui.db (EXIT_NOT_STARTED).
+    """
+    command = args.command
+    per_user = getattr(args, "per_user", False)
+    missing = []
+    if (command in ("migrate", "files", "verify")
+            or (command == "presets" and args.import_to_db and not args.dry_run)):
+        if _is_unset(config.SQLITE_DB_PATH, "path/to/your/webui.db"):
+            missing.append("SQLITE_DB_PATH (or --sqlite-db)")
+    if command in ("migrate", "files", "presets") and not per_user:
+        if _is_unset(config.TARGET_USER_ID, "your_open_webui_user_id"):
+            missing.append("TARGET_USER_ID (or --target-user-id)")
+    if command in ("files", "backup"):
+        if _is_unset(config.LIBRECHAT_DOCKER_PATH):
+            missing.append("LIBRECHAT_DOCKER_PATH (or --librechat-path)")
+        elif not os.path.isdir(config.LIBRECHAT_DOCKER_PATH):
+            raise ValueError(f"LIBRECHAT_DOCKER_PATH '{config.LIBRECHAT_DOCKER_PATH}' is not a directory.")
+    if missing:
+        raise ValueError(f"Required settings are not set in .env: {', '.join(missing)}.")
+
+
+def _options(args, names):
+    """Keyword arguments for the given option names that were set on the command line."""
+    return {name: getattr(args, name) for name in names if getattr(args, name, None) is not None}
+
+
+def run_migrate(args, log, events):
+    common = dict(log_callback=log, progress_callback=events.progress, dump_dir=args.dump_dir,
+                  filters=collect_filters(args), incremental=not args.full, fast_pragmas=not args.no_fast_pragmas,
+                  create_indexes=args.create_indexes)
+    tuning = _options(args, ("batch_size", "write_batch_rows", "write_batch_bytes"))
+    tuning.update(read_mode=args.read_mode, workers=args.workers, use_processes=args.processes,
+                  json_encoder=args.json_encoder, timestamp_fallback=args.timestamp_fallback,
+                  streaming=args.streaming)
+    if args.per_user:
+        from scripts.migrate_users import migrate_users
+        return migrate_users(user_mapping=args.user_mapping, **_options(args, ("partition_workers",)),
+                             **common, **tuning)
+    from scripts.migrate_conversations import migrate_conversations
+    return migrate_conversations(dry_run=args.dry_run, metrics_path=args.metrics_path,
+                                 **_options(args, ("sample_size",)), **common, **tuning)
+
+
+def run_files(args, log, events):
+    from scripts.migrate_files import migrate_files
+    return migrate_files(log_callback=log, progress_callback=events.progress, metrics_path=args.metrics_path,
+                         dump_dir=args.dump_dir, per_user=args.per_user, user_mapping=args.user_mapping,
+                         **_options(args, ("upload_dir", "workers")))
+
+
+def run_verify(args, log, events):
+    from scripts.verify_migration import verify_migration
+    return verify_migration(log_callback=log, progress_callback=events.progress, metrics_path=args.metrics_path,
+                            dump_dir=args.dump_dir, filters=collect_filters(args), workers=args.workers,
+                            use_processes=args.processes, **_options(args, ("batch_size", "max_reported")))
+
+
+def run_presets(args, log, events):
+    from scripts.generate_presets import generate_presets
+    return generate_presets(log_callback=log, progress_callback=events.progress, metrics_path=args.metrics_path,
+                            dump_dir=args.dump_dir, filters=collect_filters(args), pretty=args.pretty,
+                            json_encoder=args.json_encoder, dry_run=args.dry_run, import_to_db=args.import_to_db,
+                            export_json=args.export_json)
+
+
+def run_backup(args, log, events):
+    from scripts.backup_librechat import backup_librechat
+    collections = [name.strip() for name in args.collections.split(",") if name.strip()] if args.collections else None
+    return backup_librechat(log_callback=log, progress_callback=events.progress, metrics_path=args.metrics_path,
+                            streaming=args.streaming, collections=collections, incremental=args.incremental,
+                            **_options(args, ("max_delta_chain",)))
+
+
+COMMANDS = {"migrate": run_migrate, "files": run_files, "verify": run_verify, "presets": run_presets, "backup": run_backup}
+
+# Result keys that count as failures, besides errors.
+_FAILURE_KEYS = ("failed_partitions", "mismatched", "missing", "duplicate_chats")
+
+
+def exit_code(result):
+    """Maps a task's return value to an exit code."""
+    if result is None:
+        return EXIT_NOT_STARTED
+    if result.get("errors") or any(result.get(key) for key in _FAILURE_KEYS):
+        return EXIT_ERRORS
+    return EXIT_OK
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    events = EventStream(sys.stdout)
+    log = _log_callback(_LOG_LEVELS[args.log_level], sys.stderr)
+    try:
+        validate_args(args)
+        apply_overrides(args)
+        validate_config(args)
+    except ValueError as e:
+        log(f"Error: {e}")
+        events.emit("result", command=args.command, exit_code=EXIT_USAGE, error=str(e))
+        return EXIT_USAGE
+    try:
+        result = COMMANDS[args.command](args, log, events)
+    except KeyboardInterrupt:
+        events.emit("result", command=args.command, exit_code=EXIT_INTERRUPTED, error="interrupted")
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        log(f"Error: {args.command} failed: {e}")
+        log(debug(traceback.format_exc()))
+        events.emit("result", command=args.command, exit_code=EXIT_ERRORS, error=str(e))
+        return EXIT_ERRORS
+    code = exit_code(result)
+    events.emit("result", command=args.command, exit_code=code, result=result)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
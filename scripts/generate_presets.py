@@ -1,94 +1,303 @@
-import json
+import itertools
 import os
+import sqlite3
+import time
+from contextlib import nullcontext
 from uuid import uuid4
 
-from core.mongo import get_mongo_db
+from core.filters import build_preset_filter, describe_filters
+from core.log import debug, error, warning
+from core.metrics import Metrics
+from core.planner import DEFAULT_SAMPLE_SIZE, free_space, log_plan
+from core.serialization import JsonArrayWriter, dump_to_file, dumps, dumps_bytes
+from core.sources import open_source
+from core.sqlite_writer import DEFAULT_BUSY_TIMEOUT, MODEL_UPSERT_SQL
 from core.time_utils import convert_mongodb_time_to_epoch_seconds
 import config
 
-def generate_presets(log_callback=print):
+# Ids per "WHERE id IN (...)" lookup, below SQLite's default limit on bound parameters.
+_ID_CHUNK = 500
+
+def convert_preset(preset, target_user_id):
+    """Converts a LibreChat preset into an Open WebUI model definition."""
+    libre_title = preset.get('title', 'Untitled')
+    webui_model = {
+        "id": libre_title,
+        "user_id": target_user_id,
+        "base_model_id": preset.get('model', ''),
+        "name": libre_title,
+        "params": {
+            "temperature": preset.get('temperature', 0.8),
+            "system": preset.get('promptPrefix', ''),
+            "top_p": preset.get('top_p', 1.0),
+            "frequency_penalty": preset.get('frequency_penalty', 0.0),
+            "presence_penalty": preset.get('presence_penalty', 0.0),
+        },
+        "meta": {
+            "profile_image_url": None,
+            "description": f"Imported from LibreChat: {libre_title}",
+            "capabilities": {"vision": True, "usage": False, "citations": True},
+            "suggestion_prompts": preset.get('examples', []),
+            "raw_modelfile_content": None,
+            "tags": preset.get('tags', []),
+        },
+        "access_control": None,
+        "is_active": True,
+        "updated_at": convert_mongodb_time_to_epoch_seconds(preset.get('updatedAt')),
+        "created_at": convert_mongodb_time_to_epoch_seconds(preset.get('createdAt')),
+        "user": {
+            "id": target_user_id,
+            "name": "<your_name>",
+            "email": "<your_email>",
+            "role": "admin",
+            "profile_image_url": None
+        }
+    }
+    return webui_model
+
+def model_row(webui_model):
+    """Returns the parameter tuple for MODEL_UPSERT_SQL."""
+    access_control = webui_model["access_control"]
+    return (
+        webui_model["id"],
+        webui_model["user_id"],
+        webui_model["base_model_id"],
+        webui_model["name"],
+        dumps(webui_model["params"]),
+        dumps(webui_model["meta"]),
+        dumps(access_control) if access_control is not None else None,
+        int(webui_model["is_active"]),
+        webui_model["created_at"],
+        webui_model["updated_at"],
+    )
+
+def import_models(sqlite_conn, models):
+    """
+    Upserts Open WebUI model definitions into the model table with one
+    executemany in a single transaction. Models whose id already belongs to
+    another user are not overwritten. Returns a dict with the number of
+    models inserted and updated and the list of conflicting ids.
+    """
+    ids = [model["id"] for model in models]
+    owners = {}
+    for start in range(0, len(ids), _ID_CHUNK):
+        chunk = ids[start:start + _ID_CHUNK]
+        owners.update(sqlite_conn.execute(
+            f"SELECT id, user_id FROM model WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+    rows = []
+    conflicts = []
+    updated = 0
+    for model in models:
+        owner = owners.get(model["id"])
+        if owner is not None and owner != model["user_id"]:
+            conflicts.append(model["id"])
+            continue
+        if owner is not None:
+            updated += 1
+        rows.append(model_row(model))
+    with sqlite_conn:
+        sqlite_conn.executemany(MODEL_UPSERT_SQL, rows)
+    return {"inserted": len(rows) - updated, "updated": updated, "conflicts": conflicts}
+
+def connect_model_table(log_callback=print):
+    """Opens SQLITE_DB_PATH for importing models, or returns None if it is not configured or has no model table."""
+    sqlite_db_path = config.SQLITE_DB_PATH
+    if not sqlite_db_path or "path/to/your/webui.db" in sqlite_db_path:
+        log_callback("Error: SQLITE_DB_PATH is not set in the .env file.")
+        return None
+    try:
+        sqlite_conn = sqlite3.connect(sqlite_db_path, timeout=DEFAULT_BUSY_TIMEOUT)
+        if sqlite_conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'model'").fetchone() is None:
+            sqlite_conn.close()
+            log_callback(error(f"Error: {sqlite_db_path} has no model table. Start Open WebUI once to create its schema."))
+            return None
+    except sqlite3.Error as e:
+        log_callback(f"Error connecting to SQLite database: {e}")
+        return None
+    log_callback(f"Successfully connected to SQLite database: {sqlite_db_path}")
+    return sqlite_conn
+
+def plan_presets(source, preset_filter, target_user_id, output_dir, pretty=False, json_encoder="auto",
+                 sample_size=DEFAULT_SAMPLE_SIZE, import_to_db=False, export_json=True):
+    """
+    Estimates generate_presets without writing anything: counts the matching
+    presets, converts and serializes the first sample_size of them and
+    scales the timings and sizes up. Each preset is written once on its own
+    (or as a model table row with import_to_db) and once more in
+    all_models.json with export_json. Returns the plan as a dict (see
+    core.planner.log_plan).
+    """
+    total = source.count_presets(preset_filter, exact=True) or 0
+    start = time.perf_counter()
+    sample = list(itertools.islice(source.iter_presets(preset_filter), sample_size))
+    read_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    models = [convert_preset(preset, target_user_id) for preset in sample]
+    transform_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    serialized_bytes = sum(len(dumps_bytes([model], pretty=pretty, encoder=json_encoder)) for model in models)
+    write_seconds = time.perf_counter() - start
+
+    scale = total / len(sample) if sample else 0.0
+    copies = 1 + (1 if export_json else 0)
+    stage_seconds = {
+        "read": read_seconds * scale,
+        "transform": transform_seconds * scale,
+        "serialize": write_seconds * scale * copies,
+    }
+    files = (0 if import_to_db else total) + (1 if export_json and total else 0)
+    return {
+        "task": "generate_presets",
+        "documents": total,
+        "rows": total if import_to_db else None,
+        "files": files,
+        "serialized_bytes": round(serialized_bytes * scale),
+        "target_growth_bytes": round(serialized_bytes * scale * copies),
+        "free_bytes": free_space((config.SQLITE_DB_PATH if import_to_db else None) or output_dir),
+        "wall_seconds": sum(stage_seconds.values()),
+        "stage_seconds": stage_seconds,
+        "sample_size": len(sample),
+    }
+
+def generate_presets(log_callback=print, dump_dir=None, source=None, progress_callback=None, metrics_path=None,
+                     pretty=False, json_encoder="auto", filters=None, dry_run=False, sample_size=DEFAULT_SAMPLE_SIZE,
+                     import_to_db=False, export_json=None):
     """
     Connects to a MongoDB database, reads presets from the 'presets' collection,
     and converts them into Open WebUI model format, saving each as a JSON file.
+    With dump_dir, presets are read from a mongodump directory instead, and an
+    already opened source (see core.sources) can be passed as source.
+    Progress and metrics are reported as in migrate_conversations.
+    Files are written as compact JSON (indented with pretty) using orjson when
+    it is installed; json_encoder forces "orjson" or "stdlib".
+    filters restricts which presets are read, as in migrate_conversations
+    (conversation_ids does not apply).
+    With import_to_db, the models are upserted straight into the model table
+    of the Open WebUI database in one transaction instead of being written
+    as files (see import_models); presets sharing a title are deduplicated
+    and ids owned by another user are reported as conflicts. export_json
+    controls the all_models.json export, which is streamed to disk one
+    model at a time; it defaults to on for files and off for import_to_db.
+    With dry_run, nothing is written: the number of files, their total size
+    and the run time are estimated from a sample of sample_size presets
+    (see plan_presets), logged and returned.
+    Returns a dict report (converted, inserted, updated, duplicates,
+    conflicts, errors), the plan with dry_run, or None if it could not start.
     """
-    mongo_db, mongo_client = get_mongo_db()
-    if not mongo_db:
-        log_callback("MongoDB connection failed. Aborting preset generation.")
+    preset_filter = build_preset_filter(filters)
+    if source is None:
+        source = open_source(dump_dir, config.MONGO_DB_NAME, log_callback)
+    if source is None:
+        log_callback(error("Could not open the LibreChat data source. Aborting preset generation."))
         return
 
-    librechat_preset_collection = mongo_db["presets"]
     output_dir = config.OUTPUT_DIR
     target_user_id = config.TARGET_USER_ID
 
     if not target_user_id or "your_open_webui_user_id" in target_user_id:
         log_callback("Error: TARGET_USER_ID is not set in the .env file.")
-        mongo_client.close()
+        source.close()
         return
 
-    os.makedirs(output_dir, exist_ok=True)
-    log_callback(f"Reading presets from '{config.MONGO_DB_NAME}.presets' and converting to Open WebUI format...")
+    log_callback(f"Reading presets from {source.description} and converting to Open WebUI format...")
+    if preset_filter:
+        log_callback(f"Filters: {describe_filters(filters)}")
+    if dry_run:
+        plan = plan_presets(source, preset_filter, target_user_id, output_dir, pretty, json_encoder, sample_size,
+                            import_to_db, not import_to_db if export_json is None else export_json)
+        log_plan(plan, log_callback)
+        source.close()
+        return plan
 
+    sqlite_conn = None
+    if import_to_db:
+        sqlite_conn = connect_model_table(log_callback)
+        if sqlite_conn is None:
+            source.close()
+            return
+    if export_json is None:
+        export_json = not import_to_db
+    if export_json or not import_to_db:
+        os.makedirs(output_dir, exist_ok=True)
+
+    metrics = Metrics("generate_presets", total=source.count_presets(preset_filter), progress_callback=progress_callback,
+                      log_callback=log_callback)
     count = 0
-    all_model = []
-    for preset in librechat_preset.find():
+    models = {}
+    duplicates = []
+    exporter = JsonArrayWriter(os.path.join(output_dir, "all_models.json"), pretty, json_encoder) if export_json else None
+    with exporter or nullcontext():
+        for preset in metrics.timed_iter("mongo_fetch", source.iter_presets(preset_filter)):
+            metrics.advance()
+            try:
+                libre_title = preset.get('title', 'Untitled')
+                log_callback(debug(f"  Processing preset: {libre_title}"))
+
+                with metrics.stage("convert"):
+                    webui_model = convert_preset(preset, target_user_id)
+
+                if not import_to_db:
+                    safe_title = "".join(c for c in libre_title if c.isalnum() or c in (' ', '_')).rstrip().replace(' ', '_')
+                    filename = f"Model-{safe_title}.json"
+                    filepath = os.path.join(output_dir, filename)
+
+                    with metrics.stage("write_file"):
+                        dump_to_file([webui_model], filepath, pretty=pretty, encoder=json_encoder)
+
+                    log_callback(debug(f"    Successfully converted to: {filename}"))
+                if exporter is not None:
+                    with metrics.stage("write_file"):
+                        exporter.write(webui_model)
+                if import_to_db:
+                    # Presets with the same title map to the same model id; the most recently updated one wins.
+                    previous = models.get(webui_model["id"])
+                    if previous is not None:
+                        duplicates.append(webui_model["id"])
+                    if previous is None or (webui_model["updated_at"] or 0) >= (previous["updated_at"] or 0):
+                        models[webui_model["id"]] = webui_model
+                count += 1
+                metrics.incr("rows")
+
+            except Exception as e:
+                log_callback(error(f"  Error processing preset '{preset.get('title', 'N/A')}' (ID: {preset.get('_id')}): {e}"))
+                metrics.incr("errors")
+
+    if exporter is not None and exporter.count == 0:
+        os.remove(exporter.path)
+
+    report = {"converted": count, "inserted": 0, "updated": 0, "duplicates": len(duplicates), "conflicts": [],
+              "errors": metrics.counters.get("errors", 0)}
+    if import_to_db:
+        if duplicates:
+            log_callback(warning(f"Warning: {len(duplicates)} presets share a title with another preset; kept the most "
+                                 f"recently updated of each: {', '.join(sorted(set(duplicates))[:10])}"))
         try:
-            libre_title = preset.get('title', 'Untitled')
-            log_callback(f"  Processing preset: {libre_title}")
-
-            webui_model = {
-                "id": libre_title,
-                "user_id": target_user_id,
-                "base_model_id": preset.get('model', ''),
-                "name": libre_title,
-                "params": {
-                    "temperature": preset.get('temperature', 0.8),
-                    "system": preset.get('promptPrefix', ''),
-                    "top_p": preset.get('top_p', 1.0),
-                    "frequency_penalty": preset.get('frequency_penalty', 0.0),
-                    "presence_penalty": preset.get('presence_penalty', 0.0),
-                },
-                "meta": {
-                    "profile_image_url": None,
-                    "description": f"Imported from LibreChat: {libre_title}",
-                    "capabilities": {"vision": True, "usage": False, "citations": True},
-                    "suggestion_prompts": preset.get('examples', []),
-                    "raw_modelfile_content": None,
-                    "tags": preset.get('tags', []),
-                },
-                "access_control": None,
-                "is_active": True,
-                "updated_at": convert_mongodb_time_to_epoch_seconds(preset.get('updatedAt')),
-                "created_at": convert_mongodb_time_to_epoch_seconds(preset.get('createdAt')),
-                "user": {
-                    "id": target_user_id,
-                    "name": "<your_name>",
-                    "email": "<your_email>",
-                    "role": "admin",
-                    "profile_image_url": None
-                }
-            }
-
-            safe_title = "".join(c for c in libre_title if c.isalnum() or c in (' ', '_')).rstrip().replace(' ', '_')
-            filename = f"Model-{safe_title}.json"
-            filepath = os.path.join(output_dir, filename)
-
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump([webui_model], f, ensure_ascii=False, indent=2)
-
-            log_callback(f"    Successfully converted to: {filename}")
-            count += 1
-            all_model.append(webui_model)
-
-        except Exception as e:
-            log_callback(f"  Error processing preset '{preset.get('title', 'N/A')}' (ID: {preset.get('_id')}): {e}")
-
-    if all_model:
-        with open(os.path.join(output_dir, "all_models.json"), 'w', encoding='utf-8') as f:
-            json.dump(all_model, f, ensure_ascii=False, indent=2)
-
-    log_callback(f"\nConversion complete! {count} presets converted and saved in '{output_dir}'.")
-    mongo_client.close()
-    log_callback("MongoDB connection closed.")
+            with metrics.stage("sqlite_insert"):
+                report.update(import_models(sqlite_conn, list(models.values())))
+        except sqlite3.Error as e:
+            log_callback(error(f"  Error importing presets into the model table: {e}"))
+            metrics.incr("errors")
+            report["errors"] += 1
+        if report["conflicts"]:
+            log_callback(warning(f"Warning: {len(report['conflicts'])} model ids already belong to another user and were "
+                                 f"not overwritten: {', '.join(report['conflicts'][:10])}"))
+        sqlite_conn.close()
+
+    metrics.finish()
+    if metrics_path:
+        metrics.write_report(metrics_path)
+        log_callback(f"Metrics report written to {metrics_path}")
+
+    if import_to_db:
+        log_callback(f"\nImport complete! {count} presets converted; {report['inserted']} models inserted and "
+                     f"{report['updated']} updated in {config.SQLITE_DB_PATH}.")
+        if exporter is not None:
+            log_callback(f"Exported all models to '{exporter.path}'.")
+    else:
+        log_callback(f"\nConversion complete! {count} presets converted and saved in '{output_dir}'.")
+    source.close()
+    log_callback("Data source closed.")
+    return report
 
 if __name__ == '__main__':
     generate_presets()
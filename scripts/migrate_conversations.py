@@ -1,147 +1,796 @@
+import hashlib
 import sqlite3
-import json
+import tempfile
+import time
 from uuid import uuid4
-import pymongo
 
-from core.mongo import get_mongo_db
-from core.time_utils import convert_mongodb_time_to_epoch_seconds
+import bson
+
+from core.file_transfer import webui_file_reference
+from core.filters import build_conversation_filter, combine_filters, describe_filters, filter_scope
+from core.ledger import LEDGER_UPSERT_SQL, MigrationLedger, content_hash
+from core.log import debug, error, warning
+from core.message_tree import (
+    BROKEN_CYCLES, DUPLICATE_MESSAGES, ORPHANED_MESSAGES, build_history, build_message_tree,
+)
+from core.metrics import Metrics
+from core.pipeline import DEFAULT_QUEUE_SIZE, run_pipeline
+from core.planner import DEFAULT_SAMPLE_SIZE, free_space, log_plan, open_read_only, project_wall_time, trial_write
+from core.readers import DEFAULT_BATCH_SIZE
+from core.serialization import dumps, dumps_bytes, encoder_name, utf8_length
+from core.sources import open_source
+from core.sqlite_writer import (
+    BulkWriter, CHAT_INSERT_SQL, CHAT_STREAM_INSERT_SQL, CHAT_STREAM_UPSERT_SQL, CHAT_UPSERT_SQL, DEFAULT_BATCH_BYTES,
+    DEFAULT_BATCH_ROWS, DEFAULT_BUSY_TIMEOUT, write_text_incrementally,
+)
+from core.time_utils import (
+    FALLBACK_NOW, FALLBACK_RAISE, FALLBACKS, INVALID_TIMESTAMPS, TimestampConversionError, convert_many, convert_mongodb_time_to_epoch_seconds,
+    epoch_seconds_to_datetime,
+)
 import config
 
-def migrate_conversations(log_callback=print):
+CONVERSION_EMPTY = "empty"
+CONVERSION_UNCHANGED = "unchanged"
+CONVERSION_NEW = "new"
+CONVERSION_UPDATED = "updated"
+
+# Conversations can be edited while a run reads them, after the cursor has passed them.
+# The saved checkpoint never goes past the run's start time minus this margin (which also
+# covers clock skew between this host and MongoDB), so the next run picks those edits up.
+CHECKPOINT_MARGIN_SECONDS = 5 * 60
+
+# Streaming: the encode buffer stays in memory up to STREAM_BUFFER_MEMORY bytes and spills
+# to a temporary file beyond that; chats up to STREAM_INLINE_BYTES are still batched normally.
+STREAM_BUFFER_MEMORY = 8 * 1024 * 1024
+STREAM_INLINE_BYTES = 1024 * 1024
+_STREAM_CHUNK_SIZE = 1024 * 1024
+_HISTORY_PLACEHOLDER = b'"history":{"messages":{},"currentId":null},"messages":[]'
+_TREE_FIELDS = ("id", "parentId", "childrenIds")
+
+def convert_message(msg, msg_timestamp_epoch, models_in_chat, files=None):
+    """
+    Converts one LibreChat message into an Open WebUI message, adding its
+    model to models_in_chat. files maps LibreChat file ids to the Open WebUI
+    references of migrated files (see core.file_transfer.webui_file_reference);
+    attachments that were not migrated are left out.
+    """
+    role = "assistant" if not msg.get('isCreatedByUser', False) else "user"
+    msg_content = msg.get('text', '')
+    msg_id = msg.get('messageId')
+    msg_id = str(msg_id) if msg_id is not None else str(uuid4())
+    parent_id = msg.get('parentMessageId')
+    if parent_id == "00000000-0000-0000-0000-000000000000" or parent_id is None:
+        parent_id = None
+    else:
+        parent_id = str(parent_id)
+
+    msg_model = msg.get('model')
+    if msg_model:
+        models_in_chat.add(msg_model)
+
+    message = {
+        "id": msg_id,
+        "parentId": parent_id,
+        "childrenIds": [],
+        "role": role,
+        "content": msg_content,
+        "model": msg_model if role == 'assistant' else None,
+        "timestamp": msg_timestamp_epoch,
+    }
+    if files and msg.get('files'):
+        references = [files[attachment.get('file_id')] for attachment in msg['files']
+                      if isinstance(attachment, dict) and attachment.get('file_id') in files]
+        if references:
+            message["files"] = references
+    return message
+
+def conversation_files(messages, files):
+    """The entries of files referenced by messages, so workers only receive what they need."""
+    if not files:
+        return None
+    return {attachment.get('file_id'): files[attachment.get('file_id')]
+            for msg in messages for attachment in (msg.get('files') or ())
+            if isinstance(attachment, dict) and attachment.get('file_id') in files} or None
+
+def collect_files(message, chat_files):
+    """Adds the files of a converted message to chat_files (Open WebUI file id -> reference), once per file."""
+    for reference in message.get("files", ()):
+        chat_files.setdefault(reference["id"], reference)
+
+def chat_envelope(conv, models_in_chat, history_messages, current_id, path_messages, created_at_epoch,
+                  chat_files=None):
+    """
+    The Open WebUI chat JSON structure: history maps every message id to its
+    message, currentId is the active leaf and messages is the branch leading to
+    it. files lists every file attached to the messages (see collect_files).
+    """
+    return {
+        "id": "",
+        "title": conv.get('title', 'Imported Conversation'),
+        "models": list(models_in_chat),
+        "params": {},
+        "history": {"messages": history_messages, "currentId": current_id},
+        "messages": path_messages,
+        "tags": conv.get('tags', []),
+        "timestamp": created_at_epoch * 1000,
+        "files": list(chat_files.values()) if chat_files else []
+    }
+
+def build_chat_json(conv, messages, timings=None, timestamp_fallback=FALLBACK_NOW, counters=None, files=None):
+    """
+    Converts a LibreChat conversation and its messages (sorted by createdAt)
+    into the Open WebUI chat JSON structure, with the messages arranged as a
+    tree (see core.message_tree.build_history). If a timings dict is given, the
+    seconds spent on time conversion and on building the JSON are added to it.
+    Invalid timestamps are handled per timestamp_fallback (see
+    core.time_utils) and counted in counters; a message's parent timestamp
+    is its conversation's createdAt. files is passed to convert_message.
+    """
+    start = time.perf_counter()
+    created_at_epoch = convert_mongodb_time_to_epoch_seconds(conv.get('createdAt'), timestamp_fallback, counters=counters)
+    msg_timestamps = convert_many([msg.get('createdAt') for msg in messages], timestamp_fallback,
+                                  parent=created_at_epoch, counters=counters)
+    converted = time.perf_counter()
+
+    model_name = conv.get('model', None)
+
+    open_webui_messages = []
+    models_in_chat = {model_name} if model_name else set()
+    chat_files = {}
+
+    for msg, msg_timestamp_epoch in zip(messages, msg_timestamps):
+        message = convert_message(msg, msg_timestamp_epoch, models_in_chat, files)
+        collect_files(message, chat_files)
+        open_webui_messages.append(message)
+
+    history_messages, current_id, path_messages = build_history(open_webui_messages, counters)
+    chat_json_data = chat_envelope(conv, models_in_chat, history_messages, current_id, path_messages,
+                                   created_at_epoch, chat_files)
+    if timings is not None:
+        timings["time_conversion"] = timings.get("time_conversion", 0.0) + converted - start
+        timings["json_build"] = timings.get("json_build", 0.0) + time.perf_counter() - converted
+    return chat_json_data
+
+def serialize_chat(chat_json_data, json_encoder="auto"):
+    """Serializes the chat JSON structure for the chat column as compact JSON."""
+    return dumps(chat_json_data, encoder=json_encoder)
+
+def build_chat_row(conv, messages, target_user_id, chat_id=None, timings=None,
+                   timestamp_fallback=FALLBACK_NOW, counters=None, json_encoder="auto", files=None):
+    """
+    Converts a LibreChat conversation and its messages (sorted by createdAt)
+    into the parameter tuple for CHAT_INSERT_SQL. A new chat id is generated
+    unless chat_id is given. Stage durations are added to timings, if given.
+    """
+    chat_json_data = build_chat_json(conv, messages, timings, timestamp_fallback, counters, files)
+    start = time.perf_counter()
+    chat_json_string = serialize_chat(chat_json_data, json_encoder)
+    if timings is not None:
+        timings["serialize"] = timings.get("serialize", 0.0) + time.perf_counter() - start
+    created_at_epoch = chat_json_data["timestamp"] // 1000
+    updated_at_epoch = convert_mongodb_time_to_epoch_seconds(conv.get('updatedAt'), timestamp_fallback,
+                                                             parent=created_at_epoch, counters=counters)
+
+    new_chat_id = chat_id or str(uuid4())
+    meta_json = "{}"
+    folder_id = None
+
+    return (
+        new_chat_id,
+        target_user_id,
+        chat_json_data["title"],
+        0,
+        created_at_epoch,
+        updated_at_epoch,
+        chat_json_string,
+        0,
+        meta_json,
+        folder_id
+    )
+
+def convert_conversation(conv, messages, target_user_id, entry, incremental, timestamp_fallback=FALLBACK_NOW,
+                         json_encoder="auto", files=None):
+    """
+    Transform stage of the migration, run on the worker pool.
+    Returns a (status, params, chat_hash, timings, counters) tuple where status
+    is one of the CONVERSION_* constants, params is None unless the chat must
+    be written, timings maps stage names to seconds spent in them and counters
+    holds data-quality counts such as invalid timestamps. Chats with migrated
+    files (see conversation_files) are compared by content hash even when
+    their updatedAt is unchanged, as the files may have been migrated since.
+    """
+    timings = {}
+    counters = {"messages": len(messages)}
+    if not messages:
+        return CONVERSION_EMPTY, None, None, timings, counters
+    if (entry and not files
+            and entry.source_updated_at == convert_mongodb_time_to_epoch_seconds(conv.get('updatedAt'))):
+        return CONVERSION_UNCHANGED, None, None, timings, counters
+
+    params = build_chat_row(conv, messages, target_user_id, chat_id=entry.chat_id if entry else None,
+                            timings=timings, timestamp_fallback=timestamp_fallback, counters=counters,
+                            json_encoder=json_encoder, files=files)
+    chat_hash = None
+    if incremental:
+        start = time.perf_counter()
+        chat_hash = content_hash(params[6])
+        timings["hash"] = time.perf_counter() - start
+        if entry and entry.content_hash == chat_hash:
+            return CONVERSION_UNCHANGED, None, None, timings, counters
+    return (CONVERSION_UPDATED if entry else CONVERSION_NEW), params, chat_hash, timings, counters
+
+class StreamedChat:
+    """
+    A chat JSON value encoded into a reusable buffer by encode_chat_streaming.
+    The buffer holds each message's fields except id, parentId and
+    childrenIds, which are spliced in from the message tree when the value is
+    read. Those fields are encoded once, when the value is created, along
+    with its total size in bytes. Only valid until the buffer is reused.
+    """
+
+    def __init__(self, head, tail, buffer, spans, tree, message_count, created_at_epoch, json_encoder="auto"):
+        self.head = head
+        self.tail = tail
+        self.buffer = buffer
+        self.spans = spans
+        self.tree = tree
+        self.message_count = message_count
+        self.created_at_epoch = created_at_epoch
+        self.json_encoder = json_encoder
+        self._keys = {message_id: self._encode(message_id) for message_id in tree.order}
+        self._prefixes = {
+            message_id: (b'{"id":' + key + b',"parentId":' + self._encode(tree.parents[message_id])
+                         + b',"childrenIds":' + self._encode(tree.children[message_id]) + b',')
+            for message_id, key in self._keys.items()
+        }
+        self.size = sum(piece[1] if isinstance(piece, tuple) else len(piece) for piece in self._pieces())
+
+    def _encode(self, value):
+        return dumps_bytes(value, encoder=self.json_encoder)
+
+    def _message_pieces(self, message_id):
+        yield self._prefixes[message_id]
+        yield self.spans[message_id]
+
+    def _pieces(self):
+        """Yields bytes, or (offset, length) spans of the buffer, in output order."""
+        yield self.head
+        for index, message_id in enumerate(self.tree.order):
+            yield (b',' if index else b'') + self._keys[message_id] + b':'
+            yield from self._message_pieces(message_id)
+        yield b'},"currentId":' + self._encode(self.tree.current_id) + b'},"messages":['
+        for index, message_id in enumerate(self.tree.path):
+            if index:
+                yield b','
+            yield from self._message_pieces(message_id)
+        yield self.tail
+
+    def __len__(self):
+        return self.size
+
+    def chunks(self):
+        """Yields the UTF-8 encoded chat JSON in pieces of at most a few MiB."""
+        for piece in self._pieces():
+            if not isinstance(piece, tuple):
+                yield piece
+                continue
+            offset, remaining = piece
+            self.buffer.seek(offset)
+            while remaining > 0:
+                chunk = self.buffer.read(min(_STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def text(self):
+        return b"".join(self.chunks()).decode('utf-8')
+
+    def hash(self):
+        """Same value as core.ledger.content_hash of the full text."""
+        digest = hashlib.sha256()
+        for chunk in self.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def writer(self, chat_id):
+        """Returns a write_value callable for BulkWriter.add_streamed that fills in this chat's column."""
+        def write_value(sqlite_conn):
+            rowid = sqlite_conn.execute("SELECT rowid FROM chat WHERE id = ?", (chat_id,)).fetchone()[0]
+            write_text_incrementally(sqlite_conn, "chat", "chat", rowid, self.chunks())
+        return write_value
+
+def new_stream_buffer():
+    """The reusable buffer for encode_chat_streaming."""
+    return tempfile.SpooledTemporaryFile(max_size=STREAM_BUFFER_MEMORY)
+
+def encode_chat_streaming(conv, messages, buffer, timings=None, timestamp_fallback=FALLBACK_NOW, counters=None,
+                          json_encoder="auto", files=None):
+    """
+    Streaming counterpart of build_chat_json plus serialize_chat: consumes
+    messages (an iterator sorted by createdAt, e.g. a cursor) one at a time,
+    encodes each converted message straight into buffer and drops the source
+    document, so memory depends on the largest message rather than the whole
+    conversation. Only ids and buffer offsets are kept to build the message
+    tree. The encoded bytes match serialize_chat's output.
+    Returns a StreamedChat.
+    """
+    start = time.perf_counter()
+    created_at_epoch = convert_mongodb_time_to_epoch_seconds(conv.get('createdAt'), timestamp_fallback, counters=counters)
+    model_name = conv.get('model', None)
+    models_in_chat = {model_name} if model_name else set()
+
+    buffer.seek(0)
+    buffer.truncate()
+    links = []
+    spans = {}
+    chat_files = {}
+    for msg in messages:
+        msg_timestamp_epoch = convert_mongodb_time_to_epoch_seconds(msg.get('createdAt'), timestamp_fallback,
+                                                                    parent=created_at_epoch, counters=counters)
+        message = convert_message(msg, msg_timestamp_epoch, models_in_chat, files)
+        collect_files(message, chat_files)
+        links.append((message["id"], message["parentId"]))
+        if message["id"] in spans:
+            continue
+        # Everything after the tree fields, without the opening brace.
+        encoded = dumps_bytes({key: value for key, value in message.items() if key not in _TREE_FIELDS},
+                              encoder=json_encoder)[1:]
+        spans[message["id"]] = (buffer.tell(), len(encoded))
+        buffer.write(encoded)
+    tree = build_message_tree(links, counters)
+
+    # Encode the envelope with an empty history and splice the messages into it.
+    envelope = dumps_bytes(chat_envelope(conv, models_in_chat, {}, None, [], created_at_epoch, chat_files),
+                           encoder=json_encoder)
+    head, tail = envelope.split(_HISTORY_PLACEHOLDER, 1)
+    if timings is not None:
+        # Includes fetching the messages, which happens lazily while encoding.
+        timings["stream_encode"] = timings.get("stream_encode", 0.0) + time.perf_counter() - start
+    return StreamedChat(head + b'"history":{"messages":{', b']' + tail, buffer, spans, tree, len(links),
+                        created_at_epoch, json_encoder)
+
+def stream_conversation(conv, messages, target_user_id, entry, incremental, buffer,
+                        timestamp_fallback=FALLBACK_NOW, json_encoder="auto", files=None):
+    """
+    Streaming counterpart of convert_conversation. The chat column of the
+    returned params is a str for chats up to STREAM_INLINE_BYTES and a
+    StreamedChat (to be written with BulkWriter.add_streamed) otherwise.
+    files holds every migrated file, since the messages are only read while
+    encoding. LibreChat records attachments on the messages, which are not
+    known before encoding, so an unchanged updatedAt only skips the
+    conversation when no files have been migrated; otherwise it is encoded
+    and compared by content hash.
+    """
+    timings = {}
+    counters = {}
+    if (entry and not files
+            and entry.source_updated_at == convert_mongodb_time_to_epoch_seconds(conv.get('updatedAt'))):
+        messages.close()
+        return CONVERSION_UNCHANGED, None, None, timings, counters
+
+    streamed = encode_chat_streaming(conv, messages, buffer, timings, timestamp_fallback, counters, json_encoder,
+                                     files)
+    counters["messages"] = streamed.message_count
+    if not streamed.message_count:
+        return CONVERSION_EMPTY, None, None, timings, counters
+
+    created_at_epoch = streamed.created_at_epoch
+    updated_at_epoch = convert_mongodb_time_to_epoch_seconds(conv.get('updatedAt'), timestamp_fallback,
+                                                             parent=created_at_epoch, counters=counters)
+    chat_hash = None
+    if incremental:
+        start = time.perf_counter()
+        chat_hash = streamed.hash()
+        timings["hash"] = time.perf_counter() - start
+        if entry and entry.content_hash == chat_hash:
+            return CONVERSION_UNCHANGED, None, None, timings, counters
+
+    chat_value = streamed.text() if streamed.size <= STREAM_INLINE_BYTES else streamed
+    params = (
+        entry.chat_id if entry else str(uuid4()),
+        target_user_id,
+        conv.get('title', 'Imported Conversation'),
+        0,
+        created_at_epoch,
+        updated_at_epoch,
+        chat_value,
+        0,
+        "{}",
+        None,
+    )
+    return (CONVERSION_UPDATED if entry else CONVERSION_NEW), params, chat_hash, timings, counters
+
+def _run_streamed(tasks, buffer):
+    """Runs stream_conversation inline over tasks, yielding (task, result, error) like run_pipeline."""
+    for task in tasks:
+        try:
+            result = stream_conversation(*task[:5], buffer, *task[5:])
+        except Exception as e:
+            yield task, None, e
+            continue
+        yield task, result, None
+
+def source_updated_at(conv):
+    """Returns the conversation's updatedAt in epoch seconds, or None if it is missing or invalid."""
+    try:
+        return convert_mongodb_time_to_epoch_seconds(conv.get('updatedAt'), FALLBACK_RAISE)
+    except TimestampConversionError:
+        return None
+
+def plan_migration(source, conv_filter, target_user_id, ledger_entries, incremental, timestamp_fallback=FALLBACK_NOW,
+                   json_encoder="auto", batch_size=DEFAULT_BATCH_SIZE, write_batch_rows=DEFAULT_BATCH_ROWS,
+                   write_batch_bytes=DEFAULT_BATCH_BYTES, workers=0, sqlite_db_path=None, sample_size=DEFAULT_SAMPLE_SIZE):
+    """
+    Estimates a migration without writing anything. Counts the matching
+    conversations exactly, converts a random sample of sample_size of them
+    as the migration would, inserts the resulting rows into an in-memory
+    database, and scales the sample's timings and sizes up to the whole run.
+    Source sizes come from collStats and $bsonSize, or from encoding the
+    sample when the server (or a dump) does not provide them. Updated chats
+    are assumed to reuse their rows' pages, so only new chats count toward
+    the target's growth. Returns the plan as a dict (see core.planner.log_plan).
+    """
+    total = source.count_conversations(conv_filter, exact=True) or 0
+    start = time.perf_counter()
+    sample = source.sample_conversations(conv_filter, size=sample_size, batch_size=batch_size) if total else []
+    read_seconds = time.perf_counter() - start
+
+    statuses = {}
+    messages = 0
+    serialized_bytes = 0
+    transform_seconds = 0.0
+    rows = []
+    ledger_rows = []
+    new_rows = 0
+    for conv, conv_messages in sample:
+        messages += len(conv_messages)
+        start = time.perf_counter()
+        try:
+            status, params, chat_hash, _timings, _counters = convert_conversation(
+                conv, conv_messages, target_user_id, ledger_entries.get(conv.get('conversationId')), incremental,
+                timestamp_fallback, json_encoder)
+        except Exception:
+            status, params = "errors", None
+        transform_seconds += time.perf_counter() - start
+        statuses[status] = statuses.get(status, 0) + 1
+        if params is None:
+            continue
+        rows.append(params)
+        ledger_rows.append((conv.get('conversationId'), params[0], params[5], chat_hash or "", 0))
+        serialized_bytes += len(params[6].encode("utf-8"))
+        if status == CONVERSION_NEW:
+            new_rows += 1
+
+    write_seconds, growth = trial_write(rows, CHAT_INSERT_SQL, ledger_rows, LEDGER_UPSERT_SQL if incremental else None,
+                                        write_batch_rows, write_batch_bytes)
+
+    conv_ids = [conv.get('conversationId') for conv, _messages in sample]
+    sampled_message_bytes = source.message_bytes(conv_ids) if conv_ids else 0
+    if sampled_message_bytes is None:
+        sampled_message_bytes = sum(len(bson.encode(msg)) for _conv, conv_messages in sample for msg in conv_messages)
+    conversation_stats = source.collection_stats("conversations")
+    if conversation_stats and conversation_stats["avg_obj_size"]:
+        conversation_bytes = conversation_stats["avg_obj_size"] * total
+    else:
+        conversation_bytes = sum(len(bson.encode(conv)) for conv, _messages in sample) * total / max(len(sample), 1)
+
+    scale = total / len(sample) if sample else 0.0
+    stage_seconds = {
+        "read": read_seconds * scale,
+        "transform": transform_seconds * scale,
+        "write": write_seconds * scale,
+    }
+    return {
+        "task": "migrate_conversations",
+        "documents": total,
+        "rows": round(len(rows) * scale),
+        "new_rows": round(new_rows * scale),
+        "messages": round(messages * scale),
+        "statuses": {status: round(count * scale) for status, count in statuses.items()},
+        "source_bytes": round(conversation_bytes + sampled_message_bytes * scale),
+        "serialized_bytes": round(serialized_bytes * scale),
+        "target_growth_bytes": round(growth / len(rows) * new_rows * scale) if rows else 0,
+        "free_bytes": free_space(sqlite_db_path) if sqlite_db_path else None,
+        "wall_seconds": project_wall_time(stage_seconds["read"], stage_seconds["transform"],
+                                          stage_seconds["write"], workers),
+        "stage_seconds": stage_seconds,
+        "sample_size": len(sample),
+        "batch_size": batch_size,
+        "workers": workers,
+    }
+
+def migrate_conversations(log_callback=print, read_mode="auto", batch_size=DEFAULT_BATCH_SIZE,
+                          write_batch_rows=DEFAULT_BATCH_ROWS, write_batch_bytes=DEFAULT_BATCH_BYTES,
+                          fast_pragmas=True, incremental=True, workers=0, use_processes=False,
+                          queue_size=DEFAULT_QUEUE_SIZE, dump_dir=None, source=None,
+                          progress_callback=None, metrics_path=None, timestamp_fallback=FALLBACK_NOW,
+                          json_encoder="auto", create_indexes=False, filters=None, target_user_id=None,
+                          ledger_entries=None, metrics_task="migrate_conversations", streaming=False,
+                          dry_run=False, sample_size=DEFAULT_SAMPLE_SIZE):
     """
     Migrates conversations from LibreChat (MongoDB) to Open WebUI (SQLite).
+
+    read_mode selects how messages are fetched: "grouped" streams the messages
+    collection once alongside the conversations cursor, "batched" fetches the
+    messages of each batch of conversations with one $in query,
+    "per_conversation" runs one messages query per conversation, and "auto"
+    picks "batched" when conversations are filtered (by filters or an
+    incremental checkpoint) and "grouped" otherwise.
+
+    With incremental, a ledger table in the SQLite database records which chat
+    each conversation was migrated to. Later runs only read conversations
+    updated since the last checkpoint, update changed chats in place and skip
+    unchanged ones.
+
+    Rows are written with executemany in batches of write_batch_rows rows or
+    write_batch_bytes bytes. With fast_pragmas, the import runs with WAL
+    journaling, synchronous=NORMAL and a larger page cache/mmap, and the
+    original settings are restored afterwards.
+
+    With workers > 0 the migration runs as a pipeline: one reader thread pulls
+    from MongoDB into a bounded queue of queue_size conversations, a pool of
+    workers (processes with use_processes, otherwise threads) builds and
+    serializes the chat JSON, and this thread remains the single SQLite writer.
+
+    With dump_dir, conversations and messages are read from a mongodump
+    directory (e.g. one produced by backup_librechat) instead of MongoDB. An
+    already opened source (see core.sources) can be passed as source; it is
+    closed when the migration ends.
+
+    Progress is reported as throttled core.metrics.ProgressEvent objects to
+    progress_callback, or as log lines when it is not given. Per-stage
+    timings and counters are written as JSON to metrics_path, if given.
+
+    timestamp_fallback decides what happens to unparseable timestamps: "now"
+    uses the current time, "parent" uses the conversation's timestamp and
+    "raise" skips the conversation as failed. Replaced values are counted and
+    reported at the end instead of being logged one by one.
+
+    The chat JSON is serialized compactly with orjson when it is installed
+    and the standard library otherwise; json_encoder ("auto", "orjson" or
+    "stdlib") forces a choice.
+
+    Before reading, the indexes the queries rely on are verified and the
+    message query plan is logged; with create_indexes, missing indexes are
+    created.
+
+    filters limits the migration to a subset of conversations and is pushed
+    down into the conversations query (see core.filters): created_after,
+    created_before, updated_after and updated_before take dates or ISO
+    timestamps, user_ids, conversation_ids, endpoints and models take lists
+    or comma separated strings. Incremental checkpoints are kept separately
+    for each set of filters.
+
+    Chats are owned by target_user_id, which defaults to TARGET_USER_ID from
+    the configuration. ledger_entries lets a caller that runs several
+    migrations (see scripts.migrate_users) load the ledger once, and
+    metrics_task names this run in progress events.
+
+    Files copied by scripts.migrate_files are listed on the messages that
+    reference them; run it first to migrate attachments.
+
+    With streaming, for very large conversations, each conversation's
+    messages are read lazily from a cursor and encoded one by one into a
+    reusable buffer that spills to a temporary file, and chats larger than
+    STREAM_INLINE_BYTES are copied into the chat column with SQLite's
+    incremental blob I/O. Peak memory then depends on the largest message
+    rather than the largest conversation. Streaming reads one messages query
+    per conversation and ignores read_mode and workers.
+
+    With dry_run, nothing is written to either database: the SQLite database
+    is opened read-only, a sample of sample_size conversations is converted
+    and written to an in-memory database, and the projected rows, bytes,
+    target growth and wall time are logged and returned (see plan_migration).
+
+    Returns a dict of counts (migrated, updated, unchanged, skipped, errors),
+    the plan with dry_run, or None if the migration could not start.
     """
-    mongo_db, mongo_client = get_mongo_db()
-    if not mongo_db:
-        log_callback("MongoDB connection failed. Aborting migration.")
+    if timestamp_fallback not in FALLBACKS:
+        raise ValueError(f"Unknown timestamp fallback '{timestamp_fallback}'. Expected one of: {', '.join(FALLBACKS)}")
+    json_encoder_name = encoder_name(json_encoder)
+    user_filter = build_conversation_filter(filters)
+    scope = filter_scope(filters)
+    if source is None:
+        source = open_source(dump_dir, config.MONGO_DB_NAME, log_callback)
+    if source is None:
+        log_callback(error("Could not open the LibreChat data source. Aborting migration."))
         return
 
     sqlite_db_path = config.SQLITE_DB_PATH
-    target_user_id = config.TARGET_USER_ID
+    target_user_id = target_user_id or config.TARGET_USER_ID
 
     if not target_user_id or "your_open_webui_user_id" in target_user_id:
         log_callback("Error: TARGET_USER_ID is not set in the .env file.")
-        mongo_client.close()
+        source.close()
         return
         
     if not sqlite_db_path or "path/to/your/webui.db" in sqlite_db_path:
         log_callback("Error: SQLITE_DB_PATH is not set in the .env file.")
-        mongo_client.close()
+        source.close()
         return
 
     try:
-        sqlite_conn = sqlite3.connect(sqlite_db_path)
-        sqlite_conn.row_factory = sqlite3.Row
-        sqlite_cursor = sqlite_conn.cursor()
-        log_callback(f"Successfully connected to SQLite database: {sqlite_db_path}")
+        if dry_run:
+            sqlite_conn = open_read_only(sqlite_db_path)
+            if sqlite_conn is None:
+                log_callback(f"SQLite database {sqlite_db_path} does not exist yet; planning against an empty database.")
+            else:
+                log_callback(f"Opened SQLite database read-only: {sqlite_db_path}")
+        else:
+            sqlite_conn = sqlite3.connect(sqlite_db_path, timeout=DEFAULT_BUSY_TIMEOUT)
+            log_callback(f"Successfully connected to SQLite database: {sqlite_db_path}")
     except sqlite3.Error as e:
         log_callback(f"Error connecting to SQLite database: {e}")
-        mongo_client.close()
+        source.close()
         return
 
-    librechat_conv_collection = mongo_db["conversations"]
-    librechat_msg_collection = mongo_db["messages"]
+    checkpoint_filter = None
+    if user_filter:
+        log_callback(f"Filters: {describe_filters(filters)}")
+    ledger = MigrationLedger(sqlite_conn) if incremental and sqlite_conn is not None else None
+    if ledger is not None and dry_run and not ledger.exists():
+        ledger = None
+    if ledger is not None:
+        if not dry_run:
+            ledger.ensure_table()
+        if ledger_entries is None:
+            ledger_entries = ledger.load()
+        checkpoint = ledger.checkpoint(scope)
+        if checkpoint is not None:
+            checkpoint_filter = {'updatedAt': {'$gte': epoch_seconds_to_datetime(checkpoint)}}
+            log_callback(f"Resuming from checkpoint: conversations updated since {epoch_seconds_to_datetime(checkpoint).isoformat()} "
+                         f"({len(ledger_entries)} already migrated).")
+    if ledger_entries is None:
+        ledger_entries = {}
+    file_references = {}
+    if sqlite_conn is not None:
+        file_references = {file_id: webui_file_reference(entry)
+                           for file_id, entry in MigrationLedger(sqlite_conn).load_files().items()}
+        if file_references:
+            log_callback(f"Adding {len(file_references)} migrated files to the messages that reference them.")
+    conv_filter = combine_filters(user_filter, checkpoint_filter)
 
-    log_callback("Starting conversation migration...")
+    source.prepare(create_indexes=create_indexes and not dry_run, log_callback=log_callback)
+    if dry_run:
+        plan = plan_migration(source, conv_filter, target_user_id, ledger_entries, incremental, timestamp_fallback,
+                              json_encoder, batch_size, write_batch_rows, write_batch_bytes,
+                              0 if streaming else workers, sqlite_db_path, sample_size)
+        log_plan(plan, log_callback)
+        if sqlite_conn is not None:
+            sqlite_conn.close()
+        source.close()
+        return plan
+    total = source.count_conversations(conv_filter)
+    metrics = Metrics(metrics_task, total=total, progress_callback=progress_callback,
+                      log_callback=log_callback)
+    if streaming:
+        read_mode, workers = "streamed", 0
+    log_callback(f"Starting conversation migration (read mode: {read_mode}, workers: {workers}, JSON encoder: {json_encoder_name}, "
+                 f"conversations: {total if total is not None else 'unknown'})...")
     migrated_count = 0
+    updated_count = 0
+    unchanged_count = 0
     skipped_count = 0
+    migrated_at = int(time.time())
+    high_water = None
 
-    for conv in librechat_conv_collection.find():
-        try:
+    writer = BulkWriter(
+        sqlite_conn, CHAT_UPSERT_SQL if incremental else CHAT_INSERT_SQL,
+        batch_rows=write_batch_rows, batch_bytes=write_batch_bytes,
+        fast_pragmas=fast_pragmas, log_callback=log_callback, metrics=metrics,
+    )
+    stream_sql = CHAT_STREAM_UPSERT_SQL if incremental else CHAT_STREAM_INSERT_SQL
+    if streaming:
+        pairs = source.iter_conversations_streamed(conv_filter=conv_filter, batch_size=batch_size)
+    else:
+        pairs = source.iter_conversations_with_messages(read_mode=read_mode, conv_filter=conv_filter,
+                                                        batch_size=batch_size)
+    tasks = (
+        (conv, messages, target_user_id, ledger_entries.get(conv.get('conversationId')), incremental, timestamp_fallback,
+         json_encoder, file_references if streaming else conversation_files(messages, file_references))
+        for conv, messages in metrics.timed_iter("mongo_fetch", pairs)
+    )
+    stream_buffer = new_stream_buffer() if streaming else None
+    if streaming:
+        results = _run_streamed(tasks, stream_buffer)
+    else:
+        results = run_pipeline(tasks, convert_conversation, workers=workers, use_processes=use_processes,
+                               queue_size=queue_size)
+    with writer:
+        for task, result, exc in results:
+            conv = task[0]
             librechat_conv_uuid = conv.get('conversationId')
             title = conv.get('title', 'Imported Conversation')
-            created_at_epoch = convert_mongodb_time_to_epoch_seconds(conv.get('createdAt'))
-            updated_at_epoch = convert_mongodb_time_to_epoch_seconds(conv.get('updatedAt'))
-            model_name = conv.get('model', None)
 
-            log_callback(f"\nProcessing LibreChat conversation: {title} (ID: {librechat_conv_uuid})")
+            metrics.advance()
+
+            log_callback(debug(f"\nProcessing LibreChat conversation: {title} (ID: {librechat_conv_uuid})"))
 
-            messages = list(librechat_msg_collection.find(
-                {'conversationId': librechat_conv_uuid}
-            ).sort('createdAt', pymongo.ASCENDING))
+            if exc is not None:
+                log_callback(error(f"  Error processing conversation {librechat_conv_uuid}: {exc}"))
+                metrics.incr("errors")
+                skipped_count += 1
+                continue
 
-            if not messages:
-                log_callback("  Conversation has no messages, skipping.")
+            status, params, chat_hash, timings, counters = result
+            updated_at = source_updated_at(conv)
+            if updated_at is not None and (high_water is None or updated_at > high_water):
+                high_water = updated_at
+            for stage, seconds in timings.items():
+                metrics.add_time(stage, seconds)
+            for counter, amount in counters.items():
+                metrics.incr(counter, amount)
+            if status == CONVERSION_EMPTY:
+                log_callback(debug("  Conversation has no messages, skipping."))
                 skipped_count += 1
                 continue
+            if status == CONVERSION_UNCHANGED:
+                log_callback(debug("  Conversation unchanged since last migration, skipping."))
+                unchanged_count += 1
+                continue
+
+            extra = ()
+            if incremental:
+                extra = ((LEDGER_UPSERT_SQL, (librechat_conv_uuid, params[0], params[5], chat_hash, migrated_at)),)
 
-            open_webui_messages = []
-            models_in_chat = {model_name} if model_name else set()
-
-            for msg in messages:
-                role = "assistant" if not msg.get('isCreatedByUser', False) else "user"
-                msg_content = msg.get('text', '')
-                msg_timestamp_epoch = convert_mongodb_time_to_epoch_seconds(msg.get('createdAt'))
-                msg_id = msg.get('messageId')
-                parent_id = msg.get('parentMessageId')
-                if parent_id == "00000000-0000-0000-0000-000000000000":
-                    parent_id = None
-                
-                msg_model = msg.get('model')
-                if msg_model:
-                    models_in_chat.add(msg_model)
-
-                open_webui_messages.append({
-                    "id": msg_id,
-                    "parentId": parent_id,
-                    "role": role,
-                    "content": msg_content,
-                    "model": msg_model if role == 'assistant' else None,
-                    "timestamp": msg_timestamp_epoch,
-                })
-
-            chat_json_data = {
-                "id": "",
-                "title": title,
-                "models": list(models_in_chat),
-                "params": {},
-                "messages": open_webui_messages,
-                "tags": conv.get('tags', []),
-                "timestamp": created_at_epoch * 1000,
-                "files": []
-            }
-
-            new_chat_id = str(uuid4())
-            chat_json_string = json.dumps(chat_json_data, ensure_ascii=False)
-            meta_json = json.dumps({})
-            folder_id = None
-
-            sql = """
-            INSERT INTO chat (id, user_id, title, archived, created_at, updated_at, chat, pinned, meta, folder_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            params = (
-                new_chat_id,
-                target_user_id,
-                title,
-                0,
-                created_at_epoch,
-                updated_at_epoch,
-                chat_json_string,
-                0,
-                meta_json,
-                folder_id
-            )
-
-            sqlite_cursor.execute(sql, params)
-            log_callback(f"  Successfully inserted conversation '{title}' into Open WebUI (New ID: {new_chat_id})")
+            try:
+                if isinstance(params[6], StreamedChat):
+                    stream_params = params[:6] + (params[6].size,) + params[7:]
+                    writer.add_streamed(stream_sql, stream_params, params[6].writer(params[0]), extra)
+                else:
+                    writer.add(params, extra)
+            except Exception as e:
+                log_callback(error(f"  Error writing conversation {librechat_conv_uuid}: {e}"))
+                metrics.incr("errors")
+                skipped_count += 1
+                continue
+            metrics.incr("rows")
+            metrics.incr("bytes", params[6].size if isinstance(params[6], StreamedChat) else utf8_length(params[6]))
+
+            if status == CONVERSION_UPDATED:
+                log_callback(debug(f"  Queued update of conversation '{title}' in Open WebUI (ID: {params[0]})"))
+                updated_count += 1
+            else:
+                log_callback(debug(f"  Queued conversation '{title}' for insert into Open WebUI (New ID: {params[0]})"))
             migrated_count += 1
 
-        except Exception as e:
-            log_callback(f"  Error processing conversation {conv.get('conversationId')}: {e}")
-            skipped_count += 1
-        
-        if migrated_count > 0 and migrated_count % 50 == 0:
-            log_callback("  Committing current transaction...")
-            sqlite_conn.commit()
-
-    log_callback(f"\nMigration complete. Migrated: {migrated_count}, Skipped/Failed: {skipped_count}.")
-    log_callback("Committing final transaction...")
-    sqlite_conn.commit()
-    sqlite_cursor.close()
+    if stream_buffer is not None:
+        stream_buffer.close()
+    migrated_count -= writer.failed_count
+    skipped_count += writer.failed_count
+    metrics.incr("errors", writer.failed_count)
+    invalid_timestamps = metrics.counters.get(INVALID_TIMESTAMPS, 0)
+    if invalid_timestamps:
+        log_callback(warning(f"Warning: {invalid_timestamps} invalid timestamps were replaced (fallback: {timestamp_fallback})."))
+    tree_repairs = [(metrics.counters.get(counter, 0), label) for counter, label in (
+        (ORPHANED_MESSAGES, "messages with a missing parent became roots"),
+        (BROKEN_CYCLES, "parent cycles were broken"),
+        (DUPLICATE_MESSAGES, "duplicate messages were dropped"),
+    ) if metrics.counters.get(counter, 0)]
+    if tree_repairs:
+        log_callback(warning("Warning: Repaired message trees: " + ", ".join(f"{count} {label}" for count, label in tree_repairs) + "."))
+    if incremental and high_water is not None:
+        if metrics.counters.get("errors", 0):
+            log_callback(warning("Warning: Some conversations failed; the checkpoint was not advanced so they are retried next run."))
+        else:
+            ledger.save_checkpoint(scope, min(high_water, migrated_at - CHECKPOINT_MARGIN_SECONDS), migrated_at)
+    metrics.finish()
+    if metrics_path:
+        metrics.write_report(metrics_path)
+        log_callback(f"Metrics report written to {metrics_path}")
+    log_callback(f"\nMigration complete. Migrated: {migrated_count} (updated: {updated_count}), "
+                 f"Unchanged: {unchanged_count}, Skipped/Failed: {skipped_count}.")
     sqlite_conn.close()
-    mongo_client.close()
+    source.close()
     log_callback("Database connections closed.")
+    return {
+        "migrated": migrated_count,
+        "updated": updated_count,
+        "unchanged": unchanged_count,
+        "skipped": skipped_count,
+        "errors": metrics.counters.get("errors", 0),
+    }
 
 if __name__ == '__main__':
     migrate_conversations()
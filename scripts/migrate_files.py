@@ -0,0 +1,260 @@
+import os
+import sqlite3
+import threading
+import time
+from uuid import uuid4
+
+from core.backup_manifest import file_sha256
+from core.file_transfer import copy_file, resolve_upload, safe_filename
+from core.ledger import CHECKPOINT_TABLE, FILE_LEDGER_UPSERT_SQL, MigrationLedger
+from core.log import debug, error, warning
+from core.metrics import Metrics, format_bytes
+from core.pipeline import DEFAULT_QUEUE_SIZE, run_pipeline
+from core.serialization import dumps
+from core.sources import open_source
+from core.sqlite_writer import BulkWriter, DEFAULT_BATCH_BYTES, DEFAULT_BATCH_ROWS, DEFAULT_BUSY_TIMEOUT, FILE_INSERT_SQL
+from core.time_utils import convert_mongodb_time_to_epoch_seconds
+from core.users import resolve_user_mapping
+import config
+
+# Copy threads. Hashing and copying are I/O bound and release the GIL, so threads suffice.
+DEFAULT_COPY_WORKERS = 8
+
+# LibreChat file sources stored on the local disk; other sources (s3, firebase, openai, ...) are skipped.
+LOCAL_SOURCES = ("local", None)
+
+def upload_dirs(upload_dir=None):
+    """
+    Returns (directory the files are copied to, the same directory as Open
+    WebUI sees it). The copy defaults to OPEN_WEBUI_UPLOAD_DIR, or the
+    uploads folder next to webui.db, and the recorded path to
+    OPEN_WEBUI_UPLOAD_PATH, or the copy's absolute path.
+    """
+    upload_dir = upload_dir or config.OPEN_WEBUI_UPLOAD_DIR or os.path.join(
+        os.path.dirname(os.path.abspath(config.SQLITE_DB_PATH)), "uploads")
+    return upload_dir, (config.OPEN_WEBUI_UPLOAD_PATH or os.path.abspath(upload_dir)).rstrip("/\\")
+
+class _Claims:
+    """
+    Assigns one Open WebUI file id per (owner, content hash), shared by the
+    copy threads: the first thread to claim a hash copies the file, later
+    ones reuse its id. A failed copy releases its claim.
+    """
+
+    def __init__(self, existing):
+        self._ids = dict(existing)
+        self._lock = threading.Lock()
+
+    def claim(self, key):
+        """Returns (Open WebUI file id, whether the caller must copy the file)."""
+        with self._lock:
+            if key in self._ids:
+                return self._ids[key], False
+            webui_file_id = str(uuid4())
+            self._ids[key] = webui_file_id
+            return webui_file_id, True
+
+    def release(self, key, webui_file_id):
+        with self._lock:
+            if self._ids.get(key) == webui_file_id:
+                del self._ids[key]
+
+def transfer_file(record, path, owner, upload_dir, claims):
+    """
+    Copy stage, run on the thread pool: hashes path and, unless a file with
+    the same content and owner was already claimed, copies it into
+    upload_dir as "<id>_<filename>" like Open WebUI's own uploads.
+    Returns (Open WebUI file id, content hash, size, copied file name or
+    None for duplicates, copy method, timings).
+    """
+    timings = {}
+    start = time.perf_counter()
+    digest = file_sha256(path)
+    hashed = time.perf_counter()
+    timings["hash"] = hashed - start
+    webui_file_id, is_new = claims.claim((owner, digest))
+    if not is_new:
+        return webui_file_id, digest, os.path.getsize(path), None, None, timings
+    stored_name = f"{webui_file_id}_{record_filename(record)}"
+    try:
+        size, method = copy_file(path, os.path.join(upload_dir, stored_name))
+    except BaseException:
+        claims.release((owner, digest), webui_file_id)
+        raise
+    timings["copy"] = time.perf_counter() - hashed
+    return webui_file_id, digest, size, stored_name, method, timings
+
+def file_row(record, webui_file_id, owner, digest, stored_name, size, upload_path):
+    """Returns the parameter tuple for FILE_INSERT_SQL; digest is the SHA-256 of the content, stored as the file's hash."""
+    created_at = convert_mongodb_time_to_epoch_seconds(record.get('createdAt'))
+    updated_at = convert_mongodb_time_to_epoch_seconds(record.get('updatedAt'), parent=created_at)
+    meta = {"name": record_filename(record), "content_type": record.get('type'), "size": size, "data": {}}
+    return (webui_file_id, owner, digest, record_filename(record), f"{upload_path}/{stored_name}", "{}", dumps(meta),
+            None, created_at, updated_at)
+
+def record_filename(record):
+    """The original name of a LibreChat file, from filename or else its stored path ("<file_id>__<name>")."""
+    if record.get('filename'):
+        return safe_filename(record['filename'])
+    name = safe_filename(record.get('filepath'))
+    prefix = f"{record.get('file_id')}__"
+    return name[len(prefix):] if name.startswith(prefix) and len(name) > len(prefix) else name
+
+def migrate_files(log_callback=print, dump_dir=None, source=None, target_user_id=None, per_user=False,
+                  user_mapping=None, upload_dir=None, workers=DEFAULT_COPY_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                  write_batch_rows=DEFAULT_BATCH_ROWS, write_batch_bytes=DEFAULT_BATCH_BYTES,
+                  progress_callback=None, metrics_path=None):
+    """
+    Copies the files uploaded to LibreChat into Open WebUI.
+
+    Each record of LibreChat's files collection stored on the local disk is
+    resolved to its upload under LIBRECHAT_DOCKER_PATH (its uploads and
+    images folders). The files are hashed and copied by a pool of workers
+    threads into upload_dir (see upload_dirs), using the kernel-side copy of
+    core.file_transfer.copy_file. Files with the same content and owner are
+    copied once and share one Open WebUI file. The file table rows, and a
+    librechat_migration_files row mapping each LibreChat file_id to its Open
+    WebUI file, are inserted in batches. Files migrated by an earlier run
+    are skipped, so re-runs only copy new uploads.
+
+    Files belong to target_user_id (TARGET_USER_ID by default), or with
+    per_user to the Open WebUI account matched as in
+    scripts.migrate_users (user_mapping adds or overrides matches).
+
+    migrate_conversations then adds the migrated files to the messages that
+    reference them. When files are added after chats were migrated, the
+    conversation checkpoints are reset so the next migration revisits
+    those chats.
+
+    Returns a dict of counts (copied, duplicates, unchanged, skipped, bytes,
+    errors), or None if the migration could not start.
+    """
+    sqlite_db_path = config.SQLITE_DB_PATH
+    if not sqlite_db_path or "path/to/your/webui.db" in sqlite_db_path:
+        log_callback("Error: SQLITE_DB_PATH is not set in the .env file.")
+        return None
+    if not config.LIBRECHAT_DOCKER_PATH:
+        log_callback("Error: LIBRECHAT_DOCKER_PATH is not set in the .env file.")
+        return None
+    target_user_id = target_user_id or config.TARGET_USER_ID
+    if not per_user and (not target_user_id or "your_open_webui_user_id" in target_user_id):
+        log_callback("Error: TARGET_USER_ID is not set in the .env file.")
+        return None
+    upload_dir, upload_path = upload_dirs(upload_dir)
+
+    if source is None:
+        source = open_source(dump_dir, config.MONGO_DB_NAME, log_callback)
+    if source is None:
+        log_callback(error("Could not open the LibreChat data source. Aborting file migration."))
+        return None
+    try:
+        os.makedirs(upload_dir, exist_ok=True)
+        sqlite_conn = sqlite3.connect(sqlite_db_path, timeout=DEFAULT_BUSY_TIMEOUT)
+        if sqlite_conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'file'").fetchone() is None:
+            log_callback(error(f"Error: {sqlite_db_path} has no file table. Start Open WebUI once to create its schema."))
+            sqlite_conn.close()
+            source.close()
+            return None
+        ledger = MigrationLedger(sqlite_conn)
+        ledger.ensure_file_table()
+        migrated = ledger.load_files()
+        owners = resolve_user_mapping(source, sqlite_conn, user_mapping, log_callback) if per_user else None
+    except (sqlite3.Error, OSError) as e:
+        log_callback(f"Error preparing the file migration: {e}")
+        source.close()
+        return None
+    log_callback(f"Copying files from {config.LIBRECHAT_DOCKER_PATH} to {upload_dir} ({workers} threads)...")
+
+    claims = _Claims({(entry.user_id, entry.content_hash): entry.webui_file_id for entry in migrated.values()})
+    stored = {entry.webui_file_id for entry in migrated.values()}
+    total = source.count_files()
+    metrics = Metrics("migrate_files", total=total, progress_callback=progress_callback, log_callback=log_callback)
+    counts = {"copied": 0, "duplicates": 0, "unchanged": 0, "skipped": 0}
+
+    def tasks():
+        for record in metrics.timed_iter("mongo_fetch", source.iter_files()):
+            file_id = record.get('file_id')
+            reason = None
+            owner = owners.get(str(record.get('user'))) if owners is not None else target_user_id
+            path = None
+            if file_id in migrated:
+                counts["unchanged"] += 1
+            elif record.get('source') not in LOCAL_SOURCES:
+                reason = f"stored in '{record.get('source')}', not on disk"
+            elif owner is None:
+                reason = "its user has no Open WebUI account"
+            else:
+                path = resolve_upload(config.LIBRECHAT_DOCKER_PATH, record.get('filepath'))
+                if path is None:
+                    reason = f"its path '{record.get('filepath')}' is outside LIBRECHAT_DOCKER_PATH"
+                elif not os.path.isfile(path):
+                    reason = f"not found at {path}"
+            if path is None or reason:
+                metrics.advance()
+                if reason:
+                    log_callback(debug(f"  Skipping file {file_id}: {reason}."))
+                    counts["skipped"] += 1
+                continue
+            yield record, path, owner, upload_dir, claims
+
+    # Duplicates whose file is still being copied, by Open WebUI file id.
+    waiting = {}
+    migrated_at = int(time.time())
+    writer = BulkWriter(sqlite_conn, FILE_LEDGER_UPSERT_SQL, batch_rows=write_batch_rows, batch_bytes=write_batch_bytes,
+                        fast_pragmas=False, log_callback=log_callback, metrics=metrics)
+    with writer:
+        for task, result, exc in run_pipeline(tasks(), transfer_file, workers=workers, queue_size=queue_size):
+            record, path, owner = task[:3]
+            metrics.advance()
+            if exc is not None:
+                log_callback(error(f"  Error copying file {record.get('file_id')} ({path}): {exc}"))
+                metrics.incr("errors")
+                continue
+            webui_file_id, digest, size, stored_name, method, timings = result
+            for stage, seconds in timings.items():
+                metrics.add_time(stage, seconds)
+            ledger_row = (record.get('file_id'), webui_file_id, owner, digest, record_filename(record),
+                          record.get('type'), size, migrated_at)
+            if stored_name is None:
+                counts["duplicates"] += 1
+                if webui_file_id in stored:
+                    writer.add(ledger_row)
+                else:
+                    waiting.setdefault(webui_file_id, []).append(ledger_row)
+                continue
+            writer.add(ledger_row, ((FILE_INSERT_SQL, file_row(record, webui_file_id, owner, digest, stored_name,
+                                                                size, upload_path)),))
+            stored.add(webui_file_id)
+            for duplicate_row in waiting.pop(webui_file_id, ()):
+                writer.add(duplicate_row)
+            counts["copied"] += 1
+            metrics.incr("bytes", size)
+            metrics.incr(f"copy_{method}")
+            log_callback(debug(f"  Copied {path} to {stored_name} ({format_bytes(size)}, {method})."))
+
+    # Duplicates of a file that failed to copy (its claim was released; a re-run copies them).
+    orphaned = sum(len(rows) for rows in waiting.values())
+    if orphaned:
+        counts["duplicates"] -= orphaned
+        metrics.incr("errors", orphaned)
+        log_callback(warning(f"Warning: {orphaned} duplicate files were not migrated because their original failed."))
+    metrics.incr("errors", writer.failed_count)
+
+    if writer.written_count and ledger.exists() and ledger.exists(CHECKPOINT_TABLE):
+        ledger.reset_checkpoints()
+        log_callback("Reset the conversation checkpoints so the next migration adds the new files to chats "
+                     "migrated earlier.")
+    metrics.finish()
+    if metrics_path:
+        metrics.write_report(metrics_path)
+        log_callback(f"Metrics report written to {metrics_path}")
+    report = dict(counts, bytes=metrics.counters.get("bytes", 0), errors=metrics.counters.get("errors", 0))
+    log_callback(f"\nFile migration complete. Copied: {counts['copied']} ({format_bytes(report['bytes'])}), "
+                 f"Duplicates: {counts['duplicates']}, Unchanged: {counts['unchanged']}, "
+                 f"Skipped: {counts['skipped']}, Errors: {report['errors']}.")
+    sqlite_conn.close()
+    source.close()
+    return report
+
+if __name__ == '__main__':
+    migrate_files()
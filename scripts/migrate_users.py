@@ -0,0 +1,182 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from core.filters import build_conversation_filter, normalize_filters
+from core.ledger import MigrationLedger
+from core.log import LogMessage, error, level_of, warning
+from core.metrics import Metrics
+from core.sources import open_source
+from core.sqlite_writer import DEFAULT_BUSY_TIMEOUT
+from core.users import resolve_user_mapping
+from scripts.migrate_conversations import migrate_conversations
+import config
+
+DEFAULT_PARTITION_WORKERS = 4
+
+SUMMARY_KEYS = ("migrated", "updated", "unchanged", "skipped", "errors")
+
+
+class _SharedSource:
+    """Hands one opened source to several partitions; only the owner closes it."""
+
+    def __init__(self, source):
+        self._source = source
+
+    def __getattr__(self, name):
+        return getattr(self._source, name)
+
+    def prepare(self, create_indexes=False, explain=True, log_callback=print):
+        """Already prepared once by migrate_users."""
+
+    def close(self):
+        pass
+
+
+def _prefixed(log_callback, prefix):
+    def log(message):
+        text = str(message)
+        stripped = text.lstrip("\n")
+        log_callback(LogMessage(f"{text[:len(text) - len(stripped)]}{prefix}{stripped}", level_of(message)))
+    return log
+
+
+def _tagged(progress_callback, task):
+    def progress(event):
+        event.task = task
+        progress_callback(event)
+    return progress
+
+
+def migrate_users(log_callback=print, user_mapping=None, partition_workers=DEFAULT_PARTITION_WORKERS,
+                  dump_dir=None, source=None, filters=None, incremental=True, fast_pragmas=True,
+                  create_indexes=False, progress_callback=None, **migrate_options):
+    """
+    Migrates the conversations of every LibreChat user to the matching Open
+    WebUI account, instead of assigning them all to TARGET_USER_ID.
+
+    LibreChat users are matched to Open WebUI users by email, and
+    user_mapping (a dict of LibreChat user id -> Open WebUI user id, or a CSV
+    file of such pairs) adds or overrides matches. Conversations of users
+    without a match are skipped and reported.
+
+    The work is partitioned by user: each partition is a migrate_conversations
+    run restricted to one user (so it keeps its own incremental checkpoint),
+    and up to partition_workers partitions run at once, largest first. A
+    partition that fails is reported and does not stop the others. Progress
+    of each partition is logged with the user's id as a prefix, or sent to
+    progress_callback with the partition named in the event's task.
+
+    filters narrows the conversations as in migrate_conversations; other
+    keyword arguments (read_mode, workers, timestamp_fallback, ...) are passed
+    through to every partition.
+
+    Returns a dict of summed counts plus "failed_partitions" and
+    "unmapped_conversations", or None if the migration could not start.
+    """
+    filters = normalize_filters(filters)
+    if source is None:
+        source = open_source(dump_dir, config.MONGO_DB_NAME, log_callback)
+    if source is None:
+        log_callback(error("Could not open the LibreChat data source. Aborting migration."))
+        return None
+
+    sqlite_db_path = config.SQLITE_DB_PATH
+    if not sqlite_db_path or "path/to/your/webui.db" in sqlite_db_path:
+        log_callback("Error: SQLITE_DB_PATH is not set in the .env file.")
+        source.close()
+        return None
+
+    try:
+        sqlite_conn = sqlite3.connect(sqlite_db_path, timeout=DEFAULT_BUSY_TIMEOUT)
+        mapping = resolve_user_mapping(source, sqlite_conn, user_mapping, log_callback)
+        ledger_entries = None
+        if incremental:
+            ledger = MigrationLedger(sqlite_conn)
+            ledger.ensure_table()
+            ledger_entries = ledger.load()
+    except (sqlite3.Error, OSError) as e:
+        log_callback(f"Error preparing the per-user migration: {e}")
+        source.close()
+        return None
+
+    # Partitions write concurrently; switch to WAL once here so that each
+    # partition's writer sees WAL as the original mode and leaves it alone.
+    original_journal_mode = None
+    if fast_pragmas:
+        original_journal_mode = sqlite_conn.execute("PRAGMA journal_mode").fetchone()[0]
+        sqlite_conn.execute("PRAGMA journal_mode=WAL")
+
+    source.prepare(create_indexes=create_indexes, log_callback=log_callback)
+    counts = source.count_conversations_by_user(build_conversation_filter(filters))
+    wanted_users = set(filters.get("user_ids", counts))
+    partitions = sorted(((user_id, count) for user_id, count in counts.items()
+                         if user_id in wanted_users and user_id in mapping),
+                        key=lambda partition: partition[1], reverse=True)
+    unmapped_conversations = sum(count for user_id, count in counts.items()
+                                 if user_id in wanted_users and user_id not in mapping)
+    if unmapped_conversations:
+        log_callback(warning(f"Warning: {unmapped_conversations} conversations belong to unmapped users and will be skipped."))
+    log_callback(f"Migrating {sum(count for _user_id, count in partitions)} conversations of {len(partitions)} users "
+                 f"({partition_workers} at a time)...")
+
+    metrics = Metrics("migrate_users", total=len(partitions), progress_callback=progress_callback,
+                      log_callback=log_callback)
+    shared_source = _SharedSource(source)
+
+    def run_partition(librechat_user_id):
+        task = f"migrate_conversations[{librechat_user_id}]"
+        return migrate_conversations(
+            log_callback=_prefixed(log_callback, f"[{librechat_user_id}] "),
+            source=shared_source,
+            filters={**filters, "user_ids": [librechat_user_id]},
+            target_user_id=mapping[librechat_user_id],
+            ledger_entries=ledger_entries,
+            incremental=incremental,
+            fast_pragmas=fast_pragmas,
+            progress_callback=_tagged(progress_callback, task) if progress_callback else None,
+            metrics_task=task,
+            **migrate_options,
+        )
+
+    failed_partitions = []
+    with ThreadPoolExecutor(max_workers=max(1, partition_workers)) as executor:
+        futures = {executor.submit(run_partition, user_id): user_id for user_id, _count in partitions}
+        for future in as_completed(futures):
+            user_id = futures[future]
+            metrics.advance()
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = None
+                log_callback(error(f"Error migrating conversations of user {user_id}: {e}"))
+            if summary is None:
+                failed_partitions.append(user_id)
+                metrics.incr("failed_partitions")
+                continue
+            for key in SUMMARY_KEYS:
+                metrics.incr(key, summary[key])
+            if summary["errors"]:
+                failed_partitions.append(user_id)
+                metrics.incr("failed_partitions")
+
+    if original_journal_mode is not None:
+        try:
+            sqlite_conn.execute(f"PRAGMA journal_mode={original_journal_mode}")
+        except sqlite3.Error as e:
+            log_callback(warning(f"Warning: Could not restore PRAGMA journal_mode={original_journal_mode}: {e}"))
+    sqlite_conn.close()
+    source.close()
+    metrics.finish()
+
+    result = {key: metrics.counters.get(key, 0) for key in SUMMARY_KEYS}
+    result["failed_partitions"] = failed_partitions
+    result["unmapped_conversations"] = unmapped_conversations
+    log_callback(f"\nPer-user migration complete. Users: {len(partitions)} ({len(failed_partitions)} with failures), "
+                 f"Migrated: {result['migrated']} (updated: {result['updated']}), Unchanged: {result['unchanged']}, "
+                 f"Skipped/Failed: {result['skipped']}, Unmapped: {unmapped_conversations}.")
+    if failed_partitions:
+        log_callback(warning(f"Warning: Users with failures (re-run to retry them): {', '.join(failed_partitions)}"))
+    return result
+
+if __name__ == '__main__':
+    migrate_users()
@@ -0,0 +1,69 @@
+import os
+
+import config
+from core.backup_manifest import BACKUP_FULL, file_sha256, load_manifests, resolve_chain
+from core.log import error
+from core.metrics import format_bytes
+
+def plan_restore(log_callback=print, backup_root=None, backup_name=None, collections=None, verify=True):
+    """
+    Works out which archives restore each collection as of backup_name (the
+    newest backup by default) from the manifests in backup_root, which
+    defaults to LIBRECHAT_DOCKER_PATH/backups. With verify, every archive's
+    size and SHA-256 are checked against its manifest.
+
+    mongorestore only inserts, and skips documents whose _id already exists,
+    so a chain is applied newest first: the newest delta with --drop, then
+    the older deltas, then the full archive. Each document then keeps its
+    newest version; the duplicate key errors reported for the older copies
+    are expected. Documents deleted after the full backup are restored too,
+    because deltas only record changes.
+
+    Returns a dict with "steps" (one dict per archive, in the order to apply
+    them) and "errors", or None if there are no backups.
+    """
+    backup_root = backup_root or os.path.join(config.LIBRECHAT_DOCKER_PATH or "", "backups")
+    manifests = load_manifests(backup_root)
+    if not manifests:
+        log_callback(error(f"No backups with a manifest found in '{backup_root}'."))
+        return None
+    db_name = config.MONGO_DB_NAME
+    if collections is None:
+        collections = sorted({name for _backup, manifest in manifests if manifest.get("db") == db_name
+                              for name in manifest.get("collections", {})})
+
+    steps = []
+    errors = []
+    log_callback(f"Restore plan for '{db_name}' as of {backup_name or manifests[-1][0]}:")
+    for collection in collections:
+        try:
+            chain = resolve_chain(manifests, db_name, collection, backup_name)
+        except ValueError as e:
+            errors.append(str(e))
+            log_callback(error(f"  {collection}: {e}"))
+            continue
+        kinds = ", ".join(entry["type"] for _name, entry in chain)
+        log_callback(f"  {collection}: {len(chain)} archive(s), newest first ({kinds})")
+        for index, (name, entry) in enumerate(chain):
+            path = os.path.join(backup_root, name, entry["archive"])
+            problem = None
+            if not os.path.isfile(path):
+                problem = "missing"
+            elif verify and (os.path.getsize(path) != entry.get("bytes") or file_sha256(path) != entry.get("sha256")):
+                problem = "checksum mismatch"
+            if problem:
+                errors.append(f"{path}: {problem}")
+                log_callback(error(f"    {path}: {problem}"))
+            drop = " --drop" if index == 0 else ""
+            command = f"docker exec -i <mongo container> mongorestore --archive --gzip{drop} < {path}"
+            log_callback(f"    {command}  # {entry['type']}, {format_bytes(entry.get('bytes'))}"
+                         + (f", since {entry['since']}" if entry["type"] != BACKUP_FULL else ""))
+            steps.append({"collection": collection, "backup": name, "path": path, "type": entry["type"],
+                          "drop": index == 0, "since": entry.get("since"), "high_water": entry["high_water"],
+                          "command": command})
+    if errors:
+        log_callback(error(f"The restore plan has {len(errors)} problem(s); fix them before restoring."))
+    return {"steps": steps, "errors": errors}
+
+if __name__ == '__main__':
+    plan_restore()
@@ -0,0 +1,230 @@
+import hashlib
+import sqlite3
+
+from core.filters import build_conversation_filter, describe_filters
+from core.ledger import MigrationLedger
+from core.log import error, warning
+from core.metrics import Metrics
+from core.pipeline import DEFAULT_QUEUE_SIZE, run_pipeline
+from core.planner import open_read_only
+from core.readers import DEFAULT_BATCH_SIZE
+from core.serialization import loads
+from core.sources import open_source
+from scripts.migrate_conversations import convert_message
+import config
+
+# Conversations (or chats) handed to a worker at a time.
+DEFAULT_CHUNK_SIZE = 64
+DEFAULT_MAX_REPORTED = 20
+
+def _update(digest, text):
+    data = text.encode("utf-8", "surrogatepass")
+    digest.update(len(data).to_bytes(8, "little"))
+    digest.update(data)
+
+def message_digest(messages):
+    """
+    Digests (id, role, content) triples in creation order. Repeated ids keep
+    their first occurrence, as in the migration. Returns (message count,
+    hash of the ordered ids, hash of the ordered ids, roles and contents),
+    with the hashes truncated to 16 bytes.
+    """
+    seen = set()
+    ids = hashlib.sha256()
+    contents = hashlib.sha256()
+    for message_id, role, content in messages:
+        message_id = str(message_id)
+        if message_id in seen:
+            continue
+        seen.add(message_id)
+        _update(ids, message_id)
+        _update(contents, message_id)
+        _update(contents, str(role))
+        _update(contents, content if isinstance(content, str) else "" if content is None else str(content))
+    return len(seen), ids.digest()[:16], contents.digest()[:16]
+
+def source_digest(messages):
+    """Digest of LibreChat messages (sorted by createdAt), converted exactly as the migration converts them."""
+    converted = (convert_message(msg, None, set()) for msg in messages)
+    return message_digest((message["id"], message["role"], message["content"]) for message in converted)
+
+def chat_digest(chat_text):
+    """Digest of an Open WebUI chat column, from history.messages (or the messages list of older chats)."""
+    chat = loads(chat_text) if chat_text else {}
+    messages = chat.get("history", {}).get("messages")
+    messages = messages.values() if messages else chat.get("messages") or []
+    return message_digest((message.get("id"), message.get("role"), message.get("content")) for message in messages)
+
+def digest_source_chunk(pairs):
+    """Worker task: digests a chunk of (conversationId, messages) pairs."""
+    return [(conv_id, source_digest(messages)) for conv_id, messages in pairs]
+
+def digest_chat_chunk(rows):
+    """Worker task: digests a chunk of (chat id, chat JSON) rows."""
+    return [(chat_id, chat_digest(chat_text)) for chat_id, chat_text in rows]
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield (chunk,)
+            chunk = []
+    if chunk:
+        yield (chunk,)
+
+def verify_migration(log_callback=print, dump_dir=None, source=None, filters=None, batch_size=DEFAULT_BATCH_SIZE,
+                     workers=0, use_processes=False, queue_size=DEFAULT_QUEUE_SIZE, chunk_size=DEFAULT_CHUNK_SIZE,
+                     progress_callback=None, metrics_path=None, max_reported=DEFAULT_MAX_REPORTED):
+    """
+    Compares LibreChat (MongoDB or a mongodump directory) with the Open WebUI
+    database after a migration, without writing to either.
+
+    Both sides are streamed and reduced to a small digest per conversation:
+    the number of messages, a hash of the ordered message ids and a hash of
+    the ids, roles and contents. The chat table is read first: every chat
+    row is digested, chats are matched to their conversations through the
+    migration ledger, and chats with identical messages are counted as
+    duplicates. The conversations (limited by filters, as in
+    migrate_conversations) are then streamed and compared against the
+    digests. Digests are computed in chunks of chunk_size on workers, as in
+    migrate_conversations' pipeline; with use_processes they run in
+    parallel. Only the digests are kept, never the messages.
+
+    Returns a dict with the counts of conversations checked, matched,
+    mismatched, missing, empty (never migrated because they have no
+    messages), duplicate chats and ledger entries whose conversation was not
+    seen, plus up to max_reported example ids per problem. Returns None if
+    the verification could not start.
+    """
+    conv_filter = build_conversation_filter(filters)
+    sqlite_db_path = config.SQLITE_DB_PATH
+    if not sqlite_db_path or "path/to/your/webui.db" in sqlite_db_path:
+        log_callback("Error: SQLITE_DB_PATH is not set in the .env file.")
+        return None
+    try:
+        # The chat rows are read on the pipeline's reader thread.
+        sqlite_conn = open_read_only(sqlite_db_path, check_same_thread=False)
+    except sqlite3.Error as e:
+        log_callback(f"Error connecting to SQLite database: {e}")
+        return None
+    if sqlite_conn is None:
+        log_callback(error(f"Error: SQLite database {sqlite_db_path} does not exist."))
+        return None
+    ledger = MigrationLedger(sqlite_conn)
+    if not ledger.exists():
+        log_callback(error("Error: webui.db has no migration ledger. Verification needs a migration run with "
+                           "incremental=True (the default) to match chats to conversations."))
+        sqlite_conn.close()
+        return None
+
+    if source is None:
+        source = open_source(dump_dir, config.MONGO_DB_NAME, log_callback)
+    if source is None:
+        log_callback(error("Could not open the LibreChat data source. Aborting verification."))
+        sqlite_conn.close()
+        return None
+    if conv_filter:
+        log_callback(f"Filters: {describe_filters(filters)}")
+
+    chat_to_conversation = {entry.chat_id: conv_id for conv_id, entry in ledger.load().items()}
+    ledger_size = len(chat_to_conversation)
+    target = {}
+    chats_by_messages = {}
+    duplicate_chats = []
+
+    total_chats = sqlite_conn.execute("SELECT COUNT(*) FROM chat").fetchone()[0]
+    log_callback(f"Reading {total_chats} chats from {sqlite_db_path}...")
+    metrics = Metrics("verify_chats", total=total_chats, progress_callback=progress_callback, log_callback=log_callback)
+    rows = metrics.timed_iter("sqlite_read", sqlite_conn.execute("SELECT id, chat FROM chat"))
+    for _task, result, exc in run_pipeline(_chunks(rows, chunk_size), digest_chat_chunk, workers=workers,
+                                           use_processes=use_processes, queue_size=queue_size):
+        if exc is not None:
+            log_callback(error(f"  Error reading chats: {exc}"))
+            metrics.incr("errors")
+            continue
+        for chat_id, digest in result:
+            metrics.advance()
+            conv_id = chat_to_conversation.pop(chat_id, None)
+            if conv_id is not None:
+                target[conv_id] = digest
+            if digest[0]:
+                # Same messages in two chats: the conversation was imported more than once.
+                first = chats_by_messages.setdefault(digest[1], chat_id)
+                if first != chat_id:
+                    duplicate_chats.append(chat_id)
+    metrics.finish()
+    sqlite_conn.close()
+    deleted_chats = set(chat_to_conversation.values())
+    chat_to_conversation.clear()
+    chats_by_messages.clear()
+
+    source.prepare(log_callback=log_callback)
+    total = source.count_conversations(conv_filter)
+    log_callback(f"Comparing conversations from {source.description}...")
+    metrics = Metrics("verify_conversations", total=total, progress_callback=progress_callback,
+                      log_callback=log_callback)
+    pairs = ((conv.get('conversationId'), messages) for conv, messages in metrics.timed_iter(
+        "mongo_fetch", source.iter_conversations_with_messages(conv_filter=conv_filter, batch_size=batch_size)))
+    counts = {"checked": 0, "matched": 0, "mismatched": 0, "missing": 0, "empty": 0}
+    examples = {"mismatched": [], "missing": []}
+    for _task, result, exc in run_pipeline(_chunks(pairs, chunk_size), digest_source_chunk, workers=workers,
+                                           use_processes=use_processes, queue_size=queue_size):
+        if exc is not None:
+            log_callback(error(f"  Error reading conversations: {exc}"))
+            metrics.incr("errors")
+            continue
+        for conv_id, digest in result:
+            metrics.advance()
+            counts["checked"] += 1
+            migrated = target.pop(conv_id, None)
+            if migrated is None:
+                if not digest[0]:
+                    outcome = "empty"
+                else:
+                    outcome = "missing"
+            elif migrated == digest:
+                outcome = "matched"
+            else:
+                outcome = "mismatched"
+            counts[outcome] += 1
+            if outcome in examples and len(examples[outcome]) < max_reported:
+                examples[outcome].append(conv_id)
+    metrics.finish()
+    source.close()
+
+    report = dict(counts)
+    report.update(
+        duplicate_chats=len(duplicate_chats),
+        unseen_ledger_entries=len(target),
+        deleted_chats=len(deleted_chats),
+        ledger_entries=ledger_size,
+        errors=metrics.counters.get("errors", 0),
+        examples={"mismatched": examples["mismatched"], "missing": examples["missing"],
+                  "duplicate_chats": duplicate_chats[:max_reported]},
+    )
+    if metrics_path:
+        metrics.write_report(metrics_path)
+        log_callback(f"Metrics report written to {metrics_path}")
+
+    log_callback(f"\nVerification complete. Checked: {counts['checked']}, Matched: {counts['matched']}, "
+                 f"Mismatched: {counts['mismatched']}, Missing: {counts['missing']}, "
+                 f"Empty (not migrated): {counts['empty']}, Duplicate chats: {len(duplicate_chats)}.")
+    if counts["mismatched"]:
+        log_callback(warning(f"Warning: Conversations whose chat differs from the source (re-run the migration to "
+                             f"update them): {', '.join(examples['mismatched'])}"))
+    if counts["missing"]:
+        log_callback(warning(f"Warning: Conversations without a chat: {', '.join(examples['missing'])}"))
+    if deleted_chats:
+        log_callback(warning(f"Warning: {len(deleted_chats)} ledger entries point at chats that no longer exist "
+                             f"(they are reported as missing if their conversation was checked)."))
+    if duplicate_chats:
+        log_callback(warning(f"Warning: {len(duplicate_chats)} chats repeat the messages of another chat: "
+                             f"{', '.join(duplicate_chats[:max_reported])}"))
+    if target and not conv_filter:
+        log_callback(warning(f"Warning: {len(target)} ledger entries belong to conversations that are no longer "
+                             f"in the source."))
+    return report
+
+if __name__ == '__main__':
+    verify_migration()